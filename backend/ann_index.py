@@ -0,0 +1,178 @@
+"""
+Approximate nearest neighbour search for the document index.
+
+IVF-flat: unit-normalized chunk embeddings are clustered with spherical
+k-means into `nlist` cells, and a query is scored only against the rows of
+the `nprobe` cells whose centroids are most similar to it. Raising nprobe
+trades latency for recall; nprobe == nlist is an exact search.
+
+The DocumentIndex owns the vectors; this index only keeps the centroids and
+which cell every index row belongs to, so rows can be inserted, removed and
+moved as the document index changes. Centroids are saved next to the
+embedding store and reloaded on restart.
+
+Enable with RAG_ANN_INDEX=ivf; below RAG_ANN_MIN_ROWS chunks the document
+index keeps scanning every row, which is exact and fast enough.
+"""
+
+import math
+import os
+from typing import Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from config import RAG_ANN_INDEX, RAG_ANN_MIN_ROWS, RAG_ANN_NLIST, RAG_ANN_NPROBE
+
+_KMEANS_ITERATIONS = 10
+_TRAINING_ROWS_PER_CELL = 64
+_ASSIGN_BATCH_ROWS = 8192
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class IVFFlatIndex:
+    """Inverted-file index of document index rows over k-means cells"""
+
+    def __init__(self, nlist: int = RAG_ANN_NLIST, nprobe: int = RAG_ANN_NPROBE,
+                 min_rows: int = RAG_ANN_MIN_ROWS, path: Optional[str] = None, model: Optional[str] = None,
+                 seed: int = 0):
+        self.nlist = nlist  # 0: about 4 * sqrt(rows) when trained
+        self.nprobe = nprobe
+        self.min_rows = min_rows
+        self.path = path
+        self.model = model
+        self._rng = np.random.default_rng(seed)
+
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_rows = 0  # Rows the centroids were trained on; retrained once the index doubles
+        self._members: List[Set[int]] = []
+        self._cell_of: Dict[int, int] = {}
+        self._loaded = False
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def needs_training(self, rows: int) -> bool:
+        self._load_once()
+        return rows >= self.min_rows and rows >= 2 * self.trained_rows
+
+    def _cells_for(self, rows: int) -> int:
+        return max(1, min(self.nlist or int(4 * math.sqrt(rows)), rows))
+
+    def training_sample(self, rows: int) -> np.ndarray:
+        """Index rows to train on (a bounded random sample, so training cost does not grow with the corpus)"""
+        size = min(rows, self._cells_for(rows) * _TRAINING_ROWS_PER_CELL)
+        return np.sort(self._rng.choice(rows, size, replace=False))
+
+    def train(self, vectors: np.ndarray, rows: int):
+        """Spherical k-means over sampled (unit-normalized) vectors of an index with this many rows"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        nlist = min(self._cells_for(rows), len(vectors))
+
+        centroids = vectors[self._rng.choice(len(vectors), nlist, replace=False)].copy()
+        for _ in range(_KMEANS_ITERATIONS):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, vectors)
+            counts = np.bincount(assignment, minlength=nlist)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty cells with random training vectors
+                sums[empty] = vectors[self._rng.choice(len(vectors), int(empty.sum()), replace=False)]
+            centroids = _normalize(sums).astype(np.float32)
+
+        self.centroids = centroids
+        self.trained_rows = rows
+        self.reset()
+
+    def reset(self):
+        """Forget every row's cell (the centroids are kept)"""
+        self._members = [set() for _ in range(len(self.centroids))] if self.trained else []
+        self._cell_of = {}
+
+    def add(self, rows: Sequence[int], vectors: np.ndarray):
+        """Assign index rows to their nearest cell"""
+        if not self.trained or len(rows) == 0:
+            return
+        for start in range(0, len(rows), _ASSIGN_BATCH_ROWS):
+            batch = np.asarray(vectors[start:start + _ASSIGN_BATCH_ROWS], dtype=np.float32)
+            cells = np.argmax(batch @ self.centroids.T, axis=1)
+            for row, cell in zip(rows[start:start + _ASSIGN_BATCH_ROWS], cells.tolist()):
+                self._cell_of[row] = cell
+                self._members[cell].add(row)
+
+    def remove(self, row: int):
+        cell = self._cell_of.pop(row, None)
+        if cell is not None:
+            self._members[cell].discard(row)
+
+    def move(self, source: int, target: int):
+        """The document index moved a row (swap-remove); target must already be removed"""
+        cell = self._cell_of.pop(source, None)
+        if cell is not None:
+            self._members[cell].discard(source)
+            self._members[cell].add(target)
+            self._cell_of[target] = cell
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Rows in the nprobe cells closest to a unit-normalized query"""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        scores = self.centroids @ query
+        cells = np.argpartition(-scores, nprobe - 1)[:nprobe] if nprobe < len(scores) else range(len(scores))
+        rows = [row for cell in cells for row in self._members[cell]]
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def save(self):
+        if not self.path or not self.trained:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp.npz"
+            np.savez(tmp_path, centroids=self.centroids, trained_rows=self.trained_rows, model=self.model or "")
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"❌ Error saving ANN index: {e}")
+
+    def _load_once(self):
+        """Reuse centroids saved by an earlier run with the same embedding model"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                if str(data["model"]) != (self.model or ""):
+                    return
+                self.centroids = data["centroids"].astype(np.float32)
+                self.trained_rows = int(data["trained_rows"])
+            self.reset()
+            print(f"✅ ANN index loaded: {len(self.centroids)} cells")
+        except (OSError, KeyError, ValueError) as e:
+            print(f"❌ Error loading ANN index, it will be retrained: {e}")
+
+    def stats(self) -> Dict:
+        sizes = [len(members) for members in self._members]
+        return {
+            "type": "ivf",
+            "trained": self.trained,
+            "cells": len(self.centroids) if self.trained else 0,
+            "nprobe": self.nprobe,
+            "min_rows": self.min_rows,
+            "trained_rows": self.trained_rows,
+            "rows": len(self._cell_of),
+            "largest_cell": max(sizes) if sizes else 0
+        }
+
+
+def create_ann_index(path: Optional[str] = None, model: Optional[str] = None) -> Optional[IVFFlatIndex]:
+    """ANN index selected by RAG_ANN_INDEX (None: exact search only)"""
+    if RAG_ANN_INDEX == "ivf":
+        return IVFFlatIndex(path=path, model=model)
+    if RAG_ANN_INDEX not in ("", "none", "exact"):
+        print(f"Unknown RAG_ANN_INDEX '{RAG_ANN_INDEX}', using exact search")
+    return None
@@ -0,0 +1,87 @@
+"""
+Race-free appointment booking.
+
+The database is the arbiter for a doctor/time slot: the partial unique index
+uq_appointments_active_slot allows only one scheduled or confirmed
+appointment per (doctor_id, date). A cheap indexed lookup rejects most
+conflicts before any write, and a concurrent insert that loses the race is
+turned into the same SlotConflictError instead of a second booking.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Appointment, Patient
+from slot_availability import ACTIVE_APPOINTMENT_STATUSES
+from slot_calendar import slot_calendar
+
+
+class SlotConflictError(Exception):
+    """The doctor already has an active appointment at the requested time"""
+
+    def __init__(self, doctor_id: int, slot_datetime: datetime):
+        self.doctor_id = doctor_id
+        self.slot_datetime = slot_datetime
+        super().__init__(f"Slot {slot_datetime.strftime('%Y-%m-%d %H:%M')} is already booked for doctor {doctor_id}")
+
+
+def day_bounds(day: date):
+    """Half-open [start, end) datetimes covering one calendar day"""
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def find_active_slot_appointment(db: Session, doctor_id: int, slot_datetime: datetime) -> Optional[Appointment]:
+    """Active appointment occupying this exact doctor/time slot, if any"""
+    return db.query(Appointment).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.date == slot_datetime,
+        Appointment.status.in_(ACTIVE_APPOINTMENT_STATUSES)
+    ).first()
+
+
+def find_same_day_appointment(db: Session, patient: Patient, doctor_id: int, day: date) -> Optional[Appointment]:
+    """Active appointment with this doctor on the same day for the same person (name + phone)"""
+    day_start, day_end = day_bounds(day)
+    return db.query(Appointment).join(Patient).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.date >= day_start,
+        Appointment.date < day_end,
+        Appointment.status.in_(ACTIVE_APPOINTMENT_STATUSES),
+        Patient.first_name == patient.first_name,
+        Patient.last_name == patient.last_name,
+        Patient.phone == patient.phone
+    ).first()
+
+
+def claim_slot(db: Session, appointment: Appointment) -> Appointment:
+    """Insert and commit an appointment, raising SlotConflictError if its slot is taken.
+
+    The pre-check answers the common conflict without touching the write
+    path; the unique index settles races between concurrent requests.
+    """
+    if appointment.status is None:
+        appointment.status = "scheduled"
+    slot_datetime = appointment.date
+    is_active = appointment.status in ACTIVE_APPOINTMENT_STATUSES
+    if is_active and find_active_slot_appointment(db, appointment.doctor_id, slot_datetime):
+        raise SlotConflictError(appointment.doctor_id, slot_datetime)
+
+    try:
+        db.add(appointment)
+        db.flush()
+        if is_active:
+            slot_calendar.mark_booked(db, appointment.doctor_id, slot_datetime, appointment.id)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # Only a lost race for the slot is a conflict; other integrity errors propagate
+        if is_active and find_active_slot_appointment(db, appointment.doctor_id, slot_datetime):
+            raise SlotConflictError(appointment.doctor_id, slot_datetime)
+        raise
+
+    db.refresh(appointment)
+    return appointment
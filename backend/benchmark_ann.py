@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Recall and latency of the IVF ANN index against exact search.
+
+Builds a DocumentIndex over a synthetic clustered corpus (real embedding
+corpora are clustered by topic), then compares recall@k and per-query
+latency of exact search with ANN search for several nprobe values:
+
+    python benchmark_ann.py --rows 200000 --dimensions 384 --nprobe 4,8,16,32
+"""
+
+import argparse
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from ann_index import IVFFlatIndex
+from document_index import DocumentIndex
+
+
+def synthetic_corpus(rows: int, dimensions: int, topics: int, spread: float, seed: int = 0):
+    """Vectors scattered around random topic directions (spread: noise relative to the topic vector)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dimensions)).astype(np.float32)
+    noise = rng.standard_normal((rows, dimensions)).astype(np.float32) * spread
+    return centers[rng.integers(0, topics, rows)] + noise, centers, rng
+
+
+def percentile_ms(samples: Sequence[float], percentile: float) -> float:
+    return float(np.percentile(samples, percentile) * 1000)
+
+
+def run_benchmark(rows: int = 100000, dimensions: int = 256, topics: int = 500, spread: float = 2.0,
+                  queries: int = 200, k: int = 10, nlist: int = 0, nprobes: Sequence[int] = (4, 8, 16, 32),
+                  seed: int = 0) -> List[Dict]:
+    vectors, centers, rng = synthetic_corpus(rows, dimensions, topics, spread, seed)
+    ann = IVFFlatIndex(nlist=nlist, min_rows=min(rows, 1000), seed=seed)
+    index = DocumentIndex(top_k=k, min_similarity=-1.0, ann=ann)
+
+    started = time.perf_counter()
+    for start in range(0, rows, 10000):
+        batch = range(start, min(start + 10000, rows))
+        index.add_embeddings(
+            [{"id": i, "chunk": 0, "title": "", "content": "", "type": "synthetic"} for i in batch],
+            vectors[batch.start:batch.stop]
+        )
+    build_seconds = time.perf_counter() - started
+
+    query_vectors = centers[rng.integers(0, topics, queries)] + \
+        rng.standard_normal((queries, dimensions)).astype(np.float32) * spread
+
+    def measure(**kwargs):
+        results, latencies = [], []
+        for query in query_vectors:
+            started = time.perf_counter()
+            hits = index.search_embedding(query, k, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            results.append({hit["metadata"]["document_id"] for hit in hits})
+        return results, latencies
+
+    exact, exact_latencies = measure(exact=True)
+    report = [{
+        "search": "exact", "recall": 1.0,
+        "p50_ms": percentile_ms(exact_latencies, 50), "p99_ms": percentile_ms(exact_latencies, 99),
+        "build_seconds": build_seconds, "cells": ann.stats()["cells"]
+    }]
+    for nprobe in nprobes:
+        ann.nprobe = nprobe
+        approximate, latencies = measure()
+        recall = float(np.mean([len(a & e) / k for a, e in zip(approximate, exact)]))
+        report.append({
+            "search": f"ivf nprobe={nprobe}", "recall": recall,
+            "p50_ms": percentile_ms(latencies, 50), "p99_ms": percentile_ms(latencies, 99),
+            "build_seconds": build_seconds, "cells": ann.stats()["cells"]
+        })
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the IVF ANN index against exact search")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--spread", type=float, default=2.0, help="Noise around each topic (higher is harder)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="Cells (0: 4 * sqrt(rows))")
+    parser.add_argument("--nprobe", default="4,8,16,32", help="Comma-separated nprobe values")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.dimensions, args.topics, args.spread, args.queries, args.k, args.nlist,
+                            [int(value) for value in args.nprobe.split(",")])
+    print(f"📊 {args.rows} chunks x {args.dimensions} dimensions, {results[0]['cells']} cells, "
+          f"built in {results[0]['build_seconds']:.1f} s")
+    print(f"{'search':<18}{'recall@' + str(args.k):>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for row in results:
+        print(f"{row['search']:<18}{row['recall']:>10.3f}{row['p50_ms']:>10.2f}{row['p99_ms']:>10.2f}")
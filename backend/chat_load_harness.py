@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Open-loop load test for the chat and booking endpoints.
+
+Requests are started on a fixed schedule (the target RPS) whether or not
+earlier ones have finished, and latency is measured from each request's
+scheduled start, so a slow server shows up as latency instead of silently
+lowering the offered load. Run the server with the stub provider so /chat
+spends no API quota:
+
+    LLM_PROVIDER=stub LLM_STUB_LATENCY_MS=lognormal:800:0.4 python main.py
+    python chat_load_harness.py --rps 20 --duration 60 --mix chat=6,slots=3,book=1
+
+Booking rejections (400 duplicate, 409 slot taken) are expected under load
+and are reported separately from errors.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+
+CHAT_MESSAGES = [
+    "I have a headache since this morning",
+    "What are the visiting hours?",
+    "I have a fever of 101",
+    "I need to book an appointment with a cardiologist",
+    "What should I eat with diabetes?",
+    "My child has a cough and a runny nose",
+    "Is parking free for patients?",
+    "I have back pain after lifting something heavy",
+]
+
+SCENARIOS = ("chat", "slots", "book")
+
+
+def weekdays_ahead(days: int = 14) -> List[str]:
+    """Bookable dates (Sundays are closed) over the next days"""
+    today = date.today()
+    dates = [today + timedelta(days=offset) for offset in range(1, days + 1)]
+    return [day.isoformat() for day in dates if day.weekday() != 6]
+
+
+class RequestFactory:
+    """Builds the request for each scenario with seeded, repeatable randomness"""
+
+    def __init__(self, doctor_ids: Sequence[int], patient_ids: Sequence[int], seed: int = 0):
+        self.doctor_ids = list(doctor_ids)
+        self.patient_ids = list(patient_ids)
+        self.dates = weekdays_ahead()
+        self.times = [f"{hour:02d}:{minute:02d}" for hour in range(9, 17) for minute in (0, 30)]
+        self._random = random.Random(seed)
+
+    def build(self, scenario: str) -> Tuple[str, str, Optional[Dict]]:
+        """(method, path, JSON body)"""
+        if scenario == "chat":
+            return "POST", "/chat", {"message": self._random.choice(CHAT_MESSAGES)}
+        if scenario == "slots":
+            doctor_id = self._random.choice(self.doctor_ids)
+            return "GET", f"/doctors/{doctor_id}/available-slots/{self._random.choice(self.dates)}", None
+        if scenario == "book":
+            return "POST", "/appointments/book", {
+                "patient_id": self._random.choice(self.patient_ids),
+                "doctor_id": self._random.choice(self.doctor_ids),
+                "preferred_date": self._random.choice(self.dates),
+                "preferred_time": self._random.choice(self.times),
+                "reason": "Load test"
+            }
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """"chat=6,slots=3,book=1" as normalised scenario weights"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def parse_ids(spec: str) -> List[int]:
+    """"1-200" or "1,4,7" as a list of ids"""
+    ids = []
+    for part in spec.split(","):
+        low, _, high = part.partition("-")
+        ids.extend(range(int(low), int(high or low) + 1))
+    return ids
+
+
+def summarize(samples: List[Tuple[str, float, str]], elapsed: float) -> Dict[str, Dict]:
+    """Per-scenario throughput and latency percentiles from (scenario, seconds, outcome) samples"""
+    report = {}
+    for scenario in sorted({sample[0] for sample in samples}) + ["total"]:
+        rows = [sample for sample in samples if scenario in ("total", sample[0])]
+        latencies = np.array([seconds for _, seconds, _ in rows]) * 1000
+        outcomes = [outcome for _, _, outcome in rows]
+        report[scenario] = {
+            "requests": len(rows),
+            "ok": outcomes.count("ok"),
+            "rejected": outcomes.count("rejected"),
+            "errors": outcomes.count("error"),
+            "throughput_rps": len(rows) / elapsed if elapsed else 0.0,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "max_ms": float(latencies.max())
+        }
+    return report
+
+
+async def run_load_test(client: httpx.AsyncClient, rps: float, duration: float, mix: Dict[str, float],
+                        factory: RequestFactory, seed: int = 0) -> Dict[str, Dict]:
+    """Offer rps requests per second for duration seconds and report per scenario"""
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    samples: List[Tuple[str, float, str]] = []
+
+    async def send(scenario: str, scheduled: float):
+        method, path, body = factory.build(scenario)
+        try:
+            response = await client.request(method, path, json=body)
+            if response.status_code < 400:
+                outcome = "ok"
+            elif scenario == "book" and response.status_code in (400, 409):
+                outcome = "rejected"
+            else:
+                outcome = "error"
+        except httpx.HTTPError:
+            outcome = "error"
+        samples.append((scenario, time.perf_counter() - scheduled, outcome))
+
+    started = time.perf_counter()
+    tasks = []
+    for i in range(int(rps * duration)):
+        scheduled = started + i / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(send(rng.choices(names, weights)[0], scheduled)))
+    await asyncio.gather(*tasks)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def print_report(report: Dict[str, Dict]):
+    print(f"{'scenario':<10}{'requests':>9}{'ok':>7}{'rejected':>9}{'errors':>7}{'rps':>8}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for scenario, row in report.items():
+        print(f"{scenario:<10}{row['requests']:>9}{row['ok']:>7}{row['rejected']:>9}{row['errors']:>7}"
+              f"{row['throughput_rps']:>8.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+              f"{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}")
+
+
+async def main(args):
+    factory = RequestFactory(parse_ids(args.doctors), parse_ids(args.patients), args.seed)
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        print(f"🚀 {args.rps} requests/s for {args.duration} s against {args.base_url} ({args.mix})")
+        report = await run_load_test(client, args.rps, args.duration, parse_mix(args.mix), factory, args.seed)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test /chat, /appointments/book and available slots")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rps", type=float, default=10, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--mix", default="chat=6,slots=3,book=1", help="Scenario weights")
+    parser.add_argument("--doctors", default="1-5", help="Doctor ids, e.g. 1-5 or 1,3,7")
+    parser.add_argument("--patients", default="1-50", help="Patient ids used for bookings")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
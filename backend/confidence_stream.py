@@ -0,0 +1,65 @@
+"""
+Streaming filter for the trailing [CONFIDENCE: X.X] marker.
+
+LLM completions end with a confidence marker that must not reach the user.
+When tokens are relayed as they arrive, the filter holds back only the short
+tail of text that could still turn into a marker, so everything else is
+forwarded immediately and the marker itself is parsed instead of shown.
+"""
+
+import re
+from typing import Optional, Tuple
+
+from text_config import ConfidencePatterns, DefaultValues
+
+MARKER_PREFIX = "[CONFIDENCE:"
+CONFIDENCE_PATTERN = re.compile(ConfidencePatterns.CONFIDENCE_REGEX)
+CONFIDENCE_MARKER_PATTERN = re.compile(ConfidencePatterns.CONFIDENCE_REPLACEMENT)
+PARTIAL_VALUE_PATTERN = re.compile(r'\s*(\d+\.?\d*)?')
+
+
+class ConfidenceMarkerFilter:
+    """Feed text deltas in, get displayable text out, read confidence at the end"""
+
+    def __init__(self):
+        self._pending = ""
+        self.confidence: Optional[float] = None
+
+    @staticmethod
+    def _could_become_marker(tail: str) -> bool:
+        """Whether text starting with '[' is a prefix of a confidence marker"""
+        if len(tail) <= len(MARKER_PREFIX):
+            return MARKER_PREFIX.startswith(tail)
+        return tail.startswith(MARKER_PREFIX) and \
+            PARTIAL_VALUE_PATTERN.fullmatch(tail[len(MARKER_PREFIX):]) is not None
+
+    def _hold_index(self, text: str) -> int:
+        """Index from which text has to be held back"""
+        hold = len(text)
+        start = text.rfind("[")
+        if start != -1 and self._could_become_marker(text[start:]):
+            hold = start
+        # Whitespace before a marker is removed together with it
+        while hold > 0 and text[hold - 1].isspace():
+            hold -= 1
+        return hold
+
+    def feed(self, delta: str) -> str:
+        """Add a delta and return the text that is now safe to display"""
+        text = self._pending + delta
+
+        match = CONFIDENCE_PATTERN.search(text)
+        if match:
+            self.confidence = float(match.group(1))
+            text = CONFIDENCE_MARKER_PATTERN.sub('', text)
+
+        hold = self._hold_index(text)
+        self._pending = text[hold:]
+        return text[:hold]
+
+    def finish(self) -> Tuple[str, float]:
+        """Flush held text (it never became a marker) and return the confidence"""
+        remaining = self._pending.rstrip()
+        self._pending = ""
+        confidence = self.confidence if self.confidence is not None else DefaultValues.DEFAULT_CONFIDENCE
+        return remaining, confidence
@@ -58,3 +58,36 @@ else:
 
 # ChromaDB Configuration
 CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
+
+# Document Retrieval Configuration (in-memory document index)
+RAG_TOP_K = _get_int_env(["RAG_TOP_K"], 3)
+RAG_MIN_SIMILARITY = float(os.getenv("RAG_MIN_SIMILARITY", "0.25"))
+# Retrieval backend (retrieval_backends.py): hybrid (BM25 + vector hits fused by reciprocal rank), numpy, memmap, chroma or bm25
+RAG_BACKEND = os.getenv("RAG_BACKEND", "hybrid").lower()
+RAG_RRF_K = _get_int_env(["RAG_RRF_K"], 60)
+# Approximate nearest neighbour search for large corpora: "ivf" (inverted file over k-means cells) or "none"
+RAG_ANN_INDEX = os.getenv("RAG_ANN_INDEX", "none").lower()
+RAG_ANN_MIN_ROWS = _get_int_env(["RAG_ANN_MIN_ROWS"], 20000)  # Exact search below this many chunks
+RAG_ANN_NLIST = _get_int_env(["RAG_ANN_NLIST"], 0)  # Cells; 0 sizes them from the corpus (4 * sqrt(chunks))
+RAG_ANN_NPROBE = _get_int_env(["RAG_ANN_NPROBE"], 16)  # Cells scanned per query: higher is slower and more accurate
+# Documents are embedded in overlapping chunks, in batches, by a background ingestion job
+CHUNK_SIZE = _get_int_env(["CHUNK_SIZE"], 1000)  # Characters
+CHUNK_OVERLAP = _get_int_env(["CHUNK_OVERLAP"], 200)
+EMBEDDING_BATCH_SIZE = _get_int_env(["EMBEDDING_BATCH_SIZE"], 64)  # Inputs per embeddings request
+EMBEDDING_MAX_CONCURRENCY = _get_int_env(["EMBEDDING_MAX_CONCURRENCY"], 4)  # Embeddings requests in flight
+# Memory-mapped document embeddings shared by all workers (kept next to the ChromaDB directory)
+EMBEDDING_STORE_ENABLED = os.getenv("EMBEDDING_STORE_ENABLED", "true").lower() == "true"
+EMBEDDING_STORE_DIRECTORY = os.getenv(
+    "EMBEDDING_STORE_DIRECTORY",
+    os.path.join(os.path.dirname(os.path.abspath(CHROMA_PERSIST_DIRECTORY)), "embedding_store")
+)
+
+# Slot Calendar Configuration (materialized doctor_slot_calendar table)
+SLOT_CALENDAR_ENABLED = os.getenv("SLOT_CALENDAR_ENABLED", "false").lower() == "true"
+SLOT_CALENDAR_HORIZON_DAYS = _get_int_env(["SLOT_CALENDAR_HORIZON_DAYS"], 60)
+
+# Chat Sessions (multi-turn history kept in memory, written behind to chat_sessions)
+CHAT_SESSIONS_ENABLED = os.getenv("CHAT_SESSIONS_ENABLED", "true").lower() == "true"
+CHAT_SESSION_CACHE_SIZE = _get_int_env(["CHAT_SESSION_CACHE_SIZE"], 1000)  # Sessions kept in the LRU
+CHAT_SESSION_HISTORY_TURNS = _get_int_env(["CHAT_SESSION_HISTORY_TURNS"], 6)  # Recent turns kept per session
+CHAT_SESSION_FLUSH_SECONDS = float(os.getenv("CHAT_SESSION_FLUSH_SECONDS", "2"))  # Write-behind interval
@@ -0,0 +1,422 @@
+"""
+In-process vector index over the Document table for RAG retrieval.
+
+Documents are split into overlapping chunks and every chunk embedding is a
+row of one contiguous float32 matrix, normalized to unit length when it is
+added, so cosine similarity against every chunk is a single matrix-vector
+product and the top k come from argpartition instead of a full sort.
+
+Embedding is done by the ingestion pipeline (document_ingestion.py) in the
+background; this index only holds the vectors. Chunks of documents that are
+inserted, updated or deleted through the ORM are dropped after commit, and
+`sync` reports documents that still need embedding.
+
+With an EmbeddingStore attached, embeddings are read from and appended to
+the shared memory-mapped file instead of a private matrix, so a restarted
+worker only re-embeds documents whose text changed.
+
+With an ANN index attached (RAG_ANN_INDEX, see ann_index.py), large indexes
+score only the rows in the cells nearest to the query instead of every row.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from config import (
+    CHUNK_OVERLAP, CHUNK_SIZE, EMBEDDING_MODEL, EMBEDDING_STORE_DIRECTORY, EMBEDDING_STORE_ENABLED,
+    RAG_BACKEND, RAG_MIN_SIMILARITY, RAG_TOP_K
+)
+from model_watch import watch_model
+from models import Document
+
+try:
+    import numpy as np
+    from embedding_store import EmbeddingStore, text_hash
+    from ann_index import IVFFlatIndex, create_ann_index
+except ImportError:  # Retrieval is disabled without numpy (minimal installs)
+    np = None
+    EmbeddingStore = text_hash = None
+    IVFFlatIndex = create_ann_index = None
+
+_INITIAL_CAPACITY = 64
+# Documents that could not be embedded are looked for again (and re-queued by chat lookups) after this long
+RETRY_AFTER_SECONDS = 300
+_BOUNDARIES = ("\n\n", ". ", "\n", " ")
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Split text into chunks of at most chunk_size characters that overlap by about overlap.
+
+    Chunks end at a paragraph, sentence or word boundary when one falls in
+    the second half of the window.
+    """
+    text = (text or "").strip()
+    if len(text) <= chunk_size:
+        return [text]
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            window = text[start:end]
+            for boundary in _BOUNDARIES:
+                cut = window.rfind(boundary)
+                if cut > chunk_size // 2:
+                    end = start + cut + len(boundary)
+                    break
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        next_start = max(end - overlap, start + 1)
+        # Start the overlap on a word boundary
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return [chunk for chunk in chunks if chunk]
+
+
+def chunk_document(document) -> List[Dict]:
+    """Chunk entries of a Document row (at least one, so empty documents are indexed by title)"""
+    return [
+        {"id": document.id, "chunk": number, "title": document.title, "content": content,
+         "type": document.document_type}
+        for number, content in enumerate(chunk_text(document.content))
+    ]
+
+
+def embedding_text(chunk: Dict) -> str:
+    """Text that is embedded for a chunk"""
+    return f"{chunk['title']}\n\n{chunk['content']}"
+
+
+ChunkKey = Tuple[int, int]  # (document id, chunk number)
+
+
+class DocumentIndex:
+    """Unit-normalized float32 chunk embedding matrix plus per-row chunk metadata"""
+
+    def __init__(self, embed: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 top_k: int = RAG_TOP_K, min_similarity: float = RAG_MIN_SIMILARITY,
+                 store: Optional["EmbeddingStore"] = None, ann: Optional["IVFFlatIndex"] = None):
+        self.embed = embed
+        self.store = store
+        self.ann = ann  # Approximate search once the index is large enough
+        self.top_k = top_k
+        # Chunks less similar than this to the query are not passed to the LLM
+        self.min_similarity = min_similarity
+
+        self._lock = threading.RLock()
+        self._matrix = None  # (capacity, dim); rows [0, _size) are live. Unused with a store
+        self._store_rows = None  # Store row of each live chunk when a store is attached
+        self._size = 0
+        self._chunks: List[Dict] = []
+        self._row_of: Dict[ChunkKey, int] = {}
+        self._keys_of_document: Dict[int, List[ChunkKey]] = {}
+        self._stale = True  # The Document table may hold rows that are not indexed yet
+        self._unindexed: set = set()  # Documents the last sync found without embeddings
+        self._recheck_at = 0.0  # When to scan the Document table again for them
+
+    @property
+    def available(self) -> bool:
+        return np is not None and self.embed is not None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def document_count(self) -> int:
+        return len(self._keys_of_document)
+
+    def _ensure_capacity(self, dim: Optional[int], rows: int):
+        needed = self._size + rows
+        if self.store is not None:
+            if self._store_rows is None:
+                self._store_rows = np.zeros(max(_INITIAL_CAPACITY, needed), dtype=np.int64)
+            elif needed > len(self._store_rows):
+                grown = np.zeros(max(needed, len(self._store_rows) * 2), dtype=np.int64)
+                grown[:self._size] = self._store_rows[:self._size]
+                self._store_rows = grown
+            return
+        if self._matrix is None:
+            self._matrix = np.zeros((max(_INITIAL_CAPACITY, rows), dim), dtype=np.float32)
+            return
+        if self._matrix.shape[1] != dim:
+            raise ValueError(f"Embedding dimension {dim} does not match index dimension {self._matrix.shape[1]}")
+        if needed > self._matrix.shape[0]:
+            grown = np.zeros((max(needed, self._matrix.shape[0] * 2), dim), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+
+    def add_embeddings(self, chunks: Sequence[Dict], embeddings: Sequence[Sequence[float]]):
+        """Add chunks given their raw embeddings, replacing earlier chunks of the same documents.
+
+        Each chunk dict needs id (the document id), chunk, title, content and
+        type, and all chunks of a document must be passed together.
+        """
+        if not chunks:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            if self.store is not None:
+                store_rows = self.store.append(
+                    [(chunk["id"], chunk["chunk"], text_hash(embedding_text(chunk))) for chunk in chunks],
+                    vectors
+                )
+                self._add_store_rows(chunks, store_rows)
+                return
+
+            self._remove_documents_locked({chunk["id"] for chunk in chunks})
+            self._ensure_capacity(vectors.shape[1], len(chunks))
+            self._matrix[self._size:self._size + len(chunks)] = vectors
+            self._append_chunks_locked(chunks)
+
+    def _add_store_rows(self, chunks: Sequence[Dict], store_rows: Sequence[int]):
+        """Point chunks at embeddings that are already in the store"""
+        with self._lock:
+            self._remove_documents_locked({chunk["id"] for chunk in chunks})
+            self._ensure_capacity(self.store.dimensions, len(chunks))
+            self._store_rows[self._size:self._size + len(chunks)] = store_rows
+            self._append_chunks_locked(chunks)
+
+    def _append_chunks_locked(self, chunks: Sequence[Dict]):
+        first_row = self._size
+        for chunk in chunks:
+            key = (chunk["id"], chunk["chunk"])
+            self._row_of[key] = self._size
+            self._keys_of_document.setdefault(chunk["id"], []).append(key)
+            self._chunks.append(dict(chunk))
+            self._size += 1
+        if self.ann is not None:
+            if self.ann.needs_training(self._size):
+                self._train_ann_locked()
+            else:
+                rows = list(range(first_row, self._size))
+                self.ann.add(rows, self._row_vectors_locked(rows))
+
+    def _row_vectors_locked(self, rows) -> "np.ndarray":
+        """Unit-normalized vectors of index rows"""
+        if self.store is not None:
+            return self.store.vectors[self._store_rows[rows]]
+        return self._matrix[rows]
+
+    def _score_all_locked(self, query: "np.ndarray") -> "np.ndarray":
+        """Similarity of every live row to a unit-normalized query, in row order"""
+        if self.store is not None:
+            # Score the shared memmap in place and pick out the live rows; gathering the
+            # vectors first would copy every live row into a new array on each query
+            return (self.store.vectors @ query)[self._store_rows[:self._size]]
+        return self._matrix[:self._size] @ query
+
+    def _dimensions_locked(self) -> int:
+        if self.store is not None:
+            return int(self.store.dimensions or 0)
+        return int(self._matrix.shape[1]) if self._matrix is not None else 0
+
+    def _train_ann_locked(self):
+        """(Re)build ANN cells from the current rows; runs when the index first gets large, then on doubling"""
+        sample = self.ann.training_sample(self._size)
+        self.ann.train(self._row_vectors_locked(sample), self._size)
+        for start in range(0, self._size, 8192):
+            batch = list(range(start, min(start + 8192, self._size)))
+            self.ann.add(batch, self._row_vectors_locked(batch))
+        self.ann.save()
+        print(f"✅ ANN index trained on {self._size} chunks")
+
+    def _remove_row_locked(self, key: ChunkKey):
+        row = self._row_of.pop(key)
+        last = self._size - 1
+        if self.ann is not None:
+            self.ann.remove(row)
+            if row != last:
+                self.ann.move(last, row)
+        if row != last:
+            # Move the last row into the hole so live rows stay contiguous
+            if self.store is not None:
+                self._store_rows[row] = self._store_rows[last]
+            else:
+                self._matrix[row] = self._matrix[last]
+            self._chunks[row] = self._chunks[last]
+            self._row_of[(self._chunks[row]["id"], self._chunks[row]["chunk"])] = row
+        self._chunks.pop()
+        self._size -= 1
+
+    def _remove_documents_locked(self, document_ids):
+        for document_id in document_ids:
+            for key in self._keys_of_document.pop(document_id, ()):
+                self._remove_row_locked(key)
+
+    def remove(self, document_ids):
+        with self._lock:
+            self._remove_documents_locked(document_ids)
+
+    def clear(self):
+        """Drop every row; the next sync reports the whole Document table as missing"""
+        with self._lock:
+            self._size = 0
+            self._store_rows = None
+            self._chunks = []
+            self._row_of = {}
+            self._keys_of_document = {}
+            self._stale = True
+            self._unindexed = set()
+            if self.ann is not None:
+                self.ann.reset()
+
+    def mark_stale(self, document_ids=()):
+        """Drop chunks of changed documents and re-sync with the Document table on the next lookup"""
+        with self._lock:
+            self._remove_documents_locked(document_ids)
+            self._stale = True
+
+    def attach_stored(self, documents) -> List:
+        """Index documents whose chunk embeddings are all in the store; returns the others"""
+        if self.store is None or not documents:
+            return list(documents)
+        self.store.reload()
+        missing = []
+        with self._lock:
+            for document in documents:
+                chunks = chunk_document(document)
+                rows = [self.store.lookup(chunk["id"], chunk["chunk"], text_hash(embedding_text(chunk)))
+                        for chunk in chunks]
+                if any(row is None for row in rows):
+                    missing.append(document)
+                else:
+                    self._add_store_rows(chunks, rows)
+        return missing
+
+    def _needs_scan(self) -> bool:
+        return self._stale or (bool(self._unindexed) and time.time() >= self._recheck_at)
+
+    def sync(self, db: Session) -> List[int]:
+        """Attach stored embeddings for Document rows that are not indexed yet.
+
+        Returns the ids of documents that still have to be embedded (hand them
+        to the ingestion pipeline). The Document table is scanned again only
+        after mark_stale (documents changed or an ingestion job finished) or,
+        while some documents are still unindexed, every RETRY_AFTER_SECONDS.
+        """
+        if not self.available or not self._needs_scan():
+            return []
+        with self._lock:
+            if not self._needs_scan():
+                return []
+            indexed = set(self._keys_of_document)
+            missing_ids = [doc_id for (doc_id,) in db.query(Document.id).all() if doc_id not in indexed]
+            documents = db.query(Document).filter(Document.id.in_(missing_ids)).all() if missing_ids else []
+            missing = [document.id for document in self.attach_stored(documents)]
+            self._stale = False
+            self._unindexed = set(missing)
+            self._recheck_at = time.time() + RETRY_AFTER_SECONDS
+            return missing
+
+    def search_embedding(self, query_embedding: Sequence[float], k: Optional[int] = None,
+                         min_similarity: Optional[float] = None, exact: bool = False) -> List[Dict]:
+        """Top-k chunks by cosine similarity to an embedding (exact skips the ANN index)"""
+        k = self.top_k if k is None else k
+        min_similarity = self.min_similarity if min_similarity is None else min_similarity
+        if np is None or k <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0:
+            return []
+        query = query / norm
+
+        with self._lock:
+            if self._size == 0:
+                return []
+            rows = None
+            if not exact and self.ann is not None and self.ann.trained and self._size >= self.ann.min_rows:
+                # Score only the rows in the cells nearest to the query
+                rows = self.ann.candidates(query)
+                if len(rows) < k:
+                    rows = None
+            if rows is not None:
+                scores = self._row_vectors_locked(rows) @ query
+            else:
+                scores = self._score_all_locked(query)
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+            hits = [(self._chunks[rows[i] if rows is not None else i], float(scores[i])) for i in top]
+
+        return [
+            {
+                "content": chunk["content"],
+                "metadata": {"title": chunk["title"], "type": chunk["type"], "document_id": chunk["id"],
+                             "chunk": chunk["chunk"]},
+                "distance": 1 - similarity,
+                "score": similarity
+            }
+            for chunk, similarity in hits
+            if similarity >= min_similarity
+        ]
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Dict]:
+        """Top-k chunks for a query, in the retrieved_docs format the LLM prompt expects"""
+        if not self.available or self._size == 0:
+            return []
+        try:
+            return self.search_embedding(self.embed([query])[0], k)
+        except Exception as e:
+            print(f"Error searching documents: {e}")
+            return []
+
+    def stats(self) -> Dict:
+        """Summary of the index for monitoring"""
+        with self._lock:
+            return {
+                "available": self.available,
+                "documents": self.document_count,
+                "chunks": self._size,
+                "dimensions": self._dimensions_locked(),
+                "capacity": int(self._matrix.shape[0]) if self._matrix is not None else
+                (len(self._store_rows) if self._store_rows is not None else 0),
+                "store": self.store.stats() if self.store is not None else None,
+                "ann": self.ann.stats() if self.ann is not None else None,
+                "stale": self._stale,
+                "unindexed_documents": len(self._unindexed),
+                "top_k": self.top_k,
+                "min_similarity": self.min_similarity
+            }
+
+
+def _embed_with_llm_service(texts: List[str]) -> List[List[float]]:
+    from llm_service import llm_service
+    return llm_service.embed_texts(texts)
+
+
+# Global document index instance (the store directory is created on first use)
+document_index = DocumentIndex(
+    embed=_embed_with_llm_service,
+    store=EmbeddingStore(EMBEDDING_STORE_DIRECTORY, EMBEDDING_MODEL)
+    if EmbeddingStore is not None and EMBEDDING_STORE_ENABLED and RAG_BACKEND != "numpy" else None,
+    ann=create_ann_index(os.path.join(EMBEDDING_STORE_DIRECTORY, "ann_ivf.npz"), EMBEDDING_MODEL)
+    if create_ann_index is not None else None
+)
+
+
+# =============================================================================
+# INVALIDATION HOOKS
+# =============================================================================
+
+
+def _apply_document_changes(changed):
+    if changed is None:
+        document_index.clear()
+    else:
+        document_index.mark_stale(changed)
+
+
+watch_model(Document, _apply_document_changes)
@@ -0,0 +1,204 @@
+"""
+Background ingestion pipeline for knowledge base documents.
+
+Documents are split into overlapping chunks, and chunk texts are embedded in
+batches (EMBEDDING_BATCH_SIZE inputs per embeddings request) with at most
+EMBEDDING_MAX_CONCURRENCY requests in flight. Jobs run one at a time on a
+worker thread so /add-doc and the bulk endpoint return immediately; each job
+reports its progress until it completes.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+from config import EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_CONCURRENCY
+from database import SessionLocal
+from document_index import RETRY_AFTER_SECONDS, DocumentIndex, chunk_document, document_index, embedding_text
+from models import Document
+from timezone_utils import get_local_now
+
+# Documents loaded and embedded per step of a job
+_DOCUMENTS_PER_STEP = 50
+_JOBS_KEPT = 100
+
+
+@dataclass
+class IngestionJob:
+    id: str
+    document_ids: List[int]
+    status: str = "queued"  # queued, running, completed, failed
+    processed_documents: int = 0
+    total_chunks: int = 0
+    embedded_chunks: int = 0
+    reused_documents: int = 0  # Embeddings already in the store
+    failed_document_ids: List[int] = field(default_factory=list)
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=get_local_now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total_documents": len(self.document_ids),
+            "processed_documents": self.processed_documents,
+            "total_chunks": self.total_chunks,
+            "embedded_chunks": self.embedded_chunks,
+            "reused_documents": self.reused_documents,
+            "failed_document_ids": list(self.failed_document_ids),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class DocumentIngestion:
+    """Queue of chunk-and-embed jobs feeding a DocumentIndex"""
+
+    def __init__(self, index: DocumentIndex, embed: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 session_factory=SessionLocal, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 max_concurrency: int = EMBEDDING_MAX_CONCURRENCY):
+        self.index = index
+        self.embed = embed or index.embed
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queued_ids = set()  # Documents in a queued or running job
+        self._failed_at: Dict[int, float] = {}
+        self._job_executor: Optional[ThreadPoolExecutor] = None
+        self._embed_executor: Optional[ThreadPoolExecutor] = None
+
+    def _executors(self):
+        if self._job_executor is None:
+            self._job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion")
+            self._embed_executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                      thread_name_prefix="embedding")
+        return self._job_executor, self._embed_executor
+
+    def submit(self, document_ids: Sequence[int], retry_failed: bool = True) -> Optional[IngestionJob]:
+        """Queue documents for embedding; returns None when all are already queued.
+
+        With retry_failed False, documents that failed recently are skipped
+        (used by chat lookups so a broken embeddings API is not hammered).
+        """
+        if not self.index.available:
+            return None
+        now = time.time()
+        with self._lock:
+            ids = [
+                document_id for document_id in dict.fromkeys(document_ids)
+                if document_id not in self._queued_ids
+                and (retry_failed or now - self._failed_at.get(document_id, 0) > RETRY_AFTER_SECONDS)
+            ]
+            if not ids:
+                return None
+            job = IngestionJob(id=uuid.uuid4().hex, document_ids=ids)
+            self._jobs[job.id] = job
+            while len(self._jobs) > _JOBS_KEPT:
+                self._jobs.popitem(last=False)
+            self._queued_ids.update(ids)
+
+        job_executor, _ = self._executors()
+        job_executor.submit(self.run, job)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[IngestionJob]:
+        """Most recent jobs first"""
+        return list(reversed(self._jobs.values()))
+
+    def _embed_batches(self, texts: List[str]) -> List[Optional[List[List[float]]]]:
+        """Embed texts in batches, concurrently; a failed batch yields None"""
+        _, embed_executor = self._executors()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        futures = [embed_executor.submit(self.embed, batch) for batch in batches]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"❌ Embedding batch failed: {e}")
+                results.append(None)
+        return results
+
+    def ingest(self, job: IngestionJob, documents: List[Document]):
+        """Chunk, embed and index loaded documents on the calling thread, recording progress on job"""
+        pending = self.index.attach_stored(documents)
+        job.reused_documents += len(documents) - len(pending)
+
+        chunks_by_document = [(document.id, chunk_document(document)) for document in pending]
+        chunks = [chunk for _, document_chunks in chunks_by_document for chunk in document_chunks]
+        job.total_chunks += len(chunks)
+
+        embeddings: List[Optional[List[float]]] = []
+        for batch, result in zip(
+            [chunks[i:i + self.batch_size] for i in range(0, len(chunks), self.batch_size)],
+            self._embed_batches([embedding_text(chunk) for chunk in chunks])
+        ):
+            embeddings.extend(result if result is not None else [None] * len(batch))
+
+        position = 0
+        for document_id, document_chunks in chunks_by_document:
+            vectors = embeddings[position:position + len(document_chunks)]
+            position += len(document_chunks)
+            if any(vector is None for vector in vectors):
+                job.failed_document_ids.append(document_id)
+                self._failed_at[document_id] = time.time()
+                continue
+            self.index.add_embeddings(document_chunks, vectors)
+            job.embedded_chunks += len(document_chunks)
+            self._failed_at.pop(document_id, None)
+
+    def run(self, job: IngestionJob):
+        """Process a job on the calling thread"""
+        job.status = "running"
+        job.started_at = get_local_now()
+        db = self.session_factory()
+        try:
+            for start in range(0, len(job.document_ids), _DOCUMENTS_PER_STEP):
+                step_ids = job.document_ids[start:start + _DOCUMENTS_PER_STEP]
+                documents = db.query(Document).filter(Document.id.in_(step_ids)).all()
+                self.ingest(job, documents)
+                job.processed_documents += len(step_ids)
+            job.status = "failed" if job.failed_document_ids else "completed"
+            if job.failed_document_ids:
+                job.error = f"{len(job.failed_document_ids)} documents could not be embedded"
+            print(f"✅ Ingestion job {job.id}: {job.embedded_chunks} chunks embedded, "
+                  f"{job.reused_documents} documents reused, {len(job.failed_document_ids)} failed")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"❌ Ingestion job {job.id} failed: {e}")
+        finally:
+            db.close()
+            job.finished_at = get_local_now()
+            with self._lock:
+                self._queued_ids.difference_update(job.document_ids)
+            # Look for documents still missing (failed, or added while the job ran) on the next sync
+            self.index.mark_stale()
+        return job
+
+    def shutdown(self):
+        """Stop the worker threads (queued jobs are dropped)"""
+        for executor in (self._job_executor, self._embed_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._job_executor = None
+        self._embed_executor = None
+
+
+# Global ingestion pipeline feeding the global document index
+document_ingestion = DocumentIngestion(document_index)
@@ -0,0 +1,183 @@
+"""
+Shared cache of text embeddings.
+
+Every embedding request from the RAG services and the LLM service goes
+through one cache keyed by (embedding model, sha256 of the text), so the
+same query, a re-added document with identical content or a re-index after
+a restart never pays for the same embedding twice.
+
+Two tiers:
+    memory  LRU of the most recently used vectors (float32 arrays)
+    disk    SQLite table shared by all worker processes and restarts
+
+Only texts missing from both tiers are sent to the embeddings API, deduped
+and in a single request per call.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+CacheKey = Tuple[str, str]  # (model, sha256 of the text)
+
+
+def embedding_key(model: str, text: str) -> CacheKey:
+    return (model, hashlib.sha256(text.encode("utf-8")).hexdigest())
+
+
+class EmbeddingCache:
+    """LRU plus SQLite cache in front of a batch embedding function"""
+
+    def __init__(self, embed: Callable[[List[str]], List[List[float]]], model: str,
+                 max_entries: int = 10000, path: Optional[str] = None, enabled: bool = True):
+        self._embed = embed
+        self.model = model
+        self.max_entries = max_entries
+        self.path = path
+        self.enabled = enabled
+
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[CacheKey, array]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_failed = False
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.api_calls = 0
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite tier on first use; without it the cache is memory-only"""
+        if self._db is not None or self._db_failed or not self.path:
+            return self._db
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, sha256 TEXT NOT NULL, dimensions INTEGER NOT NULL, "
+                "vector BLOB NOT NULL, PRIMARY KEY (model, sha256))"
+            )
+            db.commit()
+            self._db = db
+        except sqlite3.Error as e:
+            print(f"❌ Embedding cache database unavailable, using memory only: {e}")
+            self._db_failed = True
+        return self._db
+
+    def _remember(self, key: CacheKey, vector: array):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, keys: Sequence[CacheKey]) -> Dict[CacheKey, array]:
+        db = self._connection()
+        if db is None or not keys:
+            return {}
+        found = {}
+        try:
+            hashes = [sha256 for _, sha256 in keys]
+            for start in range(0, len(hashes), 500):  # Stay under SQLite's parameter limit
+                chunk = hashes[start:start + 500]
+                rows = db.execute(
+                    f"SELECT sha256, vector FROM embeddings WHERE model = ? AND sha256 IN ({','.join('?' * len(chunk))})",
+                    [self.model, *chunk]
+                ).fetchall()
+                for sha256, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[(self.model, sha256)] = vector
+        except sqlite3.Error as e:
+            print(f"❌ Error reading embedding cache: {e}")
+        return found
+
+    def _save(self, vectors: Dict[CacheKey, array]):
+        db = self._connection()
+        if db is None or not vectors:
+            return
+        try:
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, sha256, dimensions, vector) VALUES (?, ?, ?, ?)",
+                [(model, sha256, len(vector), vector.tobytes()) for (model, sha256), vector in vectors.items()]
+            )
+            db.commit()
+        except sqlite3.Error as e:
+            print(f"❌ Error writing embedding cache: {e}")
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embeddings of texts, in order; only uncached texts reach the embeddings API"""
+        if not self.enabled:
+            self.api_calls += 1
+            return self._embed(list(texts))
+
+        keys = [embedding_key(self.model, text) for text in texts]
+        with self._lock:
+            vectors: Dict[CacheKey, array] = {}
+            for key in keys:
+                if key in self._entries and key not in vectors:
+                    self._entries.move_to_end(key)
+                    vectors[key] = self._entries[key]
+                    self.memory_hits += 1
+
+            uncached = [key for key in dict.fromkeys(keys) if key not in vectors]
+            stored = self._load(uncached)
+            self.disk_hits += len(stored)
+            for key, vector in stored.items():
+                self._remember(key, vector)
+            vectors.update(stored)
+
+        # The API call runs outside the lock so concurrent batches are not serialized
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            embedded = self._embed(list(missing.values()))
+            self.api_calls += 1
+            fresh = {key: array("f", embedding) for key, embedding in zip(missing, embedded)}
+            with self._lock:
+                self.misses += len(fresh)
+                for key, vector in fresh.items():
+                    self._remember(key, vector)
+                self._save(fresh)
+            vectors.update(fresh)
+
+        return [vectors[key].tolist() for key in keys]
+
+    def clear(self):
+        """Drop every cached embedding of this model, in memory and on disk"""
+        with self._lock:
+            self._entries.clear()
+            db = self._connection()
+            if db is not None:
+                try:
+                    db.execute("DELETE FROM embeddings WHERE model = ?", (self.model,))
+                    db.commit()
+                except sqlite3.Error as e:
+                    print(f"❌ Error clearing embedding cache: {e}")
+
+    def stats(self) -> Dict:
+        stored = None
+        with self._lock:
+            db = self._connection()
+            if db is not None:
+                try:
+                    stored = db.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model,)).fetchone()[0]
+                except sqlite3.Error:
+                    stored = None
+            return {
+                "enabled": self.enabled,
+                "model": self.model,
+                "path": self.path,
+                "memory_entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "stored_entries": stored,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "api_calls": self.api_calls
+            }
@@ -0,0 +1,252 @@
+"""
+Persistent, memory-mapped store of document embeddings.
+
+Embeddings are appended as raw float32 rows to one file that is opened with
+numpy.memmap, so every worker process maps the same pages from the OS page
+cache and a restart costs an mmap instead of re-embedding every document.
+A JSON-lines sidecar records which row holds the embedding of which chunk
+of which Document.id, together with a hash of the embedded text: a row is
+reused only while the chunk text is unchanged. Later sidecar lines supersede earlier
+ones; superseded rows are reclaimed by `compact`.
+
+Layout of the store directory:
+    meta.json         embedding model and dimensions
+    embeddings.f32    append-only float32 rows (unit-normalized)
+    embeddings.jsonl  {"document_id", "chunk", "row", "sha256"} per appended row
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process deployments only
+    fcntl = None
+
+META_FILE = "meta.json"
+VECTORS_FILE = "embeddings.f32"
+INDEX_FILE = "embeddings.jsonl"
+LOCK_FILE = ".lock"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Append-only float32 embedding file plus an id/hash sidecar, shared across processes"""
+
+    def __init__(self, directory: str, model: str):
+        self.directory = directory
+        self.model = model
+        self.dimensions: Optional[int] = None
+
+        self._lock = threading.RLock()
+        self._entries: Dict[Tuple[int, int], Tuple[int, str]] = {}  # (document_id, chunk) -> (row, sha256)
+        self._index_offset = 0  # Bytes of the sidecar already read
+        self._vectors: Optional[np.memmap] = None
+        self._opened = False
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize appends between worker processes"""
+        with open(self._path(LOCK_FILE), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def open(self):
+        """Create or map the store; a store built with another embedding model is discarded"""
+        with self._lock:
+            if self._opened:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            with self._file_lock():
+                meta = None
+                if os.path.exists(self._path(META_FILE)):
+                    with open(self._path(META_FILE)) as f:
+                        meta = json.load(f)
+                if meta is None or meta.get("model") != self.model:
+                    if meta is not None:
+                        print(f"Embedding model changed ({meta.get('model')} -> {self.model}), resetting embedding store")
+                    self._reset_files()
+                else:
+                    self.dimensions = meta.get("dimensions")
+            self._opened = True
+            self._reload_locked()
+
+    def _reset_files(self):
+        for name in (VECTORS_FILE, INDEX_FILE):
+            open(self._path(name), "wb").close()
+        self._write_meta(None)
+        self._entries = {}
+        self._index_offset = 0
+        self._vectors = None
+
+    def _write_meta(self, dimensions: Optional[int]):
+        self.dimensions = dimensions
+        with open(self._path(META_FILE), "w") as f:
+            json.dump({"model": self.model, "dimensions": dimensions}, f)
+
+    def _row_bytes(self) -> int:
+        return self.dimensions * np.dtype(np.float32).itemsize
+
+    def _reload_locked(self):
+        """Read sidecar lines appended since the last reload and remap the vectors file"""
+        if self.dimensions is None and os.path.exists(self._path(META_FILE)):
+            with open(self._path(META_FILE)) as f:
+                self.dimensions = json.load(f).get("dimensions")
+
+        with open(self._path(INDEX_FILE), "rb") as f:
+            f.seek(self._index_offset)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]  # Ignore a line that is still being written
+        for line in complete.splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                key = (entry["document_id"], entry.get("chunk", 0))
+                self._entries[key] = (entry["row"], entry["sha256"])
+        self._index_offset += len(complete)
+
+        if self.dimensions:
+            rows = os.path.getsize(self._path(VECTORS_FILE)) // self._row_bytes()
+            if rows and (self._vectors is None or self._vectors.shape[0] != rows):
+                self._vectors = np.memmap(self._path(VECTORS_FILE), dtype=np.float32, mode="r",
+                                          shape=(rows, self.dimensions))
+
+    def reload(self):
+        """Pick up rows appended by other worker processes"""
+        with self._lock:
+            self.open()
+            self._reload_locked()
+
+    @property
+    def vectors(self) -> Optional[np.memmap]:
+        """Read-only (rows, dimensions) view of every stored embedding, live or superseded"""
+        return self._vectors
+
+    def lookup(self, document_id: int, chunk: int, sha256: str) -> Optional[int]:
+        """Row holding the embedding of this chunk text, if stored"""
+        entry = self._entries.get((document_id, chunk))
+        if entry is None or entry[1] != sha256:
+            return None
+        if self._vectors is None or entry[0] >= self._vectors.shape[0]:
+            return None
+        return entry[0]
+
+    def append(self, items: Sequence[Tuple[int, int, str]], vectors: np.ndarray) -> List[int]:
+        """Append (document_id, chunk, sha256) rows and return the row numbers they were written to"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(items) != vectors.shape[0]:
+            raise ValueError("Number of items and vectors differ")
+
+        with self._lock:
+            self.open()
+            with self._file_lock():
+                if self.dimensions is None:
+                    self._write_meta(int(vectors.shape[1]))
+                elif vectors.shape[1] != self.dimensions:
+                    raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store dimension {self.dimensions}")
+
+                with open(self._path(VECTORS_FILE), "r+b") as f:
+                    # Drop a partial row left by an interrupted write so rows stay aligned
+                    first_row = os.fstat(f.fileno()).st_size // self._row_bytes()
+                    f.truncate(first_row * self._row_bytes())
+                    f.seek(0, os.SEEK_END)
+                    f.write(vectors.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                rows = list(range(first_row, first_row + len(items)))
+                with open(self._path(INDEX_FILE), "a") as f:
+                    for (document_id, chunk, sha256), row in zip(items, rows):
+                        f.write(json.dumps({"document_id": document_id, "chunk": chunk, "row": row,
+                                            "sha256": sha256}) + "\n")
+
+            self._reload_locked()
+            return rows
+
+    def compact(self, keep_document_ids: Optional[Sequence[int]] = None) -> int:
+        """Rewrite the store with only the current rows of each (kept) document; returns rows dropped.
+
+        Other workers must reopen the store afterwards (restart them).
+        """
+        with self._lock:
+            self.open()
+            with self._file_lock():
+                self._reload_locked()
+                if self._vectors is None:
+                    return 0
+                keep = set(keep_document_ids) if keep_document_ids is not None else None
+                live = sorted(
+                    (row, key, sha256)
+                    for key, (row, sha256) in self._entries.items()
+                    if keep is None or key[0] in keep
+                )
+                total = self._vectors.shape[0]
+                vectors = np.array(self._vectors[[row for row, _, _ in live]]) if live else None
+
+                tmp_vectors, tmp_index = self._path(VECTORS_FILE + ".tmp"), self._path(INDEX_FILE + ".tmp")
+                with open(tmp_vectors, "wb") as f:
+                    if vectors is not None:
+                        f.write(vectors.tobytes())
+                with open(tmp_index, "w") as f:
+                    for new_row, (_, (document_id, chunk), sha256) in enumerate(live):
+                        f.write(json.dumps({"document_id": document_id, "chunk": chunk, "row": new_row,
+                                            "sha256": sha256}) + "\n")
+
+                self._vectors = None
+                os.replace(tmp_vectors, self._path(VECTORS_FILE))
+                os.replace(tmp_index, self._path(INDEX_FILE))
+                self._entries = {}
+                self._index_offset = 0
+                self._reload_locked()
+                return total - len(live)
+
+    def stats(self) -> Dict:
+        return {
+            "directory": self.directory,
+            "model": self.model,
+            "dimensions": self.dimensions,
+            "rows": int(self._vectors.shape[0]) if self._vectors is not None else 0,
+            "chunks": len(self._entries)
+        }
+
+
+if __name__ == "__main__":
+    from config import EMBEDDING_MODEL, EMBEDDING_STORE_DIRECTORY
+    from database import SessionLocal
+    from models import Document
+
+    parser = argparse.ArgumentParser(description="Maintain the memory-mapped document embedding store")
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument("--directory", default=EMBEDDING_STORE_DIRECTORY, help="Store directory")
+    args = parser.parse_args()
+
+    store = EmbeddingStore(args.directory, EMBEDDING_MODEL)
+    store.open()
+    if args.command == "compact":
+        db = SessionLocal()
+        try:
+            document_ids = [document_id for (document_id,) in db.query(Document.id).all()]
+            dropped = store.compact(document_ids)
+            print(f"✅ Embedding store compacted: {dropped} stale rows dropped (restart workers to remap)")
+        except Exception as e:
+            print(f"❌ Error compacting embedding store: {e}")
+        finally:
+            db.close()
+    print(json.dumps(store.stats(), indent=2))
@@ -0,0 +1,116 @@
+"""
+Entity extraction for chat messages: pain level, temperature, pain location
+and duration.
+
+All patterns are compiled once. Pain locations and durations share a single
+keyword automaton, so each message is scanned once for every keyword instead
+of once per keyword. Messages can be processed in batches, e.g. to re-run
+extraction over historical chat logs:
+
+    python entity_extractor.py chat_log.txt > entities.jsonl
+"""
+
+import json
+import re
+import sys
+from dataclasses import asdict, dataclass
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Optional
+
+from keyword_matcher import GroupedKeywordMatcher
+from text_config import HealthKeywords
+
+PAIN_LEVEL_PATTERN = re.compile(r'(\d+)/10|(\d+)\s*out\s*of\s*10|pain\s*level\s*(\d+)')
+TEMPERATURE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*°?[fF]|(\d+(?:\.\d+)?)\s*degrees')
+
+
+@dataclass(frozen=True)
+class ExtractedEntities:
+    """Entities found in a single message; None means not mentioned"""
+    pain_level: Optional[int] = None
+    pain_level_text: Optional[str] = None
+    temperature: Optional[float] = None
+    temperature_text: Optional[str] = None
+    pain_location: Optional[str] = None
+    duration: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class EntityExtractor:
+    """Reusable extractor with precompiled patterns and keyword automaton"""
+
+    PAIN_LOCATION = "pain_location"
+    DURATION = "duration"
+
+    def __init__(self, pain_locations: Optional[Dict[str, List[str]]] = None,
+                 duration_keywords: Optional[Dict[str, List[str]]] = None):
+        pain_locations = pain_locations if pain_locations is not None else HealthKeywords.PAIN_LOCATIONS
+        duration_keywords = duration_keywords if duration_keywords is not None else HealthKeywords.DURATION_KEYWORDS
+
+        # Dictionary order decides precedence, as in the original keyword loops
+        self._labels = {
+            self.PAIN_LOCATION: list(pain_locations),
+            self.DURATION: list(duration_keywords)
+        }
+        self._matcher = GroupedKeywordMatcher(
+            (keyword, group, rank)
+            for group, mapping in ((self.PAIN_LOCATION, pain_locations), (self.DURATION, duration_keywords))
+            for rank, keywords in enumerate(mapping.values())
+            for keyword in keywords
+        )
+
+    def extract(self, text: str) -> ExtractedEntities:
+        """Extract all entities from one message"""
+        text_lower = text.lower()
+
+        pain_level_text = None
+        pain_match = PAIN_LEVEL_PATTERN.search(text_lower)
+        if pain_match:
+            pain_level_text = pain_match.group(1) or pain_match.group(2) or pain_match.group(3)
+
+        temperature_text = None
+        temp_match = TEMPERATURE_PATTERN.search(text_lower)
+        if temp_match:
+            temperature_text = temp_match.group(1) or temp_match.group(2)
+
+        ranks = self._matcher.best_ranks(text_lower)
+        location_rank = ranks.get(self.PAIN_LOCATION)
+        duration_rank = ranks.get(self.DURATION)
+
+        return ExtractedEntities(
+            pain_level=int(pain_level_text) if pain_level_text else None,
+            pain_level_text=pain_level_text,
+            temperature=float(temperature_text) if temperature_text else None,
+            temperature_text=temperature_text,
+            pain_location=self._labels[self.PAIN_LOCATION][location_rank] if location_rank is not None else None,
+            duration=self._labels[self.DURATION][duration_rank] if duration_rank is not None else None
+        )
+
+    def extract_batch(self, messages: Iterable[str], processes: int = 1,
+                      chunksize: int = 512) -> List[ExtractedEntities]:
+        """Extract entities from many messages, optionally across worker processes"""
+        if processes <= 1:
+            extract = self.extract
+            return [extract(message) for message in messages]
+
+        with Pool(processes) as pool:
+            return pool.map(self.extract, list(messages), chunksize)
+
+
+# Global entity extractor instance
+entity_extractor = EntityExtractor()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python entity_extractor.py <messages.txt> [processes]")
+        sys.exit(1)
+
+    with open(sys.argv[1], encoding="utf-8") as log_file:
+        messages = [line.rstrip("\n") for line in log_file]
+
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    for message, entities in zip(messages, entity_extractor.extract_batch(messages, processes)):
+        print(json.dumps({"message": message, **entities.to_dict()}))
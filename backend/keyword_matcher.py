@@ -0,0 +1,161 @@
+"""
+Aho-Corasick keyword automata used by the chatbot fallback path.
+
+Both matchers keep the substring semantics of `keyword in text`, including
+overlapping keywords, but find every keyword in a single pass over the text.
+"""
+
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class _Automaton(ABC):
+    """Trie with failure links; subclasses decide what each state outputs"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+
+    def _insert(self, keyword: str) -> int:
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._add_state()
+                self._goto[state][char] = next_state
+            state = next_state
+        return state
+
+    @abstractmethod
+    def _add_state(self):
+        """Grow the per-state output storage by one state"""
+
+    @abstractmethod
+    def _inherit(self, state: int, fail_state: int):
+        """Merge the outputs of the failure target into state"""
+
+    def _build_failure_links(self):
+        # Breadth-first so a state's failure target is finalised before it
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                link = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = link if link != next_state else 0
+                self._inherit(next_state, self._fail[next_state])
+
+
+class KeywordMatcher(_Automaton):
+    """Aho-Corasick automaton mapping keywords to a rank.
+
+    A single pass over the text finds every keyword occurrence and keeps the
+    lowest rank seen, which is the same winner as checking each ranked
+    keyword list in order with `keyword in text`.
+    """
+
+    def __init__(self, keyword_ranks: Iterable[Tuple[str, int]]):
+        super().__init__()
+        self._rank: List[Optional[int]] = [None]
+
+        for keyword, rank in keyword_ranks:
+            state = self._insert(keyword)
+            current = self._rank[state]
+            if current is None or rank < current:
+                self._rank[state] = rank
+
+        self._build_failure_links()
+
+    def _add_state(self):
+        self._rank.append(None)
+
+    def _inherit(self, state: int, fail_state: int):
+        inherited = self._rank[fail_state]
+        own = self._rank[state]
+        if inherited is not None and (own is None or inherited < own):
+            self._rank[state] = inherited
+
+    def best_rank(self, text: str) -> Optional[int]:
+        """Return the lowest rank of any keyword found in text, or None"""
+        goto = self._goto
+        fail = self._fail
+        ranks = self._rank
+
+        # Empty keywords (e.g. a trailing comma) match every text
+        best = ranks[0]
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            rank = ranks[state]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+                if best == 0:
+                    break
+        return best
+
+
+class GroupedKeywordMatcher(_Automaton):
+    """Aho-Corasick automaton over several independent ranked keyword groups.
+
+    best_ranks returns, for every group with a match, the lowest rank found,
+    so several `for label, keywords in ...: if any(k in text ...)` loops can
+    share one pass over the text.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, Hashable, int]]):
+        super().__init__()
+        self._outputs: List[Optional[Dict[Hashable, int]]] = [None]
+
+        for keyword, group, rank in keywords:
+            state = self._insert(keyword)
+            outputs = self._outputs[state]
+            if outputs is None:
+                outputs = self._outputs[state] = {}
+            if group not in outputs or rank < outputs[group]:
+                outputs[group] = rank
+
+        self._build_failure_links()
+
+    def _add_state(self):
+        self._outputs.append(None)
+
+    def _inherit(self, state: int, fail_state: int):
+        inherited = self._outputs[fail_state]
+        if not inherited:
+            return
+        outputs = self._outputs[state]
+        if outputs is None:
+            self._outputs[state] = dict(inherited)
+            return
+        for group, rank in inherited.items():
+            if group not in outputs or rank < outputs[group]:
+                outputs[group] = rank
+
+    def best_ranks(self, text: str) -> Dict[Hashable, int]:
+        """Return {group: lowest matched rank} for every group found in text"""
+        goto = self._goto
+        fail = self._fail
+        all_outputs = self._outputs
+
+        best: Dict[Hashable, int] = dict(all_outputs[0] or {})
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            outputs = all_outputs[state]
+            if outputs:
+                for group, rank in outputs.items():
+                    current = best.get(group)
+                    if current is None or rank < current:
+                        best[group] = rank
+        return best
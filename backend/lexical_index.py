@@ -0,0 +1,227 @@
+"""
+In-process BM25 index over the Document table.
+
+Lexical retrieval needs no embeddings API, so chat answers stay grounded in
+/add-doc documents when OPENAI_API_KEY is unset or the embeddings call
+fails. The index covers the same chunks as the vector index (document_index)
+and keeps, per term, a postings list of {chunk: term frequency}; the BM25
+length normalization of every chunk is precomputed and only recomputed after
+the index changes.
+
+With embeddings available, `reciprocal_rank_fusion` merges the vector and
+BM25 rankings into one list.
+"""
+
+import math
+import re
+import threading
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from config import RAG_TOP_K
+from document_index import ChunkKey, chunk_document, embedding_text
+from model_watch import watch_model
+from models import Document
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in is it its me my "
+    "of on or our so that the their there this to was we what when where which who why will "
+    "with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords; plurals are folded to the singular"""
+    tokens = []
+    for token in _TOKEN.findall((text or "").lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Dict]], k: int = 60,
+                           top_k: Optional[int] = None) -> List[Dict]:
+    """Merge ranked hit lists: each chunk scores sum(1 / (k + rank)) over the lists it is in"""
+    scores: Dict[ChunkKey, float] = {}
+    hits: Dict[ChunkKey, Dict] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            key = (hit["metadata"]["document_id"], hit["metadata"].get("chunk", 0))
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            hits.setdefault(key, hit)
+    fused = sorted(scores, key=scores.get, reverse=True)
+    if top_k is not None:
+        fused = fused[:top_k]
+    return [{**hits[key], "score": scores[key]} for key in fused]
+
+
+class BM25Index:
+    """Inverted index of document chunks scored with Okapi BM25"""
+
+    def __init__(self, top_k: int = RAG_TOP_K, k1: float = 1.5, b: float = 0.75):
+        self.top_k = top_k
+        self.k1 = k1
+        self.b = b
+
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[ChunkKey, int]] = {}
+        self._terms: Dict[ChunkKey, Dict[str, int]] = {}  # Term frequencies of each chunk, for removal
+        self._lengths: Dict[ChunkKey, int] = {}
+        self._total_length = 0
+        self._chunks: Dict[ChunkKey, Dict] = {}
+        self._keys_of_document: Dict[int, List[ChunkKey]] = {}
+        self._norms: Optional[Dict[ChunkKey, float]] = None  # k1 * (1 - b + b * length / avgdl)
+        self._stale = True
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    @property
+    def document_count(self) -> int:
+        return len(self._keys_of_document)
+
+    def add_chunks(self, chunks: Sequence[Dict]):
+        """Index chunk dicts (see document_index.chunk_document), replacing earlier chunks of their documents"""
+        with self._lock:
+            self._remove_documents_locked({chunk["id"] for chunk in chunks})
+            for chunk in chunks:
+                key = (chunk["id"], chunk["chunk"])
+                frequencies: Dict[str, int] = {}
+                tokens = tokenize(embedding_text(chunk))
+                for token in tokens:
+                    frequencies[token] = frequencies.get(token, 0) + 1
+                for term, frequency in frequencies.items():
+                    self._postings.setdefault(term, {})[key] = frequency
+                self._terms[key] = frequencies
+                self._lengths[key] = len(tokens)
+                self._total_length += len(tokens)
+                self._chunks[key] = dict(chunk)
+                self._keys_of_document.setdefault(chunk["id"], []).append(key)
+            self._norms = None
+
+    def add_documents(self, documents):
+        for document in documents:
+            self.add_chunks(chunk_document(document))
+
+    def _remove_documents_locked(self, document_ids):
+        for document_id in document_ids:
+            for key in self._keys_of_document.pop(document_id, ()):
+                for term in self._terms.pop(key):
+                    postings = self._postings[term]
+                    del postings[key]
+                    if not postings:
+                        del self._postings[term]
+                self._total_length -= self._lengths.pop(key)
+                del self._chunks[key]
+                self._norms = None
+
+    def remove(self, document_ids):
+        with self._lock:
+            self._remove_documents_locked(document_ids)
+
+    def clear(self):
+        """Drop every chunk; the next sync re-reads the whole Document table"""
+        with self._lock:
+            self._postings = {}
+            self._terms = {}
+            self._lengths = {}
+            self._total_length = 0
+            self._chunks = {}
+            self._keys_of_document = {}
+            self._norms = None
+            self._stale = True
+
+    def mark_stale(self, document_ids=()):
+        """Drop chunks of changed documents and re-read them on the next sync"""
+        with self._lock:
+            self._remove_documents_locked(document_ids)
+            self._stale = True
+
+    def sync(self, db: Session):
+        """Index Document rows that are not indexed yet (no network involved)"""
+        if not self._stale:
+            return
+        with self._lock:
+            if not self._stale:
+                return
+            indexed = set(self._keys_of_document)
+            missing_ids = [doc_id for (doc_id,) in db.query(Document.id).all() if doc_id not in indexed]
+            if missing_ids:
+                self.add_documents(db.query(Document).filter(Document.id.in_(missing_ids)).all())
+            self._stale = False
+
+    def _length_norms(self) -> Dict[ChunkKey, float]:
+        if self._norms is None:
+            average = self._total_length / len(self._lengths) if self._lengths else 0
+            self._norms = {
+                key: self.k1 * (1 - self.b + self.b * (length / average if average else 0))
+                for key, length in self._lengths.items()
+            }
+        return self._norms
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Dict]:
+        """Top-k chunks by BM25 score, in the retrieved_docs format the LLM prompt expects"""
+        k = self.top_k if k is None else k
+        terms = set(tokenize(query))
+        if k <= 0 or not terms:
+            return []
+
+        with self._lock:
+            count = len(self._chunks)
+            if count == 0:
+                return []
+            norms = self._length_norms()
+            scores: Dict[ChunkKey, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norms[key])
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            hits = [(self._chunks[key], score) for key, score in top]
+
+        return [
+            {
+                "content": chunk["content"],
+                "metadata": {"title": chunk["title"], "type": chunk["type"], "document_id": chunk["id"],
+                             "chunk": chunk["chunk"]},
+                "score": score
+            }
+            for chunk, score in hits
+        ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "documents": self.document_count,
+                "chunks": len(self._chunks),
+                "terms": len(self._postings),
+                "average_chunk_tokens": self._total_length / len(self._lengths) if self._lengths else 0,
+                "stale": self._stale
+            }
+
+
+# Global lexical index instance
+lexical_index = BM25Index()
+
+
+# =============================================================================
+# INVALIDATION HOOKS
+# =============================================================================
+
+
+def _apply_document_changes(changed):
+    if changed is None:
+        lexical_index.clear()
+    else:
+        lexical_index.mark_stale(changed)
+
+
+watch_model(Document, _apply_document_changes)
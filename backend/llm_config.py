@@ -3,18 +3,60 @@ Configuration for different LLM providers including LLaMA via Ollama/LM Studio
 """
 
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from enum import Enum
+from text_config import DefaultValues
 
 class LLMProvider(Enum):
     OPENAI = "openai"
-    HUGGINGFACE = "huggingface"
+    OLLAMA = "ollama"  # Any local OpenAI-compatible server (Ollama, LM Studio, llama.cpp)
+    STUB = "stub"  # Canned local answers, for tests and offline development
 
 class LLMConfig:
     def __init__(self):
         self.provider = os.getenv("LLM_PROVIDER", "openai").lower()
         self.fallback_enabled = os.getenv("LLM_FALLBACK_ENABLED", "true").lower() == "true"
         
+        # Shared HTTP client settings for the async provider path
+        self.connect_timeout = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+        self.read_timeout = float(os.getenv("LLM_READ_TIMEOUT", "30"))
+        self.max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        self.max_keepalive_connections = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "10"))  # In-flight completions per process
+        
+        # Speculative fallback: build the questionnaire answer while the LLM is running
+        self.speculative_fallback = os.getenv("LLM_SPECULATIVE_FALLBACK", "false").lower() == "true"
+        self.latency_budget_ms = int(os.getenv("LLM_LATENCY_BUDGET_MS", "0"))  # 0 disables the budget
+        
+        # Response cache for repeated chat questions
+        self.response_cache_enabled = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+        self.response_cache_ttl_seconds = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+        self.response_cache_max_entries = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+        self.response_cache_max_mb = float(os.getenv("RESPONSE_CACHE_MAX_MB", "16"))
+        # Cosine similarity for the embedding tier; 0 disables it (exact matches only)
+        self.response_cache_similarity_threshold = float(os.getenv("RESPONSE_CACHE_SIMILARITY_THRESHOLD", "0"))
+        
+        # Embedding cache keyed by (model, text hash), shared by every RAG service
+        self.embedding_cache_enabled = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+        self.embedding_cache_max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000"))
+        self.embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.db")  # Empty: memory only
+        
+        # Prompt size: tokens for patient, doctor and retrieved document context per request
+        self.prompt_context_tokens = int(os.getenv("LLM_PROMPT_CONTEXT_TOKENS", "1200"))
+        self.prompt_min_chunk_tokens = int(os.getenv("LLM_PROMPT_MIN_CHUNK_TOKENS", "40"))  # Smaller cuts are dropped
+        self.prompt_history_tokens = int(os.getenv("LLM_PROMPT_HISTORY_TOKENS", "300"))  # Recent chat turns
+        
+        # Routing: providers tried per request (comma-separated; empty means LLM_PROVIDER, then openai unless stub)
+        self.providers = os.getenv("LLM_PROVIDERS", "")
+        self.latency_window = int(os.getenv("LLM_LATENCY_WINDOW", "100"))  # Recent calls kept per provider
+        self.breaker_failure_threshold = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+        self.breaker_cooldown_seconds = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+        
+        # Hedging: duplicate a call still running after the provider's p95 latency (async chat path)
+        self.hedging_enabled = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+        self.hedge_budget_percent = float(os.getenv("LLM_HEDGE_BUDGET_PERCENT", "5"))  # Max share of calls hedged
+        self.hedge_min_samples = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))  # Calls measured before hedging
+        
         # Provider-specific configurations
         self.configs = {
             LLMProvider.OPENAI: {
@@ -24,6 +66,21 @@ class LLMConfig:
                 "embedding_model": os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
                 "max_tokens": int(os.getenv("OPENAI_MAX_TOKENS", "500")),
                 "temperature": float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+            },
+            LLMProvider.OLLAMA: {
+                "api_key": os.getenv("OLLAMA_API_KEY", "ollama"),  # Ignored by Ollama but required by the client
+                "base_url": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1"),
+                "model": os.getenv("OLLAMA_MODEL", "llama3.2"),
+                "max_tokens": int(os.getenv("OLLAMA_MAX_TOKENS", "500")),
+                "temperature": float(os.getenv("OLLAMA_TEMPERATURE", "0.7"))
+            },
+            LLMProvider.STUB: {
+                "response": os.getenv("LLM_STUB_RESPONSE", DefaultValues.STUB_RESPONSE),
+                "confidence": os.getenv("LLM_STUB_CONFIDENCE", "0.8"),  # "0.8", a "0.4:0.9" range, or empty for none
+                "latency": os.getenv("LLM_STUB_LATENCY_MS", "fixed:0"),  # See mock_llm.py for distributions
+                "token_delay_ms": float(os.getenv("LLM_STUB_TOKEN_DELAY_MS", "0")),
+                "error_rate": float(os.getenv("LLM_STUB_ERROR_RATE", "0")),
+                "seed": int(os.getenv("LLM_STUB_SEED", "0"))
             }
         }
     
@@ -38,6 +95,21 @@ class LLMConfig:
         except ValueError:
             return LLMProvider.OPENAI
     
+    def get_routing_providers(self) -> List[LLMProvider]:
+        """Providers the router may send a request to, in order of preference"""
+        providers = []
+        for name in self.providers.split(","):
+            try:
+                providers.append(LLMProvider(name.strip().lower()))
+            except ValueError:
+                if name.strip():
+                    print(f"⚠️ Unknown LLM provider in LLM_PROVIDERS: {name.strip()}")
+        if not providers:
+            # The stub never falls back to OpenAI, so load tests cannot spend API quota
+            current = self.get_current_provider()
+            providers = [current] if current == LLMProvider.STUB else [current, LLMProvider.OPENAI]
+        return list(dict.fromkeys(providers))
+    
     def is_provider_available(self, provider: LLMProvider) -> bool:
         """Check if a provider is properly configured"""
         config = self.get_config(provider)
@@ -45,7 +117,10 @@ class LLMConfig:
         if provider == LLMProvider.OPENAI:
             return bool(config.get("api_key") and config["api_key"] != "your_openai_api_key_here")
         
-        return False
+        if provider == LLMProvider.OLLAMA:
+            return bool(config.get("base_url") and config.get("model"))
+        
+        return provider == LLMProvider.STUB
 
 # Global configuration instance
 llm_config = LLMConfig()
@@ -0,0 +1,232 @@
+"""
+Latency-aware routing across LLM providers with per-provider circuit breakers.
+
+Each provider keeps a rolling window of its recent calls (latency and
+outcome). Requests go to the healthy provider with the lowest p50 latency;
+providers without samples yet are tried first so every provider gets
+measured. After a run of consecutive failures a provider's breaker opens
+and it is skipped outright, so requests no longer wait out its timeouts.
+Once the cooldown has passed one trial request is let through (half-open):
+success closes the breaker, failure opens it for another cooldown.
+
+HedgeBudget caps how many slow calls LLMService duplicates (hedges).
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """Rolling latency and error window plus the circuit breaker of one provider"""
+
+    def __init__(self, window: int, failure_threshold: int, cooldown_seconds: float, clock: Callable[[], float]):
+        self.latencies = deque(maxlen=window)  # Seconds, successful calls only
+        self.outcomes = deque(maxlen=window)  # True for success
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.rejected = 0  # Requests that skipped this provider because its breaker was open
+
+    def _cooled_down(self) -> bool:
+        return self.clock() - self.opened_at >= self.cooldown_seconds
+
+    def is_available(self) -> bool:
+        """Whether a request could be sent now (does not claim the half-open trial)"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self._cooled_down()
+        return not self.trial_in_flight
+
+    def acquire(self) -> bool:
+        """Claim permission to send one request"""
+        if self.state == OPEN and self._cooled_down():
+            self.state = HALF_OPEN
+            self.trial_in_flight = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = self.clock()
+        self.trial_in_flight = False
+
+    def release(self):
+        """The request was cancelled before an outcome: free the half-open trial"""
+        self.trial_in_flight = False
+
+    def record_lower_bound(self, latency: float):
+        """A call abandoned after latency seconds (it would have taken at least that long)"""
+        self.latencies.append(latency)
+
+    def percentile(self, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """Latency percentile in seconds over the window, None with fewer than min_samples successes"""
+        if len(self.latencies) < max(1, min_samples):
+            return None
+        # Linear interpolation between the closest ranks
+        ordered = sorted(self.latencies)
+        position = (len(ordered) - 1) * percentile / 100
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    def stats(self) -> Dict:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "state": self.state,
+            "calls": len(self.outcomes),
+            "error_rate": round(self.error_rate(), 4),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected": self.rejected
+        }
+
+
+class LLMRouter:
+    """Orders providers by observed latency and keeps dead ones out of the path"""
+
+    def __init__(self, window: int = 100, failure_threshold: int = 3, cooldown_seconds: float = 30,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self._health: Dict = {}
+        self._lock = threading.Lock()  # Sync requests record outcomes from worker threads
+
+    def _get_health(self, provider) -> ProviderHealth:
+        health = self._health.get(provider)
+        if health is None:
+            health = ProviderHealth(self.window, self.failure_threshold, self.cooldown_seconds, self.clock)
+            self._health[provider] = health
+        return health
+
+    def route(self, providers: Sequence) -> List:
+        """Providers worth trying, fastest first; unmeasured ones first in their given order"""
+        with self._lock:
+            ranked = []
+            for position, provider in enumerate(providers):
+                health = self._get_health(provider)
+                if not health.is_available():
+                    health.rejected += 1
+                    continue
+                p50 = health.percentile(50)
+                ranked.append((p50 is not None, p50 or 0.0, position, provider))
+        return [provider for _, _, _, provider in sorted(ranked, key=lambda item: item[:3])]
+
+    def acquire(self, provider) -> bool:
+        """Claim a call slot right before sending; False when the breaker opened meanwhile"""
+        with self._lock:
+            return self._get_health(provider).acquire()
+
+    def record_success(self, provider, latency: float):
+        with self._lock:
+            self._get_health(provider).record_success(latency)
+
+    def record_failure(self, provider):
+        with self._lock:
+            health = self._get_health(provider)
+            was_open = health.state == OPEN
+            health.record_failure()
+            if health.state == OPEN and not was_open:
+                print(f"⚠️ Circuit breaker opened for {getattr(provider, 'value', provider)} "
+                      f"after {health.consecutive_failures} failures")
+
+    def release(self, provider):
+        with self._lock:
+            self._get_health(provider).release()
+
+    def record_lower_bound(self, provider, latency: float):
+        """Keep slow calls that were cancelled (e.g. by a winning hedge) in the latency window"""
+        with self._lock:
+            self._get_health(provider).record_lower_bound(latency)
+
+    def latency_percentile(self, provider, percentile: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            return self._get_health(provider).percentile(percentile, min_samples)
+
+    def reset(self):
+        with self._lock:
+            self._health.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {getattr(provider, "value", provider): health.stats() for provider, health in self._health.items()}
+
+
+class HedgeBudget:
+    """Token bucket capping hedged calls at a percentage of calls.
+
+    Every call adds percent / 100 of a token (up to burst tokens) and a hedge
+    spends one, so hedges stay within budget even when a provider slows down
+    for everyone at once. Used from the event loop only.
+    """
+
+    def __init__(self, percent: float = 5, burst: float = 10):
+        self.ratio = max(0.0, percent) / 100
+        self.burst = burst
+        self.tokens = 0.0
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+
+    def record_request(self):
+        self.requests += 1
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def allow(self) -> bool:
+        return self.tokens >= 1
+
+    def record_hedge(self):
+        self.tokens -= 1
+        self.hedges += 1
+
+    def record_win(self, hedge_won: bool):
+        if hedge_won:
+            self.hedge_wins += 1
+        else:
+            self.primary_wins += 1
+
+    def stats(self) -> Dict:
+        decided = self.hedge_wins + self.primary_wins
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_rate": round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "primary_wins": self.primary_wins,
+            "hedge_win_rate": round(self.hedge_wins / decided, 4) if decided else 0.0,
+            "budget_percent": self.ratio * 100
+        }
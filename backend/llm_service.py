@@ -2,18 +2,159 @@
 Unified LLM service supporting multiple providers including LLaMA via Ollama/LM Studio
 """
 
-import requests
+import asyncio
 import json
 import time
-from typing import List, Dict, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+import httpx
 from llm_config import llm_config, LLMProvider
-from text_config import AIPrompts, ContextLabels, DefaultValues, ConfidencePatterns
+from llm_router import HedgeBudget, LLMRouter
+from mock_llm import MockLLM
+from prompt_builder import PromptBuilder
+from response_cache import ResponseCache, register_cache
+from embedding_cache import EmbeddingCache
+from text_config import DefaultValues, ConfidencePatterns
 import re
 
 class LLMService:
     def __init__(self):
         self.config = llm_config
         self.current_provider = self.config.get_current_provider()
+        
+        # Clients are created on first use (one per OpenAI-compatible provider) and shared by every request
+        self._openai_clients: Dict[LLMProvider, object] = {}
+        self._async_openai_clients: Dict[LLMProvider, object] = {}
+        self._async_http_client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._mock_llm: Optional[MockLLM] = None
+        
+        # Sends each request to the fastest healthy provider; skips providers whose breaker is open
+        self.router = LLMRouter(
+            window=self.config.latency_window,
+            failure_threshold=self.config.breaker_failure_threshold,
+            cooldown_seconds=self.config.breaker_cooldown_seconds
+        )
+        
+        # Compact context within a token budget; chunks are kept in relevance order
+        self.prompt_builder = PromptBuilder(
+            context_budget_tokens=self.config.prompt_context_tokens,
+            history_budget_tokens=self.config.prompt_history_tokens,
+            min_chunk_tokens=self.config.prompt_min_chunk_tokens,
+            model=self.config.get_config(LLMProvider.OPENAI)["model"]
+        )
+        
+        # Duplicate requests for slow completions, capped at a share of traffic
+        self.hedge_budget = HedgeBudget(percent=self.config.hedge_budget_percent)
+        
+        # Embeddings of texts seen before are never requested again, across restarts
+        self.embedding_cache = EmbeddingCache(
+            embed=self._request_embeddings,
+            model=self.config.get_config(LLMProvider.OPENAI)["embedding_model"],
+            max_entries=self.config.embedding_cache_max_entries,
+            path=self.config.embedding_cache_path,
+            enabled=self.config.embedding_cache_enabled
+        )
+        
+        # Answers to repeated questions; cleared when questionnaires or documents change
+        self.response_cache = register_cache(ResponseCache(
+            max_entries=self.config.response_cache_max_entries,
+            max_bytes=int(self.config.response_cache_max_mb * 1024 * 1024),
+            ttl_seconds=self.config.response_cache_ttl_seconds,
+            similarity_threshold=self.config.response_cache_similarity_threshold,
+            embed=self._embed_query,
+            enabled=self.config.response_cache_enabled
+        ))
+    
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            self.config.read_timeout,
+            connect=self.config.connect_timeout
+        )
+    
+    def _get_openai_client(self, provider: LLMProvider = LLMProvider.OPENAI):
+        """Shared synchronous client of an OpenAI-compatible provider (keeps the API key off the global module)"""
+        if provider not in self._openai_clients:
+            import openai
+            config = self.config.get_config(provider)
+            self._openai_clients[provider] = openai.OpenAI(
+                api_key=config.get("api_key"),
+                base_url=config.get("base_url"),
+                timeout=self._timeout()
+            )
+        return self._openai_clients[provider]
+    
+    def _get_async_openai_client(self, provider: LLMProvider = LLMProvider.OPENAI):
+        """Shared AsyncOpenAI client of a provider; every provider uses one pooled httpx.AsyncClient"""
+        if provider not in self._async_openai_clients:
+            import openai
+            config = self.config.get_config(provider)
+            if self._async_http_client is None:
+                self._async_http_client = httpx.AsyncClient(
+                    timeout=self._timeout(),
+                    limits=httpx.Limits(
+                        max_connections=self.config.max_connections,
+                        max_keepalive_connections=self.config.max_keepalive_connections
+                    )
+                )
+            self._async_openai_clients[provider] = openai.AsyncOpenAI(
+                api_key=config.get("api_key"),
+                base_url=config.get("base_url"),
+                http_client=self._async_http_client,
+                timeout=self._timeout()
+            )
+        return self._async_openai_clients[provider]
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Bounds the number of completions in flight at once"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        return self._semaphore
+    
+    async def aclose(self):
+        """Close the pooled async HTTP client (called on application shutdown)"""
+        if self._async_http_client is not None:
+            await self._async_http_client.aclose()
+        self._async_http_client = None
+        self._async_openai_clients = {}
+        self._semaphore = None
+    
+    def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts in one API request (order preserved)"""
+        config = self.config.get_config(LLMProvider.OPENAI)
+        response = self._get_openai_client().embeddings.create(
+            model=config["embedding_model"],
+            input=texts
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts, requesting only those not in the embedding cache"""
+        return self.embedding_cache.embed(texts)
+    
+    def _embed_query(self, text: str) -> List[float]:
+        """Embedding used by the response cache's similarity tier"""
+        return self.embed_texts([text])[0]
+    
+    async def _aget_cached_response(self, query, patient_context, doctor_context, retrieved_docs, history=None):
+        """Cache lookup off the event loop when it may need an embedding call"""
+        if history:
+            return None  # Follow-up answers depend on the conversation
+        if self.response_cache.semantic_enabled:
+            return await asyncio.to_thread(
+                self.response_cache.get, query, patient_context, doctor_context, retrieved_docs
+            )
+        return self.response_cache.get(query, patient_context, doctor_context, retrieved_docs)
+    
+    async def _aput_cached_response(self, query, response, confidence, patient_context, doctor_context, retrieved_docs,
+                                    history=None):
+        if history:
+            return
+        if self.response_cache.semantic_enabled:
+            await asyncio.to_thread(
+                self.response_cache.put, query, response, confidence, patient_context, doctor_context, retrieved_docs
+            )
+        else:
+            self.response_cache.put(query, response, confidence, patient_context, doctor_context, retrieved_docs)
     
     def get_available_providers(self) -> List[LLMProvider]:
         """Get list of available providers"""
@@ -26,61 +167,68 @@ class LLMService:
     def test_provider_connection(self, provider: LLMProvider) -> bool:
         """Test if a provider is reachable"""
         try:
+            if provider == LLMProvider.STUB:
+                return True
+            
             config = self.config.get_config(provider)
             base_url = config.get("base_url")
             
             if not base_url:
                 return False
             
-            # Test connection
-            if provider == LLMProvider.OPENAI:
-                # Test OpenAI connection
-                import openai
-                openai.api_key = config.get("api_key")
-                response = openai.models.list()
-                return True
-            else:
-                # Test Ollama/LM Studio connection
-                response = requests.get(f"{base_url}/api/tags", timeout=5)
-                return response.status_code == 200
+            # OpenAI, Ollama and LM Studio all serve the OpenAI models endpoint
+            self._get_openai_client(provider).models.list()
+            return True
                 
         except Exception as e:
             print(f"Connection test failed for {provider.value}: {e}")
             return False
     
+    def _providers_to_try(self) -> List[LLMProvider]:
+        """Configured providers in routing order, without those whose circuit breaker is open"""
+        configured = [
+            provider for provider in self.config.get_routing_providers()
+            if self.config.is_provider_available(provider)
+        ]
+        return self.router.route(configured)
+    
     def generate_response_with_confidence(
         self, 
         query: str, 
         patient_context: Optional[Dict] = None,
         doctor_context: Optional[Dict] = None,
-        retrieved_docs: List[Dict] = None
+        retrieved_docs: List[Dict] = None,
+        history: Optional[List[Dict]] = None
     ) -> Tuple[str, float]:
         """Generate response with confidence scoring using the best available provider"""
         
-        # Try providers in order of preference
-        providers_to_try = [
-            self.current_provider,
-            LLMProvider.OPENAI
-        ]
-        
-        # Remove duplicates while preserving order
-        providers_to_try = list(dict.fromkeys(providers_to_try))
+        # Follow-up answers depend on the conversation, so only first turns are cached
+        cached = None if history else self.response_cache.get(query, patient_context, doctor_context, retrieved_docs)
+        if cached:
+            print("✅ Response cache hit")
+            return cached
         
         last_error = None
         
-        for provider in providers_to_try:
-            if not self.config.is_provider_available(provider):
+        # Fastest healthy provider first; a provider whose breaker is open is not tried at all
+        for provider in self._providers_to_try():
+            if not self.router.acquire(provider):
                 continue
                 
+            started = time.perf_counter()
             try:
                 print(f"Trying {provider.value}...")
                 response, confidence = self._generate_with_provider(
-                    provider, query, patient_context, doctor_context, retrieved_docs
+                    provider, query, patient_context, doctor_context, retrieved_docs, history
                 )
+                self.router.record_success(provider, time.perf_counter() - started)
                 print(f"✅ Success with {provider.value}")
+                if not history:
+                    self.response_cache.put(query, response, confidence, patient_context, doctor_context, retrieved_docs)
                 return response, confidence
                 
             except Exception as e:
+                self.router.record_failure(provider)
                 print(f"❌ {provider.value} failed: {e}")
                 last_error = e
                 continue
@@ -91,52 +239,288 @@ class LLMService:
         else:
             raise Exception("No LLM providers are available")
     
+    async def agenerate_response_with_confidence(
+        self,
+        query: str,
+        patient_context: Optional[Dict] = None,
+        doctor_context: Optional[Dict] = None,
+        retrieved_docs: List[Dict] = None,
+        history: Optional[List[Dict]] = None
+    ) -> Tuple[str, float]:
+        """Async version of generate_response_with_confidence; never blocks the event loop"""
+        
+        cached = await self._aget_cached_response(query, patient_context, doctor_context, retrieved_docs, history)
+        if cached:
+            print("✅ Response cache hit")
+            return cached
+        
+        last_error = None
+        providers = self._providers_to_try()
+        
+        for provider in providers:
+            if not self.router.acquire(provider):
+                continue
+                
+            try:
+                print(f"Trying {provider.value}...")
+                response, confidence = await self._agenerate_hedged(
+                    provider, providers, query, patient_context, doctor_context, retrieved_docs, history
+                )
+                await self._aput_cached_response(
+                    query, response, confidence, patient_context, doctor_context, retrieved_docs, history
+                )
+                return response, confidence
+                
+            except asyncio.CancelledError:
+                # Client went away; stop instead of trying the next provider
+                raise
+            except Exception as e:
+                print(f"❌ {provider.value} failed: {e}")
+                last_error = e
+                continue
+        
+        if last_error:
+            raise last_error
+        else:
+            raise Exception("No LLM providers are available")
+    
+    async def _arouted_call(
+        self,
+        provider: LLMProvider,
+        query: str,
+        patient_context: Optional[Dict] = None,
+        doctor_context: Optional[Dict] = None,
+        retrieved_docs: List[Dict] = None,
+        history: Optional[List[Dict]] = None
+    ) -> Tuple[str, float]:
+        """One call to a provider whose slot is already acquired; records the outcome on the router"""
+        started = time.perf_counter()
+        try:
+            result = await self._agenerate_with_provider(
+                provider, query, patient_context, doctor_context, retrieved_docs, history
+            )
+        except asyncio.CancelledError:
+            # Cancelled calls record no outcome (_agenerate_hedged samples a primary beaten by its hedge)
+            self.router.release(provider)
+            raise
+        except Exception:
+            self.router.record_failure(provider)
+            raise
+        self.router.record_success(provider, time.perf_counter() - started)
+        return result
+    
+    def _hedge_delay(self, provider: LLMProvider) -> Optional[float]:
+        """Seconds to wait before hedging a call, None when it should not be hedged"""
+        if not self.config.hedging_enabled:
+            return None
+        return self.router.latency_percentile(provider, 95, min_samples=self.config.hedge_min_samples)
+    
+    def _acquire_hedge_provider(self, provider: LLMProvider, providers: List[LLMProvider]) -> Optional[LLMProvider]:
+        """The next healthy provider in routing order, else the same provider again"""
+        for candidate in providers[providers.index(provider) + 1:] + [provider]:
+            if self.router.acquire(candidate):
+                return candidate
+        return None
+    
+    async def _agenerate_hedged(
+        self,
+        provider: LLMProvider,
+        providers: List[LLMProvider],
+        query: str,
+        patient_context: Optional[Dict] = None,
+        doctor_context: Optional[Dict] = None,
+        retrieved_docs: List[Dict] = None,
+        history: Optional[List[Dict]] = None
+    ) -> Tuple[str, float]:
+        """Call provider; if it has not answered by its p95 latency, send a duplicate
+        request (within the hedge budget) and return whichever answers first"""
+        delay = self._hedge_delay(provider)
+        call = (query, patient_context, doctor_context, retrieved_docs, history)
+        if delay is None:
+            result = await self._arouted_call(provider, *call)
+            print(f"✅ Success with {provider.value}")
+            return result
+        
+        self.hedge_budget.record_request()
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(self._arouted_call(provider, *call))
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            hedge_provider = None
+            if not done and self.hedge_budget.allow():
+                hedge_provider = self._acquire_hedge_provider(provider, providers)
+            if hedge_provider is None:
+                result = await primary
+                print(f"✅ Success with {provider.value}")
+                return result
+            self.hedge_budget.record_hedge()
+            print(f"⏱️ {provider.value} slower than its p95 ({delay * 1000:.0f} ms), hedging with {hedge_provider.value}")
+            hedge = asyncio.ensure_future(self._arouted_call(hedge_provider, *call))
+            
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.hedge_budget.record_win(hedge_won=task is hedge)
+                        if task is hedge and not primary.done():
+                            # The primary is cancelled below; without this sample p95 would
+                            # only see the calls fast enough to finish, and keep shrinking
+                            self.router.record_lower_bound(provider, time.perf_counter() - started)
+                        winner = hedge_provider if task is hedge else provider
+                        print(f"✅ Success with {winner.value}" + (" (hedge answered first)" if task is hedge else ""))
+                        return task.result()
+            # Both calls failed
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+    
+    async def astream_response(
+        self,
+        query: str,
+        patient_context: Optional[Dict] = None,
+        doctor_context: Optional[Dict] = None,
+        retrieved_docs: List[Dict] = None,
+        history: Optional[List[Dict]] = None
+    ) -> AsyncIterator[str]:
+        """Yield completion text as it arrives (confidence marker included).
+        
+        Providers are tried in order until one starts answering; once text
+        has been yielded a failure is raised rather than switching provider.
+        A cached answer is yielded as a single delta.
+        """
+        
+        cached = await self._aget_cached_response(query, patient_context, doctor_context, retrieved_docs, history)
+        if cached:
+            print("✅ Response cache hit")
+            yield cached[0]
+            return
+        
+        last_error = None
+        
+        for provider in self._providers_to_try():
+            if not self.router.acquire(provider):
+                continue
+            
+            started = False
+            chunks = []
+            started_at = time.perf_counter()
+            try:
+                print(f"Streaming from {provider.value}...")
+                async for delta in self._astream_with_provider(
+                    provider, query, patient_context, doctor_context, retrieved_docs, history
+                ):
+                    started = True
+                    chunks.append(delta)
+                    yield delta
+                self.router.record_success(provider, time.perf_counter() - started_at)
+                response_text = "".join(chunks)
+                await self._aput_cached_response(
+                    query, response_text, self._extract_confidence(response_text),
+                    patient_context, doctor_context, retrieved_docs, history
+                )
+                return
+                
+            except (asyncio.CancelledError, GeneratorExit):
+                self.router.release(provider)
+                raise
+            except Exception as e:
+                self.router.record_failure(provider)
+                if started:
+                    raise
+                print(f"❌ {provider.value} failed: {e}")
+                last_error = e
+                continue
+        
+        if last_error:
+            raise last_error
+        else:
+            raise Exception("No LLM providers are available")
+    
     def _generate_with_provider(
         self,
         provider: LLMProvider,
         query: str,
         patient_context: Optional[Dict] = None,
         doctor_context: Optional[Dict] = None,
-        retrieved_docs: List[Dict] = None
+        retrieved_docs: List[Dict] = None,
+        history: Optional[List[Dict]] = None
     ) -> Tuple[str, float]:
         """Generate response using a specific provider"""
         
-        if provider == LLMProvider.OPENAI:
-            return self._generate_openai(query, patient_context, doctor_context, retrieved_docs)
+        if provider == LLMProvider.STUB:
+            return self._generate_stub()
+        elif provider in (LLMProvider.OPENAI, LLMProvider.OLLAMA):
+            return self._generate_openai(query, patient_context, doctor_context, retrieved_docs, provider, history)
         else:
             raise ValueError(f"Unsupported provider: {provider}")
     
-    def _generate_openai(
+    async def _agenerate_with_provider(
         self,
+        provider: LLMProvider,
         query: str,
         patient_context: Optional[Dict] = None,
         doctor_context: Optional[Dict] = None,
-        retrieved_docs: List[Dict] = None
+        retrieved_docs: List[Dict] = None,
+        history: Optional[List[Dict]] = None
     ) -> Tuple[str, float]:
-        """Generate response using OpenAI"""
-        import openai
+        """Generate response using a specific provider without blocking"""
         
-        config = self.config.get_config(LLMProvider.OPENAI)
-        openai.api_key = config["api_key"]
-        
-        # Build context
-        context_parts = []
-        if patient_context:
-            context_parts.append(f"{ContextLabels.PATIENT_INFORMATION}:\n{patient_context}")
-        if doctor_context:
-            context_parts.append(f"{ContextLabels.ASSIGNED_DOCTOR}:\n{doctor_context}")
-        if retrieved_docs:
-            doc_text = "\n\n".join([doc['content'] for doc in retrieved_docs])
-            context_parts.append(f"{ContextLabels.RELEVANT_GUIDELINES}:\n{doc_text}")
-        
-        context = "\n\n".join(context_parts)
-        
-        messages = [
-            {"role": "system", "content": AIPrompts.SYSTEM_PROMPT_WITH_CONFIDENCE},
-            {"role": "user", "content": f"{ContextLabels.CONTEXT}:\n{context}\n\n{ContextLabels.USER_QUERY}: {query}"}
-        ]
+        if provider == LLMProvider.STUB:
+            return await self._agenerate_stub()
+        elif provider in (LLMProvider.OPENAI, LLMProvider.OLLAMA):
+            return await self._agenerate_openai(
+                query, patient_context, doctor_context, retrieved_docs, provider, history
+            )
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
+    
+    def _astream_with_provider(
+        self,
+        provider: LLMProvider,
+        query: str,
+        patient_context: Optional[Dict] = None,
+        doctor_context: Optional[Dict] = None,
+        retrieved_docs: List[Dict] = None,
+        history: Optional[List[Dict]] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response from a specific provider"""
         
-        response = openai.chat.completions.create(
+        if provider == LLMProvider.STUB:
+            return self._astream_stub()
+        elif provider in (LLMProvider.OPENAI, LLMProvider.OLLAMA):
+            return self._astream_openai(query, patient_context, doctor_context, retrieved_docs, provider, history)
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
+    
+    def _build_messages(
+        self,
+        query: str,
+        patient_context: Optional[Dict] = None,
+        doctor_context: Optional[Dict] = None,
+        retrieved_docs: List[Dict] = None,
+        history: Optional[List[Dict]] = None
+    ) -> List[Dict]:
+        """Build the chat messages sent to the model, fitting the context into the token budget"""
+        return self.prompt_builder.build(query, patient_context, doctor_context, retrieved_docs, history)
+    
+    def _generate_openai(
+        self,
+        query: str,
+        patient_context: Optional[Dict] = None,
+        doctor_context: Optional[Dict] = None,
+        retrieved_docs: List[Dict] = None,
+        provider: LLMProvider = LLMProvider.OPENAI,
+        history: Optional[List[Dict]] = None
+    ) -> Tuple[str, float]:
+        """Generate response using OpenAI or another OpenAI-compatible provider"""
+        config = self.config.get_config(provider)
+        messages = self._build_messages(query, patient_context, doctor_context, retrieved_docs, history)
+        
+        response = self._get_openai_client(provider).chat.completions.create(
             model=config["model"],
             messages=messages,
             max_tokens=config["max_tokens"],
@@ -148,7 +532,84 @@ class LLMService:
         
         return response_text, confidence
     
+    async def _agenerate_openai(
+        self,
+        query: str,
+        patient_context: Optional[Dict] = None,
+        doctor_context: Optional[Dict] = None,
+        retrieved_docs: List[Dict] = None,
+        provider: LLMProvider = LLMProvider.OPENAI,
+        history: Optional[List[Dict]] = None
+    ) -> Tuple[str, float]:
+        """Generate response using the pooled AsyncOpenAI client"""
+        config = self.config.get_config(provider)
+        messages = self._build_messages(query, patient_context, doctor_context, retrieved_docs, history)
+        
+        # Cancelling the awaiting task aborts the HTTP request and frees the slot
+        async with self._get_semaphore():
+            response = await self._get_async_openai_client(provider).chat.completions.create(
+                model=config["model"],
+                messages=messages,
+                max_tokens=config["max_tokens"],
+                temperature=config["temperature"]
+            )
+        
+        response_text = response.choices[0].message.content
+        confidence = self._extract_confidence(response_text)
+        
+        return response_text, confidence
+    
+    async def _astream_openai(
+        self,
+        query: str,
+        patient_context: Optional[Dict] = None,
+        doctor_context: Optional[Dict] = None,
+        retrieved_docs: List[Dict] = None,
+        provider: LLMProvider = LLMProvider.OPENAI,
+        history: Optional[List[Dict]] = None
+    ) -> AsyncIterator[str]:
+        """Stream content deltas from the pooled AsyncOpenAI client"""
+        config = self.config.get_config(provider)
+        messages = self._build_messages(query, patient_context, doctor_context, retrieved_docs, history)
+        
+        # The concurrency slot is held for the whole stream and released on cancellation
+        async with self._get_semaphore():
+            stream = await self._get_async_openai_client(provider).chat.completions.create(
+                model=config["model"],
+                messages=messages,
+                max_tokens=config["max_tokens"],
+                temperature=config["temperature"],
+                stream=True
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.response.aclose()
+    
+    def _get_mock_llm(self) -> MockLLM:
+        """The stub provider's simulated model, configured by the LLM_STUB_* settings"""
+        if self._mock_llm is None:
+            self._mock_llm = MockLLM(**self.config.get_config(LLMProvider.STUB))
+        return self._mock_llm
+    
+    def _generate_stub(self) -> Tuple[str, float]:
+        """Canned answer from the local stub provider (no network)"""
+        response_text = self._get_mock_llm().complete()
+        return response_text, self._extract_confidence(response_text)
+    
+    async def _agenerate_stub(self) -> Tuple[str, float]:
+        # Holds a concurrency slot like a real completion, so load tests see the same queueing
+        async with self._get_semaphore():
+            response_text = await self._get_mock_llm().acomplete()
+        return response_text, self._extract_confidence(response_text)
     
+    async def _astream_stub(self) -> AsyncIterator[str]:
+        """Stream the stub answer token by token"""
+        async with self._get_semaphore():
+            async for token in self._get_mock_llm().astream():
+                yield token
     
     def _extract_confidence(self, response_text: str) -> float:
         """Extract confidence score from response text"""
@@ -1,23 +1,28 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import timedelta
+import asyncio
+import json
 import uvicorn
 
-from database import get_db, init_db
+from database import get_db, init_db, SessionLocal
 from models import Patient, Doctor, Appointment, Document, Questionnaire, ChatSession, Speciality, DoctorTimeSlots, HealthPackage, HealthPackageTest, HealthPackageBooking, CallbackRequest, ChatButton, City
 from schemas import (
     Patient as PatientSchema, PatientCreate, PatientUpdate,
     Doctor as DoctorSchema, DoctorCreate,
     Appointment as AppointmentSchema, AppointmentCreate,
-    Document as DocumentSchema, DocumentCreate,
+    Document as DocumentSchema, DocumentCreate, DocumentBulkCreate, DocumentBulkResponse,
+    IngestionJob as IngestionJobSchema,
     Questionnaire as QuestionnaireSchema, QuestionnaireCreate,
     ChatSession as ChatSessionSchema, ChatSessionCreate,
     Speciality as SpecialitySchema, SpecialityCreate,
     ChatMessage, ChatResponse,
     AppointmentBookingRequest, AppointmentBookingResponse,
     DoctorTimeSlot as DoctorTimeSlotSchema, DoctorTimeSlotCreate,
-    DoctorAvailableSlots, AvailableTimeSlot,
+    DoctorAvailableSlots, AvailableTimeSlot, SpecialityAvailableSlots,
     HealthPackage as HealthPackageSchema, HealthPackageCreate,
     HealthPackageTest as HealthPackageTestSchema, HealthPackageTestCreate,
     HealthPackageWithTests, HealthPackageBookingRequest, HealthPackageBookingResponse,
@@ -27,6 +32,14 @@ from schemas import (
     CitySchema, CityCreate
 )
 from rag_service_enhanced import EnhancedRAGService
+from llm_service import llm_service
+from questionnaire_index import questionnaire_index
+from document_ingestion import document_ingestion
+from retrieval_backends import rag_backend
+from slot_availability import parse_date, parse_time, get_doctor_availability, find_speciality_openings
+from slot_calendar import slot_calendar
+from session_store import session_store
+from appointment_booking import SlotConflictError, claim_slot, find_same_day_appointment
 from config import CORS_ORIGINS, HOST, BACKEND_PORT, IS_PRODUCTION
 from text_config import SystemMessages, ErrorMessages
 from simple_admin_api import admin_router
@@ -73,6 +86,40 @@ async def test_admin():
 async def startup_event():
     """Initialize database on startup"""
     init_db()
+    
+    # Build the in-memory questionnaire index before the first chat message
+    try:
+        questionnaire_index.refresh()
+    except Exception as e:
+        print(f"Warning: Could not build questionnaire index: {e}")
+
+    # Load the retrieval backend; documents without stored embeddings are queued for embedding
+    db = SessionLocal()
+    try:
+        rag_backend.sync(db)
+    except Exception as e:
+        print(f"Warning: Could not load document index: {e}")
+    finally:
+        db.close()
+
+    # Roll the materialized slot calendar forward (no-op unless SLOT_CALENDAR_ENABLED)
+    if slot_calendar.enabled:
+        db = SessionLocal()
+        try:
+            slot_calendar.ensure_horizon(db)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Warning: Could not extend slot calendar: {e}")
+        finally:
+            db.close()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled LLM connections, stop document ingestion and write pending chat sessions"""
+    await llm_service.aclose()
+    document_ingestion.shutdown()
+    session_store.shutdown()
 
 # Health check endpoint
 @app.get("/health")
@@ -84,80 +131,48 @@ async def health_check():
 async def test_time_slots(doctor_id: int, date: str, db: Session = Depends(get_db)):
     """Test endpoint for time slots functionality"""
     try:
-        from datetime import datetime, timedelta
-        
-        # Parse date
-        appointment_date = datetime.strptime(date, "%Y-%m-%d").date()
-        day_of_week = appointment_date.weekday()
+        appointment_date = parse_date(date)
         
         # Get doctor
         doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
         if not doctor:
             return {"error": "Doctor not found"}
         
-        # Get time slots for this day of week
-        time_slots = db.query(DoctorTimeSlots).filter(
-            DoctorTimeSlots.doctor_id == doctor_id,
-            DoctorTimeSlots.day_of_week == day_of_week,
-            DoctorTimeSlots.is_available == True
-        ).all()
-        
-        # Generate available time slots
-        available_slots = []
-        for time_slot in time_slots:
-            current_time = time_slot.start_time
-            end_time = time_slot.end_time
-            
-            while current_time < end_time:
-                slot_time_str = current_time.strftime("%H:%M")
-                
-                # Check for existing appointments at this specific time
-                # Create datetime for comparison
-                slot_datetime = datetime.combine(appointment_date, current_time)
-                
-                existing_appointments = db.query(Appointment).filter(
-                    Appointment.doctor_id == doctor_id,
-                    Appointment.date == slot_datetime,
-                    Appointment.status.in_(["scheduled", "confirmed"])
-                ).all()
-                
-                # Check if this specific time slot is booked
-                is_available = len(existing_appointments) == 0
-                
-                available_slots.append({
-                    "time": slot_time_str,
-                    "is_available": is_available,
-                    "slot_id": time_slot.id
-                })
-                
-                # Move to next slot
-                current_time = (datetime.combine(appointment_date, current_time) + 
-                              timedelta(minutes=time_slot.slot_duration_minutes)).time()
-        
-        return {
-            "doctor_id": doctor_id,
-            "doctor_name": doctor.name,
-            "date": date,
-            "day_of_week": day_of_week,
-            "available_slots": available_slots
-        }
+        # Slots and bookings are fetched in one query each and joined in memory
+        return get_doctor_availability(db, doctor, appointment_date, appointment_date)[0]
         
     except Exception as e:
         return {"error": str(e)}
 
+async def run_until_disconnected(request: Request, coroutine, poll_interval: float = 0.5):
+    """Await coroutine, cancelling it (and its LLM call) if the client disconnects first"""
+    task = asyncio.ensure_future(coroutine)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
 # Chat endpoint
 @app.post("/chat", response_model=ChatResponse)
-async def chat(message: ChatMessage, db: Session = Depends(get_db)):
+async def chat(message: ChatMessage, request: Request, db: Session = Depends(get_db)):
     """
     Main chat endpoint that processes user messages with enhanced RAG and fallback system
     """
     try:
-        result = rag_service.process_query_with_fallback(
+        result = await run_until_disconnected(request, rag_service.aprocess_query_with_fallback(
             query=message.message,
             db=db,
             patient_id=message.patient_id,
-            doctor_id=message.doctor_id
-        )
+            doctor_id=message.doctor_id,
+            session_id=message.session_id
+        ))
         
         return ChatResponse(
             response=result["response"],
@@ -169,12 +184,100 @@ async def chat(message: ChatMessage, db: Session = Depends(get_db)):
             fallback_mode=result.get("fallback_mode", False),
             ai_confidence=result.get("ai_confidence")
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"{SystemMessages.ERROR_PROCESSING_CHAT}: {str(e)}"
         )
 
+def format_sse(event: str, data) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(message: ChatMessage, db: Session = Depends(get_db)):
+    """
+    Streaming chat over server-sent events.
+    
+    Emits `token` events ({"text": ...}) as the LLM generates, then one `done`
+    event with the full ChatResponse payload (confidence, fallback mode, and
+    the fallback response that replaces the streamed text when fallback_mode
+    is true). Disconnecting the client cancels the LLM request.
+    """
+    async def event_stream():
+        try:
+            async for event, payload in rag_service.astream_query_with_fallback(
+                query=message.message,
+                db=db,
+                patient_id=message.patient_id,
+                doctor_id=message.doctor_id,
+                session_id=message.session_id
+            ):
+                if event == "token":
+                    yield format_sse("token", {"text": payload})
+                else:
+                    yield format_sse(event, ChatResponse(
+                        response=payload["response"],
+                        patient_context=payload.get("patient_context"),
+                        doctor_context=payload.get("doctor_context"),
+                        retrieved_documents=payload.get("retrieved_documents", []),
+                        current_question=payload.get("current_question"),
+                        session_id=payload.get("session_id"),
+                        fallback_mode=payload.get("fallback_mode", False),
+                        ai_confidence=payload.get("ai_confidence")
+                    ).dict())
+        except Exception as e:
+            yield format_sse("error", {"detail": f"{SystemMessages.ERROR_PROCESSING_CHAT}: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/chat/cache")
+async def get_response_cache_stats():
+    """Get hit/miss counters and size of the chat response cache"""
+    return llm_service.response_cache.stats()
+
+@app.get("/chat/sessions")
+async def get_chat_session_stats():
+    """Get cache and write-behind counters of the conversation session store"""
+    return session_store.stats()
+
+@app.post("/chat/cache/clear")
+async def clear_response_cache():
+    """Drop every cached chat response"""
+    llm_service.response_cache.clear()
+    return llm_service.response_cache.stats()
+
+@app.get("/llm/providers")
+async def get_llm_provider_stats():
+    """Get rolling latency, error rate and circuit breaker state of each LLM provider, plus hedging counters"""
+    return {
+        "routing": [provider.value for provider in llm_service.config.get_routing_providers()],
+        "providers": llm_service.router.stats(),
+        "hedging": {"enabled": llm_service.config.hedging_enabled, **llm_service.hedge_budget.stats()}
+    }
+
+@app.get("/llm/prompts")
+async def get_prompt_stats():
+    """Get prompt token counts, chunk truncation counters and savings against the unbounded prompt"""
+    return llm_service.prompt_builder.stats()
+
+@app.get("/embeddings/cache")
+async def get_embedding_cache_stats():
+    """Get hit/miss counters of the shared embedding cache"""
+    return await asyncio.to_thread(llm_service.embedding_cache.stats)
+
+@app.post("/embeddings/cache/clear")
+async def clear_embedding_cache():
+    """Drop every cached embedding of the current model (memory and disk)"""
+    await asyncio.to_thread(llm_service.embedding_cache.clear)
+    return await asyncio.to_thread(llm_service.embedding_cache.stats)
+
 # Patient endpoints
 @app.get("/patient/{patient_id}", response_model=PatientSchema)
 async def get_patient(patient_id: int, db: Session = Depends(get_db)):
@@ -268,6 +371,7 @@ async def delete_doctor(doctor_id: int, db: Session = Depends(get_db)):
     if not db_doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
     
+    slot_calendar.remove_doctor(db, doctor_id)
     db.delete(db_doctor)
     db.commit()
     return {"message": "Doctor deleted successfully"}
@@ -282,18 +386,19 @@ async def get_appointments(skip: int = 0, limit: int = 100, db: Session = Depend
 @app.post("/appointment", response_model=AppointmentSchema)
 async def create_appointment(appointment: AppointmentCreate, db: Session = Depends(get_db)):
     """Create a new appointment"""
-    db_appointment = Appointment(**appointment.dict())
-    db.add(db_appointment)
-    db.commit()
-    db.refresh(db_appointment)
-    return db_appointment
+    try:
+        return claim_slot(db, Appointment(**appointment.dict()))
+    except SlotConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 # Document management endpoints
 @app.post("/add-doc", response_model=DocumentSchema)
-async def add_document(document: DocumentCreate, db: Session = Depends(get_db)):
+async def add_document(document: DocumentCreate, response: Response, db: Session = Depends(get_db)):
     """
     Add hospital guidelines or notes into knowledge base
-    This endpoint adds documents both to the database and vector store
+    The document is saved right away and chunked and embedded by a background
+    job; its id is returned in the X-Ingestion-Job-Id header (no header when
+    the retrieval backend indexed it inline)
     """
     try:
         # Add to database
@@ -302,16 +407,10 @@ async def add_document(document: DocumentCreate, db: Session = Depends(get_db)):
         db.commit()
         db.refresh(db_document)
         
-        # Add to vector store
-        success = rag_service.add_document(
-            title=document.title,
-            content=document.content,
-            doc_type=document.document_type
-        )
-        
-        if not success:
-            # If vector store addition fails, we should log it but not fail the request
-            print(ErrorMessages.VECTOR_STORE_WARNING.format(title=document.title))
+        # Index the document for chat retrieval (embedding is queued as a background job)
+        job = rag_backend.sync(db)
+        if job:
+            response.headers["X-Ingestion-Job-Id"] = job.id
         
         return db_document
         
@@ -321,12 +420,62 @@ async def add_document(document: DocumentCreate, db: Session = Depends(get_db)):
             detail=f"{SystemMessages.ERROR_ADDING_DOCUMENT}: {str(e)}"
         )
 
+@app.post("/add-docs", response_model=DocumentBulkResponse)
+async def add_documents(bulk: DocumentBulkCreate, db: Session = Depends(get_db)):
+    """Add many documents at once; they are embedded by one background ingestion job"""
+    try:
+        db_documents = [Document(**document.dict()) for document in bulk.documents]
+        db.add_all(db_documents)
+        db.commit()
+        for db_document in db_documents:
+            db.refresh(db_document)
+        
+        job = rag_backend.sync(db)
+        return DocumentBulkResponse(
+            documents=db_documents,
+            ingestion_job=job.to_dict() if job else None
+        )
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"{SystemMessages.ERROR_ADDING_DOCUMENT}: {str(e)}"
+        )
+
 @app.get("/documents", response_model=List[DocumentSchema])
 async def get_documents(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """Get all documents"""
     documents = db.query(Document).offset(skip).limit(limit).all()
     return documents
 
+@app.get("/documents/index")
+async def get_document_index_stats():
+    """Get the state of the retrieval backend's document index"""
+    return rag_backend.stats()
+
+@app.post("/documents/index/refresh")
+async def refresh_document_index(db: Session = Depends(get_db)):
+    """Rebuild the document index from the database (stored embeddings are reused)"""
+    rag_backend.clear()
+    job = await asyncio.to_thread(rag_backend.sync, db)
+    return {**rag_backend.stats(), "ingestion_job": job.to_dict() if job else None}
+
+@app.get("/documents/ingestion", response_model=List[IngestionJobSchema])
+async def get_ingestion_jobs():
+    """Recent document ingestion jobs, newest first"""
+    return [job.to_dict() for job in document_ingestion.jobs()]
+
+@app.get("/documents/ingestion/{job_id}", response_model=IngestionJobSchema)
+async def get_ingestion_job(job_id: str):
+    """Progress of one document ingestion job"""
+    job = document_ingestion.get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=SystemMessages.INGESTION_JOB_NOT_FOUND
+        )
+    return job.to_dict()
+
 @app.get("/documents/{document_id}", response_model=DocumentSchema)
 async def get_document(document_id: int, db: Session = Depends(get_db)):
     """Get document by ID"""
@@ -355,6 +504,17 @@ async def get_questionnaires(
     questionnaires = query.order_by(Questionnaire.priority.asc()).offset(skip).limit(limit).all()
     return questionnaires
 
+@app.get("/questionnaires/index")
+async def get_questionnaire_index_stats():
+    """Get the state of the in-memory questionnaire keyword index"""
+    return questionnaire_index.stats()
+
+@app.post("/questionnaires/index/refresh")
+async def refresh_questionnaire_index(db: Session = Depends(get_db)):
+    """Rebuild the questionnaire keyword index (e.g. after out-of-process edits)"""
+    questionnaire_index.refresh(db)
+    return questionnaire_index.stats()
+
 @app.get("/questionnaires/{questionnaire_id}", response_model=QuestionnaireSchema)
 async def get_questionnaire(questionnaire_id: int, db: Session = Depends(get_db)):
     """Get questionnaire by ID"""
@@ -409,6 +569,50 @@ async def get_speciality(speciality_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Speciality not found")
     return speciality
 
+@app.get("/specialities/{speciality_id}/available-slots", response_model=SpecialityAvailableSlots)
+async def get_speciality_available_slots(
+    speciality_id: int,
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Earliest open slots across all doctors of a speciality (e.g. next available cardiologist)"""
+    try:
+        now = get_local_now().replace(tzinfo=None)
+        start_date = parse_date(from_date) if from_date else now.date()
+        end_date = parse_date(to_date) if to_date else start_date + timedelta(days=6)
+        window_start = parse_time(start_time) if start_time else None
+        window_end = parse_time(end_time) if end_time else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date or time format. Use YYYY-MM-DD and HH:MM")
+    
+    try:
+        speciality = db.query(Speciality).filter(Speciality.id == speciality_id).first()
+        if not speciality:
+            raise HTTPException(status_code=404, detail="Speciality not found")
+        
+        openings = find_speciality_openings(
+            db, speciality_id, start_date, end_date,
+            window_start=window_start, window_end=window_end,
+            limit=limit, now=now
+        )
+        return SpecialityAvailableSlots(
+            speciality_id=speciality_id,
+            from_date=start_date.strftime("%Y-%m-%d"),
+            to_date=end_date.strftime("%Y-%m-%d"),
+            openings=openings
+        )
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching available slots: {str(e)}")
+
 @app.post("/specialities", response_model=SpecialitySchema)
 async def create_speciality(speciality: SpecialityCreate, db: Session = Depends(get_db)):
     """Create a new speciality"""
@@ -449,6 +653,7 @@ async def create_time_slot(time_slot: dict, db: Session = Depends(get_db)):
     """Create a new time slot for a doctor"""
     db_time_slot = DoctorTimeSlots(**time_slot)
     db.add(db_time_slot)
+    slot_calendar.sync_doctors(db, [db_time_slot.doctor_id])
     db.commit()
     db.refresh(db_time_slot)
     return db_time_slot
@@ -460,9 +665,11 @@ async def update_time_slot(slot_id: int, time_slot: dict, db: Session = Depends(
     if not db_time_slot:
         raise HTTPException(status_code=404, detail="Time slot not found")
     
+    previous_doctor_id = db_time_slot.doctor_id
     for key, value in time_slot.items():
         setattr(db_time_slot, key, value)
     
+    slot_calendar.sync_doctors(db, [previous_doctor_id, db_time_slot.doctor_id])
     db.commit()
     db.refresh(db_time_slot)
     return db_time_slot
@@ -475,6 +682,7 @@ async def delete_time_slot(slot_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Time slot not found")
     
     db.delete(db_time_slot)
+    slot_calendar.sync_doctors(db, [db_time_slot.doctor_id])
     db.commit()
     return {"message": "Time slot deleted successfully"}
 
@@ -486,6 +694,7 @@ async def toggle_time_slot(slot_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Time slot not found")
     
     db_time_slot.is_available = not db_time_slot.is_available
+    slot_calendar.sync_doctors(db, [db_time_slot.doctor_id])
     db.commit()
     db.refresh(db_time_slot)
     return {"message": f"Time slot {'activated' if db_time_slot.is_available else 'blocked'}"}
@@ -542,15 +751,9 @@ async def book_appointment(booking_request: AppointmentBookingRequest, db: Sessi
         
         # Check for duplicate appointment validation
         # Check if the same patient (name + mobile) already has an appointment on the same date with the same doctor/specialty
-        appointment_date_str = appointment_datetime.strftime('%Y-%m-%d')
-        existing_appointment = db.query(Appointment).join(Patient).join(Doctor).filter(
-            Patient.first_name == patient.first_name,
-            Patient.last_name == patient.last_name,
-            Patient.phone == patient.phone,
-            Appointment.date.like(f'{appointment_date_str}%'),  # SQLite compatible date matching
-            Appointment.status.in_(["scheduled", "confirmed"]),
-            Doctor.id == booking_request.doctor_id  # Same doctor/specialty
-        ).first()
+        existing_appointment = find_same_day_appointment(
+            db, patient, booking_request.doctor_id, appointment_datetime.date()
+        )
         
         if existing_appointment:
             existing_appointment_time = existing_appointment.date.strftime("%H:%M")
@@ -570,18 +773,14 @@ async def book_appointment(booking_request: AppointmentBookingRequest, db: Sessi
         if doctor.speciality:
             speciality_name = doctor.speciality.name
         
-        # Create appointment
-        appointment = Appointment(
+        # Create appointment; the slot's unique index rejects concurrent double bookings
+        appointment = claim_slot(db, Appointment(
             patient_id=booking_request.patient_id,
             doctor_id=booking_request.doctor_id,
             date=appointment_datetime,
             status="scheduled",
             notes=booking_request.notes
-        )
-        
-        db.add(appointment)
-        db.commit()
-        db.refresh(appointment)
+        ))
         
         # Generate confirmation number
         confirmation_number = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
@@ -599,6 +798,11 @@ async def book_appointment(booking_request: AppointmentBookingRequest, db: Sessi
     except HTTPException:
         # Re-raise HTTPExceptions (like validation errors) without modification
         raise
+    except SlotConflictError:
+        raise HTTPException(
+            status_code=409,
+            detail=f"The {booking_request.preferred_time} slot on {booking_request.preferred_date} has just been booked. Please choose a different time."
+        )
     except ValueError as e:
         print(f"ValueError in appointment booking: {e}")
         raise HTTPException(status_code=400, detail="Invalid date or time format")
@@ -636,6 +840,7 @@ async def create_doctor_time_slot(
     # Create time slot
     db_time_slot = DoctorTimeSlots(**time_slot.dict())
     db.add(db_time_slot)
+    slot_calendar.sync_doctors(db, [db_time_slot.doctor_id])
     db.commit()
     db.refresh(db_time_slot)
     return db_time_slot
@@ -643,82 +848,57 @@ async def create_doctor_time_slot(
 @app.get("/doctors/{doctor_id}/available-slots/{date}", response_model=DoctorAvailableSlots)
 async def get_available_slots(doctor_id: int, date: str, db: Session = Depends(get_db)):
     """Get available time slots for a doctor on a specific date"""
-    from datetime import datetime, timedelta
-    
     try:
-        # Parse date
-        appointment_date = datetime.strptime(date, "%Y-%m-%d").date()
-        day_of_week = appointment_date.weekday()  # 0=Monday, 6=Sunday
+        appointment_date = parse_date(date)
         
         # Get doctor
         doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
         if not doctor:
             raise HTTPException(status_code=404, detail="Doctor not found")
         
-        # Get time slots for this day of week
-        time_slots = db.query(DoctorTimeSlots).filter(
-            DoctorTimeSlots.doctor_id == doctor_id,
-            DoctorTimeSlots.day_of_week == day_of_week,
-            DoctorTimeSlots.is_available == True
-        ).all()
-        
-        if not time_slots:
-            return DoctorAvailableSlots(
-                doctor_id=doctor_id,
-                doctor_name=doctor.name,
-                date=date,
-                day_of_week=day_of_week,
-                available_slots=[]
-            )
-        
-        # Generate available time slots
-        available_slots = []
-        
-        for time_slot in time_slots:
-            # Generate slots within the time range
-            current_time = time_slot.start_time
-            end_time = time_slot.end_time
-            
-            while current_time < end_time:
-                # Check if this slot is already booked
-                slot_time_str = current_time.strftime("%H:%M")
-                
-                # Check for existing appointments at this specific time
-                # Create datetime for comparison
-                slot_datetime = datetime.combine(appointment_date, current_time)
-                
-                existing_appointments = db.query(Appointment).filter(
-                    Appointment.doctor_id == doctor_id,
-                    Appointment.date == slot_datetime,
-                    Appointment.status.in_(["scheduled", "confirmed"])
-                ).all()
-                
-                # Check if this specific time slot is booked
-                is_available = len(existing_appointments) == 0
-                
-                available_slots.append(AvailableTimeSlot(
-                    time=slot_time_str,
-                    is_available=is_available,
-                    slot_id=time_slot.id
-                ))
-                
-                # Move to next slot
-                current_time = (datetime.combine(appointment_date, current_time) + 
-                              timedelta(minutes=time_slot.slot_duration_minutes)).time()
-        
-        return DoctorAvailableSlots(
-            doctor_id=doctor_id,
-            doctor_name=doctor.name,
-            date=date,
-            day_of_week=day_of_week,
-            available_slots=available_slots
-        )
+        # Slots and bookings are fetched in one query each and joined in memory
+        availability = get_doctor_availability(db, doctor, appointment_date, appointment_date)[0]
+        return DoctorAvailableSlots(**availability)
         
+    except HTTPException:
+        raise
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting available slots: {str(e)}")
 
+@app.get("/doctors/{doctor_id}/available-slots", response_model=List[DoctorAvailableSlots])
+async def get_available_slots_range(
+    doctor_id: int,
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    date: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get available time slots for a doctor for every date in a range (e.g. a whole week)"""
+    try:
+        start_date = parse_date(from_date or date)
+        end_date = parse_date(to_date) if to_date else start_date
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid date format. Use from=YYYY-MM-DD&to=YYYY-MM-DD")
+    
+    try:
+        doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
+        if not doctor:
+            raise HTTPException(status_code=404, detail="Doctor not found")
+        
+        # Days before today, past times and Sundays cannot be booked, so they are left out
+        now = get_local_now().replace(tzinfo=None)
+        availability = get_doctor_availability(db, doctor, start_date, end_date, now=now)
+        return [DoctorAvailableSlots(**day) for day in availability]
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting available slots: {str(e)}")
+
 # Patient Management Endpoints
 @app.post("/patients", response_model=PatientSchema)
 async def create_patient(patient: PatientCreate, db: Session = Depends(get_db)):
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the active appointment slot index
+(one scheduled/confirmed appointment per doctor and start time)
+"""
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from config import DATABASE_URL
+from models import Appointment
+from slot_availability import ACTIVE_APPOINTMENT_STATUSES
+
+def find_double_bookings(db):
+    """Doctor/time pairs that already hold more than one active appointment"""
+    return db.query(Appointment.doctor_id, Appointment.date, func.count(Appointment.id)).filter(
+        Appointment.status.in_(ACTIVE_APPOINTMENT_STATUSES)
+    ).group_by(Appointment.doctor_id, Appointment.date).having(func.count(Appointment.id) > 1).all()
+
+def migrate_database():
+    """Add uq_appointments_active_slot"""
+    try:
+        # Create engine
+        engine = create_engine(DATABASE_URL)
+        
+        # The unique index cannot be created while double bookings exist
+        db = sessionmaker(bind=engine)()
+        try:
+            duplicates = find_double_bookings(db)
+        finally:
+            db.close()
+        
+        if duplicates:
+            print(f"❌ Found {len(duplicates)} double-booked slots, resolve them before migrating:")
+            for doctor_id, slot_datetime, count in duplicates:
+                print(f"   - doctor {doctor_id} at {slot_datetime}: {count} active appointments")
+            return False
+        
+        for index in Appointment.__table__.indexes:
+            if index.name == "uq_appointments_active_slot":
+                index.create(engine, checkfirst=True)
+                print(f"✅ Successfully created index {index.name}")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error creating appointment slot index: {e}")
+        return False
+
+if __name__ == "__main__":
+    migrate_database()
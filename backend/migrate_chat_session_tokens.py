@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the token column to chat_sessions. Chat clients
+continue a conversation with this unguessable token instead of the row id.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import inspect, text
+from database import engine
+
+def migrate_add_session_token():
+    """Add token column and its unique index to chat_sessions"""
+    
+    try:
+        with engine.connect() as connection:
+            # Check if token column already exists (works on SQLite and Postgres)
+            columns = inspect(connection).get_columns("chat_sessions")
+            column_exists = any(column["name"] == "token" for column in columns)
+            
+            if column_exists:
+                print("⚠️  token column already exists in chat_sessions table")
+            else:
+                # Existing sessions get no token, so they cannot be resumed by id any more
+                connection.execute(text("ALTER TABLE chat_sessions ADD COLUMN token VARCHAR(64)"))
+                print("✅ Successfully added token column to chat_sessions table")
+            
+            connection.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ix_chat_sessions_token ON chat_sessions (token)"
+            ))
+            connection.commit()
+            print("✅ Index ix_chat_sessions_token on chat_sessions is in place")
+            
+    except Exception as e:
+        print(f"❌ Error adding token column: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    print("🔄 Migrating database to add chat session tokens...")
+    migrate_add_session_token()
+    print("🎉 Migration completed!")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add composite indexes for the hot query paths
+(appointments, time slots, patients, questionnaires, bookings, callbacks)
+"""
+
+from sqlalchemy import create_engine
+from config import DATABASE_URL
+from models import (
+    Appointment, CallbackRequest, Doctor, DoctorTimeSlots, HealthPackageBooking, Patient, Questionnaire
+)
+
+# Tables whose composite indexes are created by this migration
+INDEXED_MODELS = [Patient, Doctor, Appointment, DoctorTimeSlots, Questionnaire, HealthPackageBooking, CallbackRequest]
+
+# The unique slot index has its own migration because existing double bookings block it
+SKIPPED_INDEXES = {"uq_appointments_active_slot"}
+
+# Indexes replaced by a wider composite index, dropped so they do not linger as dead weight
+SUPERSEDED_INDEXES = ["ix_appointments_doctor_date"]
+
+def migrate_database(engine=None):
+    """Create every declared composite index that does not exist yet and drop superseded ones"""
+    try:
+        # Create engine
+        engine = engine or create_engine(DATABASE_URL)
+        
+        with engine.begin() as conn:
+            for name in SUPERSEDED_INDEXES:
+                conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+                print(f"✅ Superseded index {name} is gone")
+        
+        for model in INDEXED_MODELS:
+            for index in sorted(model.__table__.indexes, key=lambda index: index.name):
+                if index.name in SKIPPED_INDEXES:
+                    continue
+                index.create(engine, checkfirst=True)
+                print(f"✅ Index {index.name} on {model.__tablename__} is in place")
+        
+        print("ℹ️  Run migrate_appointment_slots.py to add uq_appointments_active_slot")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error creating indexes: {e}")
+        return False
+
+if __name__ == "__main__":
+    migrate_database()
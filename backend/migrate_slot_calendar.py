@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the doctor_slot_calendar table and fill it
+from the existing doctor_time_slots rules and appointments
+"""
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from config import DATABASE_URL, SLOT_CALENDAR_HORIZON_DAYS
+from models import DoctorSlotCalendar
+from slot_calendar import SlotCalendar
+
+def migrate_database():
+    """Add doctor_slot_calendar table and materialize the slot horizon"""
+    try:
+        # Create engine
+        engine = create_engine(DATABASE_URL)
+        
+        # Create the new table
+        DoctorSlotCalendar.__table__.create(engine, checkfirst=True)
+        print("✅ Successfully created doctor_slot_calendar table")
+        
+        # Expand the weekly rules for the configured horizon
+        db = sessionmaker(bind=engine)()
+        try:
+            count = SlotCalendar(enabled=True).rebuild(db, horizon_days=SLOT_CALENDAR_HORIZON_DAYS)
+            db.commit()
+            print(f"✅ Materialized {count} slots for the next {SLOT_CALENDAR_HORIZON_DAYS} days")
+        finally:
+            db.close()
+        
+        print("ℹ️  Set SLOT_CALENDAR_ENABLED=true to serve availability from the calendar")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error creating doctor_slot_calendar table: {e}")
+        return False
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,113 @@
+"""
+Deterministic local stand-in for an LLM (the "stub" provider).
+
+Selected with LLM_PROVIDER=stub, it answers without network access or API
+quota, so /chat can be load-tested and developed offline. Latency follows a
+configurable distribution, streamed answers arrive token by token, and the
+answer ends with a [CONFIDENCE: X.X] marker drawn from a configurable range.
+Random draws come from a seeded generator so runs are repeatable.
+
+Latency specs (milliseconds):
+    fixed:200              always 200 ms
+    uniform:100:400        evenly between 100 and 400 ms
+    normal:300:50          mean 300 ms, standard deviation 50 ms
+    lognormal:300:0.5      median 300 ms, sigma 0.5 (long tail, like real APIs)
+"""
+
+import asyncio
+import math
+import random
+import threading
+import time
+from typing import AsyncIterator, Optional, Tuple
+
+
+def parse_latency(spec: str) -> Tuple[str, Tuple[float, ...]]:
+    """Parse a latency spec such as "lognormal:300:0.5" into (distribution, parameters)"""
+    parts = [part.strip() for part in (spec or "fixed:0").split(":")]
+    distribution, params = parts[0].lower(), tuple(float(value) for value in parts[1:])
+    expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+    if distribution not in expected or len(params) != expected[distribution]:
+        raise ValueError(
+            f"Invalid latency spec '{spec}': use fixed:MS, uniform:LOW:HIGH, normal:MEAN:STDDEV or lognormal:MEDIAN:SIGMA"
+        )
+    return distribution, params
+
+
+def parse_confidence(spec: str) -> Optional[Tuple[float, float]]:
+    """"0.8" or "0.4:0.9" as a (low, high) range; empty for answers without a confidence marker"""
+    if not spec or not spec.strip():
+        return None
+    values = [float(value) for value in spec.split(":")]
+    return (values[0], values[-1])
+
+
+class MockLLM:
+    """Canned answers with simulated latency, token streaming and confidence markers"""
+
+    def __init__(self, response: str, confidence: str = "0.8", latency: str = "fixed:0",
+                 token_delay_ms: float = 0, error_rate: float = 0, seed: int = 0):
+        self.response = response
+        self.confidence = parse_confidence(confidence)
+        self.distribution, self.params = parse_latency(latency)
+        self.token_delay = max(0.0, token_delay_ms) / 1000
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()  # Sync calls run on several worker threads
+
+    def sample_latency(self) -> float:
+        """Seconds before the first token"""
+        with self._lock:
+            if self.distribution == "fixed":
+                milliseconds = self.params[0]
+            elif self.distribution == "uniform":
+                milliseconds = self._random.uniform(*self.params)
+            elif self.distribution == "normal":
+                milliseconds = self._random.gauss(*self.params)
+            else:
+                median, sigma = self.params
+                milliseconds = self._random.lognormvariate(math.log(max(median, 1e-6)), sigma)
+        return max(0.0, milliseconds) / 1000
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def text(self) -> str:
+        """The full answer, including the confidence marker when configured"""
+        if self.confidence is None:
+            return self.response
+        with self._lock:
+            confidence = self._random.uniform(*self.confidence)
+        return f"{self.response} [CONFIDENCE: {confidence:.1f}]"
+
+    def tokens(self, text: str):
+        """Word-level tokens that join back into text"""
+        words = text.split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def complete(self) -> str:
+        """Blocking completion: waits out the latency and the whole token stream"""
+        text = self.text()
+        time.sleep(self.sample_latency() + self.token_delay * len(self.tokens(text)))
+        if self._should_fail():
+            raise ConnectionError("Simulated LLM provider failure")
+        return text
+
+    async def acomplete(self) -> str:
+        text = self.text()
+        await asyncio.sleep(self.sample_latency() + self.token_delay * len(self.tokens(text)))
+        if self._should_fail():
+            raise ConnectionError("Simulated LLM provider failure")
+        return text
+
+    async def astream(self) -> AsyncIterator[str]:
+        """Tokens of the answer, the first after the sampled latency"""
+        text = self.text()
+        await asyncio.sleep(self.sample_latency())
+        if self._should_fail():
+            raise ConnectionError("Simulated LLM provider failure")
+        for token in self.tokens(text):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield token
@@ -0,0 +1,78 @@
+"""
+Commit hooks that keep in-process indexes and caches in step with the database.
+
+watch_model(Model, on_commit) calls on_commit(changed) after a transaction
+that inserted, updated or deleted Model rows commits, so the change is
+visible to sessions that rebuild from the table. changed is the set of
+affected primary keys, or None after a bulk query(Model).update() or
+delete(), whose rows are unknown (rebuild everything). Changes of a rolled
+back transaction are discarded; rows flushed without a session are
+reported straight away.
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+ChangeCallback = Callable[[Optional[Set]], None]
+
+_CHANGES = "watched_model_changes"  # session.info key: {model: changed ids, or None after a bulk change}
+_watchers: Dict[type, List[ChangeCallback]] = {}
+_lock = threading.Lock()
+
+
+def watch_model(model, on_commit: ChangeCallback) -> ChangeCallback:
+    """Call on_commit with the changed ids of model after every commit that changed it"""
+    with _lock:
+        if model not in _watchers:
+            _watchers[model] = []
+            record = _row_recorder(model)
+            for event_name in ("after_insert", "after_update", "after_delete"):
+                event.listen(model, event_name, record)
+        _watchers[model].append(on_commit)
+    return on_commit
+
+
+def _notify(model, changed: Optional[Set]):
+    for on_commit in list(_watchers.get(model, ())):
+        try:
+            on_commit(changed)
+        except Exception as e:
+            print(f"❌ Error applying {model.__name__} changes: {e}")
+
+
+def _row_recorder(model):
+    def record(mapper, connection, target):
+        row_id = mapper.primary_key_from_instance(target)[0]
+        session = object_session(target)
+        if session is None:
+            _notify(model, {row_id})
+            return
+        changes = session.info.setdefault(_CHANGES, {})
+        ids = changes.setdefault(model, set())
+        if ids is not None:
+            ids.add(row_id)
+    return record
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_bulk_change(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in _watchers:
+        # The affected ids are unknown; a full rebuild is cheap compared to stale answers
+        orm_execute_state.session.info.setdefault(_CHANGES, {})[mapper.class_] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(session):
+    for model, changed in session.info.pop(_CHANGES, {}).items():
+        _notify(model, changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_CHANGES, None)
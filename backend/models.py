@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, LargeBinary, Time, Date
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, LargeBinary, Time, Date, UniqueConstraint, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
@@ -8,6 +8,9 @@ Base = declarative_base()
 
 class Patient(Base):
     __tablename__ = "patients"
+    __table_args__ = (
+        Index("ix_patients_name_phone", "first_name", "last_name", "phone"),  # Duplicate patient checks
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String(100), nullable=False)
@@ -57,6 +60,9 @@ class Speciality(Base):
 
 class Doctor(Base):
     __tablename__ = "doctors"
+    __table_args__ = (
+        Index("ix_doctors_speciality_available", "speciality_id", "is_available"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -75,8 +81,18 @@ class Doctor(Base):
     appointments = relationship("Appointment", back_populates="doctor")
     time_slots = relationship("DoctorTimeSlots", back_populates="doctor")
 
+# Statuses that occupy a doctor's slot (see uq_appointments_active_slot)
+ACTIVE_SLOT_CONDITION = text("status IN ('scheduled', 'confirmed')")
+
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # At most one active appointment per doctor and start time; cancelled/completed rows may repeat
+        Index("uq_appointments_active_slot", "doctor_id", "date", unique=True,
+              sqlite_where=ACTIVE_SLOT_CONDITION, postgresql_where=ACTIVE_SLOT_CONDITION),
+        Index("ix_appointments_doctor_date_status", "doctor_id", "date", "status"),
+        Index("ix_appointments_patient_date", "patient_id", "date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
@@ -102,6 +118,9 @@ class Document(Base):
 
 class Questionnaire(Base):
     __tablename__ = "questionnaires"
+    __table_args__ = (
+        Index("ix_questionnaires_active_priority", "is_active", "priority"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     trigger_keywords = Column(Text, nullable=False)  # Keywords that trigger this questionnaire
@@ -117,6 +136,7 @@ class ChatSession(Base):
     __tablename__ = "chat_sessions"
     
     id = Column(Integer, primary_key=True, index=True)
+    token = Column(String(64), unique=True, index=True)  # Unguessable id given to chat clients
     patient_id = Column(Integer, ForeignKey("patients.id"))
     doctor_id = Column(Integer, ForeignKey("doctors.id"))
     session_data = Column(Text)  # JSON string to store conversation context
@@ -127,6 +147,9 @@ class ChatSession(Base):
 
 class DoctorTimeSlots(Base):
     __tablename__ = "doctor_time_slots"
+    __table_args__ = (
+        Index("ix_doctor_time_slots_doctor_day_available", "doctor_id", "day_of_week", "is_available"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     doctor_id = Column(Integer, ForeignKey("doctors.id"), nullable=False)
@@ -141,6 +164,23 @@ class DoctorTimeSlots(Base):
     # Relationships
     doctor = relationship("Doctor", back_populates="time_slots")
 
+class DoctorSlotCalendar(Base):
+    """Materialized slots expanded from DoctorTimeSlots for a rolling horizon"""
+    __tablename__ = "doctor_slot_calendar"
+    __table_args__ = (
+        UniqueConstraint("doctor_id", "slot_datetime", name="uq_slot_calendar_doctor_datetime"),
+        Index("ix_slot_calendar_doctor_date", "doctor_id", "slot_date", "is_booked"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    doctor_id = Column(Integer, ForeignKey("doctors.id"), nullable=False)
+    slot_date = Column(Date, nullable=False)
+    slot_datetime = Column(DateTime, nullable=False)  # Start of the slot
+    time_slot_id = Column(Integer, nullable=True)  # DoctorTimeSlots rule that produced it (not a FK so rules can be deleted)
+    is_booked = Column(Boolean, default=False, nullable=False)
+    appointment_id = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, default=get_local_now, onupdate=get_local_now)
+
 class HealthPackage(Base):
     __tablename__ = "health_packages"
     
@@ -180,6 +220,9 @@ class HealthPackageTest(Base):
 
 class HealthPackageBooking(Base):
     __tablename__ = "health_package_bookings"
+    __table_args__ = (
+        Index("ix_health_package_bookings_status", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     package_id = Column(Integer, ForeignKey("health_packages.id"), nullable=False)
@@ -206,6 +249,9 @@ class HealthPackageBooking(Base):
 
 class CallbackRequest(Base):
     __tablename__ = "callback_requests"
+    __table_args__ = (
+        Index("ix_callback_requests_status_created", "status", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     mobile_number = Column(String(20), nullable=False)
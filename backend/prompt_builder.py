@@ -0,0 +1,235 @@
+"""
+Token-budgeted prompt construction for chat completions.
+
+Patient and doctor context are rendered as compact "field: value" lines
+instead of Python dict reprs, and retrieved chunks are added in relevance
+order until the context budget is spent. The first chunk that does not fit
+is cut back to its leading sentences when enough budget is left; chunks
+after it are dropped. Conversation history has its own budget and keeps
+the most recent turns. Tokens are counted with tiktoken when it is installed
+and estimated from the text length otherwise.
+
+Every build records the prompt's token count next to what the old
+unbounded prompt would have cost, so the savings show up in stats().
+"""
+
+import math
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from text_config import AIPrompts, ContextLabels
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a length estimate
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4  # Rough average for English text with OpenAI tokenizers
+TRUNCATION_MARK = " …"
+
+
+class TokenCounter:
+    """Counts tokens with the model's tiktoken encoding, or estimates them.
+
+    The encoding is loaded on first use: tiktoken downloads it the first
+    time, and without network access counts fall back to the estimate.
+    """
+
+    def __init__(self, model: str = "gpt-3.5-turbo"):
+        self.model = model
+        self._encoding = None
+        self._loaded = tiktoken is None
+        self._load_lock = threading.Lock()
+
+    @property
+    def encoding(self):
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    try:
+                        try:
+                            self._encoding = tiktoken.encoding_for_model(self.model)
+                        except KeyError:
+                            self._encoding = tiktoken.get_encoding("cl100k_base")
+                    except Exception as e:
+                        print(f"⚠️ tiktoken encoding unavailable, estimating token counts: {e}")
+                    self._loaded = True
+        return self._encoding
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        encoding = self.encoding
+        if encoding is not None:
+            return len(encoding.encode(text))
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Leading whole sentences of text within max_tokens (whole words when one sentence is too long)"""
+        budget = max_tokens - self.count(TRUNCATION_MARK)
+        kept, used = [], 0
+        for sentence in re.split(r"(?<=[.!?])\s+", text):
+            tokens = self.count(sentence) + 1
+            if used + tokens > budget:
+                break
+            kept.append(sentence)
+            used += tokens
+        if not kept:
+            for word in text.split():
+                tokens = self.count(word) + 1
+                if used + tokens > budget:
+                    break
+                kept.append(word)
+                used += tokens
+        return " ".join(kept) + TRUNCATION_MARK if kept else ""
+
+
+def render_context(context: Optional[Dict]) -> str:
+    """One "field: value" line per non-empty field"""
+    if not context:
+        return ""
+    lines = []
+    for key, value in context.items():
+        if value is None or value == "" or value == [] or value == {}:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(item) for item in value)
+        elif isinstance(value, dict):
+            value = "; ".join(f"{k}: {v}" for k, v in value.items() if v not in (None, ""))
+        lines.append(f"{key.replace('_', ' ')}: {' '.join(str(value).split())}")
+    return "\n".join(lines)
+
+
+class PromptBuilder:
+    """Builds chat messages whose context fits a token budget"""
+
+    def __init__(self, context_budget_tokens: int = 1200, min_chunk_tokens: int = 40, model: str = "gpt-3.5-turbo",
+                 history_budget_tokens: int = 300):
+        self.context_budget_tokens = context_budget_tokens
+        self.history_budget_tokens = history_budget_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+        self.counter = TokenCounter(model)
+        self._lock = threading.Lock()  # Sync requests build prompts on worker threads
+        self._totals = {
+            "requests": 0, "prompt_tokens": 0, "unbounded_prompt_tokens": 0,
+            "chunks_included": 0, "chunks_truncated": 0, "chunks_dropped": 0, "history_turns": 0
+        }
+        self.last_request: Optional[Dict] = None
+
+    def _fit_documents(self, retrieved_docs: List[Dict], budget: int) -> Tuple[List[str], Dict]:
+        """Chunk texts in rank order within budget tokens"""
+        texts, report = [], {"chunks_included": 0, "chunks_truncated": 0, "chunks_dropped": 0}
+        for position, doc in enumerate(retrieved_docs):
+            content = " ".join(doc["content"].split())
+            tokens = self.counter.count(content) + 2  # Separator between chunks
+            if tokens <= budget:
+                texts.append(content)
+                budget -= tokens
+                report["chunks_included"] += 1
+                continue
+            if budget >= self.min_chunk_tokens:
+                truncated = self.counter.truncate(content, budget - 2)
+                if truncated:
+                    texts.append(truncated)
+                    report["chunks_truncated"] += 1
+                    position += 1
+            report["chunks_dropped"] += len(retrieved_docs) - position
+            break
+        return texts, report
+
+    def _fit_history(self, history: List[Dict], budget: int) -> List[str]:
+        """Most recent turns within budget tokens, oldest first; the oldest kept turn may be cut"""
+        lines = []
+        for turn in reversed(history):
+            text = f"Patient: {turn.get('user', '')}\nAssistant: {turn.get('assistant', '')}"
+            tokens = self.counter.count(text) + 1
+            if tokens > budget:
+                if budget >= self.min_chunk_tokens:
+                    truncated = self.counter.truncate(text, budget - 1)
+                    if truncated:
+                        lines.append(truncated)
+                break
+            lines.append(text)
+            budget -= tokens
+        return lines[::-1]
+
+    def _unbounded_tokens(self, query, patient_context, doctor_context, retrieved_docs, history) -> int:
+        """Size of the prompt without compaction: dict reprs, every chunk and every turn in full"""
+        parts = [AIPrompts.SYSTEM_PROMPT_WITH_CONFIDENCE, query]
+        parts.extend(f"{turn.get('user', '')} {turn.get('assistant', '')}" for turn in history or [])
+        if patient_context:
+            parts.append(str(patient_context))
+        if doctor_context:
+            parts.append(str(doctor_context))
+        parts.extend(doc["content"] for doc in retrieved_docs or [])
+        return sum(self.counter.count(part) for part in parts)
+
+    def build(
+        self,
+        query: str,
+        patient_context: Optional[Dict] = None,
+        doctor_context: Optional[Dict] = None,
+        retrieved_docs: List[Dict] = None,
+        history: Optional[List[Dict]] = None
+    ) -> List[Dict]:
+        """System and user messages; retrieved_docs must be ordered by relevance, history oldest first"""
+        context_parts = []
+        patient_text = render_context(patient_context)
+        doctor_text = render_context(doctor_context)
+        if patient_text:
+            context_parts.append(f"{ContextLabels.PATIENT_INFORMATION}:\n{patient_text}")
+        if doctor_text:
+            context_parts.append(f"{ContextLabels.ASSIGNED_DOCTOR}:\n{doctor_text}")
+
+        report = {"chunks_included": 0, "chunks_truncated": 0, "chunks_dropped": 0}
+        if retrieved_docs:
+            remaining = self.context_budget_tokens - sum(self.counter.count(part) for part in context_parts)
+            doc_texts, report = self._fit_documents(retrieved_docs, remaining)
+            if doc_texts:
+                context_parts.append(f"{ContextLabels.RELEVANT_GUIDELINES}:\n" + "\n\n".join(doc_texts))
+        report["history_turns"] = 0
+        if history:
+            turns = self._fit_history(history, self.history_budget_tokens)
+            report["history_turns"] = len(turns)
+            if turns:
+                context_parts.append(f"{ContextLabels.CONVERSATION_HISTORY}:\n" + "\n".join(turns))
+
+        context = "\n\n".join(context_parts)
+        messages = [
+            {"role": "system", "content": AIPrompts.SYSTEM_PROMPT_WITH_CONFIDENCE},
+            {"role": "user", "content": f"{ContextLabels.CONTEXT}:\n{context}\n\n{ContextLabels.USER_QUERY}: {query}"}
+        ]
+
+        prompt_tokens = sum(self.counter.count(message["content"]) for message in messages)
+        unbounded = self._unbounded_tokens(query, patient_context, doctor_context, retrieved_docs, history)
+        self._record(dict(report, prompt_tokens=prompt_tokens, unbounded_prompt_tokens=unbounded))
+        return messages
+
+    def _record(self, request: Dict):
+        with self._lock:
+            self._totals["requests"] += 1
+            for key, value in request.items():
+                self._totals[key] += value
+            self.last_request = request
+
+    def stats(self) -> Dict:
+        with self._lock:
+            totals = dict(self._totals)
+            last_request = self.last_request
+        requests = totals["requests"]
+        saved = totals["unbounded_prompt_tokens"] - totals["prompt_tokens"]
+        return {
+            **totals,
+            "avg_prompt_tokens": round(totals["prompt_tokens"] / requests, 1) if requests else 0.0,
+            "tokens_saved": saved,
+            "savings_percent": round(100 * saved / totals["unbounded_prompt_tokens"], 1)
+            if totals["unbounded_prompt_tokens"] else 0.0,
+            "context_budget_tokens": self.context_budget_tokens,
+            "tokenizer": "tiktoken" if self.counter.exact else "estimate",
+            "last_request": last_request
+        }
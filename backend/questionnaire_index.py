@@ -0,0 +1,203 @@
+"""
+In-process questionnaire index for the chatbot fallback path.
+
+Questionnaires are loaded once, compiled into keyword automata and kept in
+memory together with their trigger keywords grouped by category. The index
+is invalidated whenever a Questionnaire row is inserted, updated or deleted
+through the ORM, and rebuilt lazily on the next lookup after the change has
+been committed.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from keyword_matcher import KeywordMatcher
+from model_watch import watch_model
+from models import Questionnaire
+from text_config import HealthKeywords, DatabaseCategories
+
+
+@dataclass(frozen=True)
+class QuestionnaireEntry:
+    """Detached, read-only snapshot of a Questionnaire row"""
+    id: int
+    trigger_keywords: str
+    question: str
+    response_template: str
+    category: str
+    priority: int
+    keywords: Tuple[str, ...]
+    is_active: bool = True
+
+
+def split_keywords(trigger_keywords: Optional[str]) -> List[str]:
+    """Split a comma separated trigger_keywords value the same way the matcher does"""
+    return [kw.strip().lower() for kw in (trigger_keywords or "").split(',')]
+
+
+class QuestionnaireSnapshot:
+    """Immutable view of the questionnaires at a given index version"""
+
+    # Categories whose keywords mean the user described an actual health issue
+    HEALTH_CATEGORIES = (
+        DatabaseCategories.SYMPTOMS,
+        DatabaseCategories.APPOINTMENT,
+        DatabaseCategories.EMERGENCY,
+        DatabaseCategories.MEDICATION
+    )
+
+    def __init__(self, version: int, entries: List[QuestionnaireEntry]):
+        self.version = version
+        self.entries = entries
+        self.active_entries = [entry for entry in entries if entry.is_active]
+        self._active_by_id = {entry.id: entry for entry in self.active_entries}
+        self.matcher = KeywordMatcher(
+            (keyword, rank)
+            for rank, entry in enumerate(self.active_entries)
+            for keyword in entry.keywords
+        )
+
+        # Trigger keywords keyed by category (all rows, as the fallback always used)
+        keywords_by_category: Dict[str, set] = {}
+        for entry in entries:
+            keywords_by_category.setdefault(entry.category, set()).update(entry.keywords)
+        self.keywords_by_category: Dict[str, FrozenSet[str]] = {
+            category: frozenset(keywords) for category, keywords in keywords_by_category.items()
+        }
+
+        # Greeting keywords come from general questionnaires that mention a greeting
+        self.greeting_keywords: FrozenSet[str] = frozenset(
+            keyword
+            for entry in entries
+            if entry.category == DatabaseCategories.GENERAL
+            and any(greeting in entry.trigger_keywords.lower() for greeting in HealthKeywords.GREETINGS[:3])
+            for keyword in entry.keywords
+        )
+        self.health_keywords: FrozenSet[str] = self.keywords_for(*self.HEALTH_CATEGORIES)
+
+        self._greeting_matcher = KeywordMatcher((keyword, 0) for keyword in self.greeting_keywords)
+        self._health_matcher = KeywordMatcher((keyword, 0) for keyword in self.health_keywords)
+
+        self.default_entry: Optional[QuestionnaireEntry] = next(
+            (entry for entry in self.active_entries if entry.category == DatabaseCategories.GENERAL),
+            None
+        )
+
+    def keywords_for(self, *categories: str) -> FrozenSet[str]:
+        """Return the union of trigger keywords for the given categories"""
+        keywords = set()
+        for category in categories:
+            keywords.update(self.keywords_by_category.get(category, ()))
+        return frozenset(keywords)
+
+    def find_match(self, query: str) -> Optional[QuestionnaireEntry]:
+        rank = self.matcher.best_rank(query.lower())
+        if rank is None:
+            return None
+        return self.active_entries[rank]
+
+    def get_active(self, questionnaire_id: int) -> Optional[QuestionnaireEntry]:
+        return self._active_by_id.get(questionnaire_id)
+
+    def is_greeting(self, query_lower: str) -> bool:
+        return self._greeting_matcher.best_rank(query_lower) is not None
+
+    def mentions_health_topic(self, query_lower: str) -> bool:
+        return self._health_matcher.best_rank(query_lower) is not None
+
+
+class QuestionnaireIndex:
+    """Versioned cache of active questionnaires shared by all requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot: Optional[QuestionnaireSnapshot] = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self):
+        """Mark the cached snapshot as stale so the next lookup rebuilds it"""
+        with self._lock:
+            self._version += 1
+
+    def get_snapshot(self, db: Session) -> QuestionnaireSnapshot:
+        """Return the current snapshot, rebuilding it if questionnaires changed"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self._version:
+            return snapshot
+
+        with self._lock:
+            version = self._version
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+
+            questionnaires = db.query(Questionnaire).order_by(
+                Questionnaire.priority.asc(), Questionnaire.id.asc()
+            ).all()
+
+            entries = [
+                QuestionnaireEntry(
+                    id=q.id,
+                    trigger_keywords=q.trigger_keywords,
+                    question=q.question,
+                    response_template=q.response_template,
+                    category=q.category,
+                    priority=q.priority,
+                    keywords=tuple(split_keywords(q.trigger_keywords)),
+                    is_active=bool(q.is_active)
+                )
+                for q in questionnaires
+            ]
+            snapshot = QuestionnaireSnapshot(version, entries)
+            self._snapshot = snapshot
+            return snapshot
+
+    def find_matching(self, query: str, db: Session) -> Optional[QuestionnaireEntry]:
+        """Find the highest priority active questionnaire whose keywords appear in query"""
+        return self.get_snapshot(db).find_match(query)
+
+    def refresh(self, db: Optional[Session] = None) -> QuestionnaireSnapshot:
+        """Force a rebuild, e.g. after questionnaires were edited by another process"""
+        self.invalidate()
+        if db is not None:
+            return self.get_snapshot(db)
+
+        db = SessionLocal()
+        try:
+            return self.get_snapshot(db)
+        finally:
+            db.close()
+
+    def stats(self) -> Dict:
+        """Summary of the cached snapshot for monitoring"""
+        snapshot = self._snapshot
+        return {
+            "version": self._version,
+            "built_version": snapshot.version if snapshot else None,
+            "total_questionnaires": len(snapshot.entries) if snapshot else 0,
+            "active_questionnaires": len(snapshot.active_entries) if snapshot else 0,
+            "keywords_by_category": {
+                category: len(keywords)
+                for category, keywords in (snapshot.keywords_by_category.items() if snapshot else [])
+            }
+        }
+
+
+# Global questionnaire index instance
+questionnaire_index = QuestionnaireIndex()
+
+
+# =============================================================================
+# INVALIDATION HOOKS
+# =============================================================================
+
+# Only rebuild once the change is visible to other sessions
+watch_model(Questionnaire, lambda changed: questionnaire_index.invalidate())
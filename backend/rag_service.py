@@ -1,40 +1,24 @@
 import openai
 from typing import List, Dict, Optional
-import chromadb
-from chromadb.config import Settings
 import uuid
-from config import OPENAI_API_KEY, CHROMA_PERSIST_DIRECTORY, EMBEDDING_MODEL
+from config import OPENAI_API_KEY
 from sqlalchemy.orm import Session
 from models import Patient, Document
+from llm_service import llm_service
+from retrieval_backends import ChromaBackend
 
 # Initialize OpenAI client
 openai.api_key = OPENAI_API_KEY
 
 class RAGService:
     def __init__(self):
-        # Initialize ChromaDB
-        self.chroma_client = chromadb.PersistentClient(
-            path=CHROMA_PERSIST_DIRECTORY,
-            settings=Settings(anonymized_telemetry=False)
-        )
-        
-        # Get or create collection
-        try:
-            self.collection = self.chroma_client.get_collection("healthcare_documents")
-        except:
-            self.collection = self.chroma_client.create_collection(
-                name="healthcare_documents",
-                metadata={"description": "Healthcare guidelines and documents"}
-            )
+        # ChromaDB collection of document chunks (the chroma retrieval backend)
+        self.backend = ChromaBackend(embed=llm_service.embed_texts)
     
     def get_embedding(self, text: str) -> List[float]:
-        """Get embedding for text using OpenAI"""
+        """Get embedding for text (served from the shared embedding cache when seen before)"""
         try:
-            response = openai.embeddings.create(
-                input=text,
-                model=EMBEDDING_MODEL
-            )
-            return response.data[0].embedding
+            return llm_service.embed_texts([text])[0]
         except Exception as e:
             print(f"Error getting embedding: {e}")
             return []
@@ -42,25 +26,8 @@ class RAGService:
     def add_document(self, title: str, content: str, doc_type: str = "guideline"):
         """Add document to vector store"""
         try:
-            # Create document ID
-            doc_id = str(uuid.uuid4())
-            
-            # Get embedding
-            embedding = self.get_embedding(content)
-            
-            if embedding:
-                # Add to ChromaDB
-                self.collection.add(
-                    ids=[doc_id],
-                    embeddings=[embedding],
-                    documents=[content],
-                    metadatas=[{
-                        "title": title,
-                        "type": doc_type,
-                        "content_preview": content[:200] + "..." if len(content) > 200 else content
-                    }]
-                )
-                return True
+            document = Document(id=str(uuid.uuid4()), title=title, content=content, document_type=doc_type)
+            return self.backend.add([document]) == 1
         except Exception as e:
             print(f"Error adding document: {e}")
         return False
@@ -68,29 +35,7 @@ class RAGService:
     def search_documents(self, query: str, n_results: int = 5) -> List[Dict]:
         """Search for relevant documents"""
         try:
-            # Get query embedding
-            query_embedding = self.get_embedding(query)
-            
-            if not query_embedding:
-                return []
-            
-            # Search in ChromaDB
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results
-            )
-            
-            # Format results
-            documents = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    documents.append({
-                        "content": doc,
-                        "metadata": results['metadatas'][0][i] if results['metadatas'] else {},
-                        "distance": results['distances'][0][i] if results['distances'] else 0
-                    })
-            
-            return documents
+            return self.backend.search(query, n_results)
         except Exception as e:
             print(f"Error searching documents: {e}")
             return []
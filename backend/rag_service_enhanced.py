@@ -1,17 +1,25 @@
+import asyncio
 import openai
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 import uuid
 import json
-import re
-from config import OPENAI_API_KEY, EMBEDDING_MODEL
+from config import OPENAI_API_KEY
 from sqlalchemy.orm import Session
-from models import Patient, Document, Doctor, Questionnaire, ChatSession
+from database import SessionLocal
+from models import Patient, Document, Doctor, ChatSession
 from text_config import (
     SystemMessages, AIPrompts, ContextLabels, ErrorMessages, LogMessages,
     DefaultValues, HealthKeywords, UserChoices, PainRecommendations,
-    FeverAdvice, TemplatePlaceholders, DatabaseCategories, ConfidencePatterns
+    FeverAdvice, TemplatePlaceholders, ConfidencePatterns
 )
 from llm_service import llm_service
+from llm_config import llm_config
+from questionnaire_index import questionnaire_index, QuestionnaireEntry
+from response_templates import template_renderer
+from entity_extractor import entity_extractor
+from confidence_stream import ConfidenceMarkerFilter
+from retrieval_backends import rag_backend
+from session_store import ConversationSession, session_store
 
 # Initialize OpenAI client
 openai.api_key = OPENAI_API_KEY
@@ -20,38 +28,22 @@ class EnhancedRAGService:
     def __init__(self):
         # Simple in-memory document storage for demo
         self.documents = []
+        self.session_store = session_store
     
     def get_embedding(self, text: str) -> List[float]:
-        """Get embedding for text using OpenAI"""
+        """Get embedding for text (served from the shared embedding cache when seen before)"""
         try:
-            response = openai.embeddings.create(
-                input=text,
-                model=EMBEDDING_MODEL
-            )
-            return response.data[0].embedding
+            return llm_service.embed_texts([text])[0]
         except Exception as e:
             print(f"{ErrorMessages.EMBEDDING_ERROR}: {e}")
             return []
     
-    def find_matching_questionnaire(self, query: str, db: Session) -> Optional[Questionnaire]:
+    def find_matching_questionnaire(self, query: str, db: Session) -> Optional[QuestionnaireEntry]:
         """Find the best matching questionnaire based on keywords"""
         try:
-            # Get all active questionnaires ordered by priority
-            questionnaires = db.query(Questionnaire).filter(
-                Questionnaire.is_active == True
-            ).order_by(Questionnaire.priority.asc()).all()
-            
-            query_lower = query.lower()
-            
-            for questionnaire in questionnaires:
-                keywords = [kw.strip().lower() for kw in questionnaire.trigger_keywords.split(',')]
-                
-                # Check if any keyword matches
-                for keyword in keywords:
-                    if keyword in query_lower:
-                        return questionnaire
-            
-            return None
+            # Active questionnaires are compiled once into a keyword automaton
+            # ordered by priority and matched in a single pass over the query
+            return questionnaire_index.find_matching(query, db)
         except Exception as e:
             print(f"{ErrorMessages.QUESTIONNAIRE_ERROR}: {e}")
             return None
@@ -65,164 +57,78 @@ class EnhancedRAGService:
         """Check if user has provided a meaningful response (not just greetings)"""
         query_lower = query.lower()
         
-        # Get greetings from database - look for questionnaires with greeting keywords
+        # Greeting and health keywords are served from the in-memory questionnaire index
         try:
-            greeting_questionnaires = db.query(Questionnaire).filter(
-                Questionnaire.category == DatabaseCategories.GENERAL,
-                Questionnaire.trigger_keywords.contains(HealthKeywords.GREETINGS[0]) |
-                Questionnaire.trigger_keywords.contains(HealthKeywords.GREETINGS[1]) |
-                Questionnaire.trigger_keywords.contains(HealthKeywords.GREETINGS[2])
-            ).all()
-            
-            # Extract all greeting keywords from database
-            greetings = []
-            for q in greeting_questionnaires:
-                keywords = [kw.strip().lower() for kw in q.trigger_keywords.split(',')]
-                greetings.extend(keywords)
-            
-            # Remove duplicates
-            greetings = list(set(greetings))
+            snapshot = questionnaire_index.get_snapshot(db)
         except Exception as e:
             print(f"{ErrorMessages.GREETING_ERROR}: {e}")
-            greetings = []
+            snapshot = None
         
         # If it's just a greeting, show the question
-        if any(greeting in query_lower for greeting in greetings) and len(query.split()) <= 3:
+        if snapshot and snapshot.is_greeting(query_lower) and len(query.split()) <= 3:
             return False
         
         # If user mentions specific health issues, process the response
-        # Get health keywords from database as well
-        try:
-            health_questionnaires = db.query(Questionnaire).filter(
-                Questionnaire.category.in_([
-                    DatabaseCategories.SYMPTOMS, 
-                    DatabaseCategories.APPOINTMENT, 
-                    DatabaseCategories.EMERGENCY, 
-                    DatabaseCategories.MEDICATION
-                ])
-            ).all()
+        if snapshot is None:
+            print(f"{ErrorMessages.HEALTH_KEYWORDS_ERROR}: questionnaire index unavailable")
+            return any(keyword in query_lower for keyword in HealthKeywords.HEALTH_ISSUES)
+        
+        return snapshot.mentions_health_topic(query_lower)
+    
+    def build_template_values(self, user_input: str) -> Dict[str, str]:
+        """Build the placeholder -> value mapping for a user's message"""
+        values = dict(TemplatePlaceholders.DEFAULT_VALUES)
+        user_input_lower = user_input.lower()
+        
+        # Common replacements for user choices
+        for key, value in UserChoices.CHOICE_MAPPINGS.items():
+            if key in user_input or key in user_input_lower:
+                values["user_choice"] = value
+                break
+        
+        # Pain level, temperature, pain location and duration from precompiled extractors
+        entities = entity_extractor.extract(user_input)
+        
+        if entities.pain_level is not None:
+            values["pain_level"] = entities.pain_level_text
             
-            health_keywords = []
-            for q in health_questionnaires:
-                keywords = [kw.strip().lower() for kw in q.trigger_keywords.split(',')]
-                health_keywords.extend(keywords)
+            # Add recommendation based on pain level
+            if entities.pain_level >= PainRecommendations.PAIN_LEVELS["high"]:
+                values["recommendation"] = PainRecommendations.RECOMMENDATIONS["high"]
+            elif entities.pain_level >= PainRecommendations.PAIN_LEVELS["moderate_high"]:
+                values["recommendation"] = PainRecommendations.RECOMMENDATIONS["moderate_high"]
+            elif entities.pain_level >= PainRecommendations.PAIN_LEVELS["moderate"]:
+                values["recommendation"] = PainRecommendations.RECOMMENDATIONS["moderate"]
+            else:
+                values["recommendation"] = PainRecommendations.RECOMMENDATIONS["low"]
+        
+        if entities.temperature is not None:
+            values["temperature"] = entities.temperature_text
             
-            # Remove duplicates
-            health_keywords = list(set(health_keywords))
-        except Exception as e:
-            print(f"{ErrorMessages.HEALTH_KEYWORDS_ERROR}: {e}")
-            health_keywords = HealthKeywords.HEALTH_ISSUES
+            if entities.temperature >= FeverAdvice.TEMPERATURE_LEVELS["high"]:
+                values["fever_advice"] = FeverAdvice.ADVICE["high"]
+            elif entities.temperature >= FeverAdvice.TEMPERATURE_LEVELS["moderate"]:
+                values["fever_advice"] = FeverAdvice.ADVICE["moderate"]
+            else:
+                values["fever_advice"] = FeverAdvice.ADVICE["normal"]
+        
+        if entities.pain_location:
+            values["pain_location"] = entities.pain_location
         
-        return any(keyword in query_lower for keyword in health_keywords)
+        if entities.duration:
+            values["duration"] = entities.duration
+        
+        return values
     
-    def process_questionnaire_response(self, questionnaire: Questionnaire, user_input: str) -> str:
+    def process_questionnaire_response(self, questionnaire: QuestionnaireEntry, user_input: str) -> str:
         """Process user input and generate response based on questionnaire template"""
         try:
-            # Simple template processing - in a real system, you'd have more sophisticated NLP
-            response = questionnaire.response_template
-            
-            # Extract basic information from user input
-            user_input_lower = user_input.lower()
-            
-            # Common replacements for user choices
-            for key, value in UserChoices.CHOICE_MAPPINGS.items():
-                if key in user_input or key in user_input_lower:
-                    response = response.replace("{user_choice}", value)
-                    break
-            
-            # If no specific choice detected but user mentioned health topics, provide a default
-            if "{user_choice}" in response:
-                response = response.replace("{user_choice}", DefaultValues.HEALTH_CONCERN)
-            
-            # Extract pain level (1-10)
-            pain_match = re.search(r'(\d+)/10|(\d+)\s*out\s*of\s*10|pain\s*level\s*(\d+)', user_input_lower)
-            if pain_match:
-                pain_level = pain_match.group(1) or pain_match.group(2) or pain_match.group(3)
-                response = response.replace("{pain_level}", pain_level)
-                
-                # Add recommendation based on pain level
-                pain_int = int(pain_level)
-                if pain_int >= PainRecommendations.PAIN_LEVELS["high"]:
-                    recommendation = PainRecommendations.RECOMMENDATIONS["high"]
-                elif pain_int >= PainRecommendations.PAIN_LEVELS["moderate_high"]:
-                    recommendation = PainRecommendations.RECOMMENDATIONS["moderate_high"]
-                elif pain_int >= PainRecommendations.PAIN_LEVELS["moderate"]:
-                    recommendation = PainRecommendations.RECOMMENDATIONS["moderate"]
-                else:
-                    recommendation = PainRecommendations.RECOMMENDATIONS["low"]
-                
-                response = response.replace("{recommendation}", recommendation)
-            
-            # Extract temperature
-            temp_match = re.search(r'(\d+(?:\.\d+)?)\s*°?[fF]|(\d+(?:\.\d+)?)\s*degrees', user_input_lower)
-            if temp_match:
-                temperature = temp_match.group(1) or temp_match.group(2)
-                response = response.replace("{temperature}", temperature)
-                
-                temp_float = float(temperature)
-                if temp_float >= FeverAdvice.TEMPERATURE_LEVELS["high"]:
-                    fever_advice = FeverAdvice.ADVICE["high"]
-                elif temp_float >= FeverAdvice.TEMPERATURE_LEVELS["moderate"]:
-                    fever_advice = FeverAdvice.ADVICE["moderate"]
-                else:
-                    fever_advice = FeverAdvice.ADVICE["normal"]
-                
-                response = response.replace("{fever_advice}", fever_advice)
-            
-            # Extract pain location
-            detected_location = DefaultValues.AFFECTED_AREA
-            for location, keywords in HealthKeywords.PAIN_LOCATIONS.items():
-                if any(keyword in user_input_lower for keyword in keywords):
-                    detected_location = location
-                    break
-            
-            response = response.replace("{pain_location}", detected_location)
-            
-            # Extract duration
-            detected_duration = "a while"
-            for duration, keywords in HealthKeywords.DURATION_KEYWORDS.items():
-                if any(keyword in user_input_lower for keyword in keywords):
-                    detected_duration = duration
-                    break
-            
-            response = response.replace("{duration}", detected_duration)
-            response = response.replace("{appointment_type}", "medical")
-            response = response.replace("{doctor_preference}", DefaultValues.PREFERRED_DOCTOR)
-            response = response.replace("{appointment_timing}", DefaultValues.PREFERRED_TIME)
-            response = response.replace("{medication_name}", DefaultValues.YOUR_MEDICATION)
-            response = response.replace("{medication_response}", DefaultValues.CONSULT_DOCTOR)
-            response = response.replace("{cough_type}", "persistent")
-            response = response.replace("{cough_advice}", "staying hydrated and resting")
-            response = response.replace("{headache_location}", "your head")
-            response = response.replace("{severity}", "moderate")
-            response = response.replace("{headache_advice}", "rest in a quiet, dark room")
-            response = response.replace("{vomiting_status}", "some discomfort")
-            response = response.replace("{nausea_advice}", "resting and avoiding solid foods")
-            response = response.replace("{user_topic}", DefaultValues.HEALTH_CONCERN)
-            response = response.replace("{general_advice}", "consulting with a healthcare professional")
+            # Templates are parsed once per questionnaire and rendered in a single pass
+            parsed = template_renderer.get(questionnaire.id, questionnaire.response_template)
+            if not parsed.slots:
+                return parsed.source
             
-            # Replace any remaining placeholders with sensible defaults
-            response = response.replace("{user_choice}", DefaultValues.HEALTH_CONCERN)
-            response = response.replace("{pain_level}", "moderate")
-            response = response.replace("{recommendation}", "consulting with a healthcare professional")
-            response = response.replace("{temperature}", "normal")
-            response = response.replace("{fever_advice}", "monitor and rest")
-            response = response.replace("{pain_location}", DefaultValues.AFFECTED_AREA)
-            response = response.replace("{duration}", "recently")
-            response = response.replace("{appointment_type}", "medical")
-            response = response.replace("{doctor_preference}", DefaultValues.PREFERRED_DOCTOR)
-            response = response.replace("{appointment_timing}", DefaultValues.PREFERRED_TIME)
-            response = response.replace("{medication_name}", DefaultValues.YOUR_MEDICATION)
-            response = response.replace("{medication_response}", DefaultValues.CONSULT_DOCTOR)
-            response = response.replace("{cough_type}", "persistent")
-            response = response.replace("{cough_advice}", "staying hydrated and resting")
-            response = response.replace("{headache_location}", "your head")
-            response = response.replace("{severity}", "moderate")
-            response = response.replace("{headache_advice}", "rest in a quiet, dark room")
-            response = response.replace("{vomiting_status}", "some discomfort")
-            response = response.replace("{nausea_advice}", "resting and avoiding solid foods")
-            
-            return response
+            return parsed.render(self.build_template_values(user_input))
             
         except Exception as e:
             print(f"{ErrorMessages.PROCESSING_ERROR}: {e}")
@@ -264,7 +170,8 @@ class EnhancedRAGService:
 
     def generate_openai_response_with_confidence(self, query: str, patient_context: Optional[Dict] = None,
                                                 doctor_context: Optional[Dict] = None,
-                                                retrieved_docs: List[Dict] = None) -> tuple[str, float]:
+                                                retrieved_docs: List[Dict] = None,
+                                                history: Optional[List[Dict]] = None) -> tuple[str, float]:
         """Generate response using unified LLM service with confidence scoring"""
         try:
             # Use the unified LLM service which will try multiple providers
@@ -272,7 +179,8 @@ class EnhancedRAGService:
                 query=query,
                 patient_context=patient_context,
                 doctor_context=doctor_context,
-                retrieved_docs=retrieved_docs
+                retrieved_docs=retrieved_docs,
+                history=history
             )
             
             return response_text, confidence
@@ -288,11 +196,26 @@ class EnhancedRAGService:
         response, _ = self.generate_openai_response_with_confidence(query, patient_context, doctor_context, retrieved_docs)
         return response
 
-    def process_query_with_fallback(self, query: str, db: Session, patient_id: Optional[int] = None,
-                                   doctor_id: Optional[int] = None) -> Dict:
-        """Process a complete query with AI-first approach and database fallback when AI confidence is low"""
-        
-        # Get patient and doctor context
+    async def agenerate_openai_response_with_confidence(self, query: str, patient_context: Optional[Dict] = None,
+                                                        doctor_context: Optional[Dict] = None,
+                                                        retrieved_docs: List[Dict] = None,
+                                                        history: Optional[List[Dict]] = None) -> tuple[str, float]:
+        """Async version of generate_openai_response_with_confidence"""
+        try:
+            return await llm_service.agenerate_response_with_confidence(
+                query=query,
+                patient_context=patient_context,
+                doctor_context=doctor_context,
+                retrieved_docs=retrieved_docs,
+                history=history
+            )
+        except Exception as e:
+            print(f"{ErrorMessages.OPENAI_ERROR}: {e}")
+            raise e
+
+    def get_query_contexts(self, db: Session, patient_id: Optional[int] = None,
+                           doctor_id: Optional[int] = None) -> tuple[Optional[Dict], Optional[Dict]]:
+        """Patient and doctor context for a chat query"""
         patient_context = None
         if patient_id:
             patient_context = self.get_patient_context(db, patient_id)
@@ -301,40 +224,100 @@ class EnhancedRAGService:
         if doctor_id:
             doctor_context = self.get_doctor_context(db, doctor_id)
 
-        # Try OpenAI first with confidence checking
+        return patient_context, doctor_context
+
+    def open_session(self, session_id: Optional[str], patient_id: Optional[int] = None,
+                     doctor_id: Optional[int] = None) -> Optional[ConversationSession]:
+        """The conversation session for this turn, or None to answer without history"""
         try:
-            # Search for relevant documents (if available)
-            retrieved_docs = []  # Simplified for now
-            
-            # Generate OpenAI response with confidence score
-            response, confidence = self.generate_openai_response_with_confidence(
-                query, patient_context, doctor_context, retrieved_docs
-            )
-            
-            # Define confidence threshold
-            confidence_threshold = DefaultValues.CONFIDENCE_THRESHOLD
-            
-            # If AI is confident enough, return the response
-            if confidence >= confidence_threshold:
-                return {
-                    "response": response,
-                    "patient_context": patient_context,
-                    "doctor_context": doctor_context,
-                    "retrieved_documents": [doc.get('metadata', {}).get('title', 'Untitled') for doc in retrieved_docs],
-                    "fallback_mode": False,
-                    "ai_confidence": confidence
-                }
-            else:
-                print(LogMessages.AI_CONFIDENCE_LOW.format(confidence=confidence))
-                
+            return self.session_store.get_or_create(session_id, patient_id, doctor_id)
         except Exception as e:
-            print(f"{LogMessages.OPENAI_FAILED}: {e}")
-            confidence = 0.0
-        
-        # AI either failed or had low confidence - search local database
-        questionnaire = self.find_matching_questionnaire(query, db)
+            print(f"{ErrorMessages.CHAT_SESSION_ERROR}: {e}")
+            return None
+
+    async def aopen_session(self, session_id: Optional[str], patient_id: Optional[int] = None,
+                            doctor_id: Optional[int] = None) -> Optional[ConversationSession]:
+        """open_session; only cache misses go to a worker thread"""
+        session = self.session_store.lookup(session_id, patient_id, doctor_id)
+        if session is not None:
+            return session
+        return await asyncio.to_thread(self.open_session, session_id, patient_id, doctor_id)
+
+    def finish_turn(self, session: Optional[ConversationSession], query: str, result: Dict) -> Dict:
+        """Record the turn in its session and tell the client which session to continue"""
+        if session is not None:
+            self.session_store.record_turn(session, query, result)
+            result["session_id"] = session.token
+        return result
+
+    def retrieve_documents(self, query: str, db: Session) -> List[Dict]:
+        """Most relevant /add-doc document chunks for grounding the LLM answer (RAG_BACKEND)"""
+        self.sync_documents(db)
+        return self.search_documents(query)
+
+    def sync_documents(self, db: Session):
+        """Catch the retrieval backend up with the Document table"""
+        try:
+            # Recently failed documents are not re-queued on every chat message
+            rag_backend.sync(db, retry_failed=False)
+        except Exception as e:
+            print(f"Error syncing retrieval backend: {e}")
+
+    def search_documents(self, query: str) -> List[Dict]:
+        try:
+            return rag_backend.search(query)
+        except Exception as e:
+            print(f"Error searching documents: {e}")
+            return []
+
+    async def aretrieve_documents(self, query: str, db: Session) -> List[Dict]:
+        """retrieve_documents with the search in a worker thread (the query embedding is a network call).
+
+        The worker never touches db, so a caller may abandon it on a deadline
+        and keep using the session.
+        """
+        self.sync_documents(db)
+        return await asyncio.to_thread(self.search_documents, query)
+
+    def build_ai_result(self, response: str, confidence: float, patient_context: Optional[Dict],
+                        doctor_context: Optional[Dict], retrieved_docs: List[Dict]) -> Dict:
+        """Chat result for a confident AI response"""
+        return {
+            "response": response,
+            "patient_context": patient_context,
+            "doctor_context": doctor_context,
+            # Several chunks of one document are listed once
+            "retrieved_documents": list(dict.fromkeys(
+                doc.get('metadata', {}).get('title', 'Untitled') for doc in retrieved_docs
+            )),
+            "fallback_mode": False,
+            "ai_confidence": confidence
+        }
+
+    def get_active_questionnaire(self, questionnaire_id: int, db: Session) -> Optional[QuestionnaireEntry]:
+        """The questionnaire a session is waiting on, if it is still active"""
+        try:
+            return questionnaire_index.get_snapshot(db).get_active(questionnaire_id)
+        except Exception as e:
+            print(f"{ErrorMessages.QUESTIONNAIRE_ERROR}: {e}")
+            return None
+
+    def build_fallback_result(self, query: str, db: Session, patient_context: Optional[Dict],
+                              doctor_context: Optional[Dict], confidence: float,
+                              active_questionnaire_id: Optional[int] = None) -> Dict:
+        """Chat result from the local questionnaire database when AI failed or was unsure.
+
+        When the previous turn asked a questionnaire's question, this message
+        is taken as the answer to it instead of being matched again.
+        """
+        active = self.get_active_questionnaire(active_questionnaire_id, db) if active_questionnaire_id else None
+        questionnaire = active or self.find_matching_questionnaire(query, db)
+        questionnaire_id = questionnaire.id if questionnaire else None
         
-        if questionnaire:
+        if active:
+            response = self.process_questionnaire_response(active, query)
+            current_question = None
+        elif questionnaire:
             # Check if this is an initial greeting or needs more information
             if questionnaire.question and not self.has_user_response(query, db):
                 # Show the questionnaire question first
@@ -345,15 +328,17 @@ class EnhancedRAGService:
                 response = self.process_questionnaire_response(questionnaire, query)
                 current_question = None
         else:
-            # No matching questionnaire found, get default from database
-            default_questionnaire = db.query(Questionnaire).filter(
-                Questionnaire.category == DatabaseCategories.GENERAL,
-                Questionnaire.is_active == True
-            ).order_by(Questionnaire.priority.asc()).first()
+            # No matching questionnaire found, use the default general questionnaire
+            try:
+                default_questionnaire = questionnaire_index.get_snapshot(db).default_entry
+            except Exception as e:
+                print(f"{ErrorMessages.QUESTIONNAIRE_ERROR}: {e}")
+                default_questionnaire = None
             
             if default_questionnaire:
                 response = default_questionnaire.response_template
                 current_question = default_questionnaire.question
+                questionnaire_id = default_questionnaire.id
             else:
                 # If no questionnaires exist in database, create a basic one
                 response = DefaultValues.ADMIN_SETUP_MESSAGE
@@ -365,6 +350,174 @@ class EnhancedRAGService:
             "doctor_context": doctor_context,
             "retrieved_documents": [],
             "current_question": current_question,
+            "questionnaire_id": questionnaire_id,
             "fallback_mode": True,
-            "ai_confidence": confidence if 'confidence' in locals() else 0.0
+            "ai_confidence": confidence
         }
+
+    def process_query_with_fallback(self, query: str, db: Session, patient_id: Optional[int] = None,
+                                   doctor_id: Optional[int] = None, session_id: Optional[str] = None) -> Dict:
+        """Process a complete query with AI-first approach and database fallback when AI confidence is low"""
+        session = self.open_session(session_id, patient_id, doctor_id)
+        history = session.history() if session else None
+        active_questionnaire_id = session.current_questionnaire_id if session else None
+        
+        # Get patient and doctor context
+        patient_context, doctor_context = self.get_query_contexts(db, patient_id, doctor_id)
+
+        # Try OpenAI first with confidence checking
+        try:
+            # Search for relevant documents (if available)
+            retrieved_docs = self.retrieve_documents(query, db)
+            
+            # Generate OpenAI response with confidence score
+            response, confidence = self.generate_openai_response_with_confidence(
+                query, patient_context, doctor_context, retrieved_docs, history
+            )
+            
+            # If AI is confident enough, return the response
+            if confidence >= DefaultValues.CONFIDENCE_THRESHOLD:
+                return self.finish_turn(session, query, self.build_ai_result(
+                    response, confidence, patient_context, doctor_context, retrieved_docs
+                ))
+            else:
+                print(LogMessages.AI_CONFIDENCE_LOW.format(confidence=confidence))
+                
+        except Exception as e:
+            print(f"{LogMessages.OPENAI_FAILED}: {e}")
+            confidence = 0.0
+        
+        # AI either failed or had low confidence - search local database
+        return self.finish_turn(session, query, self.build_fallback_result(
+            query, db, patient_context, doctor_context, confidence, active_questionnaire_id
+        ))
+
+    def build_fallback_result_in_new_session(self, query: str, patient_context: Optional[Dict],
+                                             doctor_context: Optional[Dict],
+                                             active_questionnaire_id: Optional[int] = None) -> Dict:
+        """build_fallback_result with its own session, so it can run in a worker thread"""
+        db = SessionLocal()
+        try:
+            return self.build_fallback_result(query, db, patient_context, doctor_context, 0.0, active_questionnaire_id)
+        finally:
+            db.close()
+
+    async def aprocess_query_with_fallback(self, query: str, db: Session, patient_id: Optional[int] = None,
+                                           doctor_id: Optional[int] = None, speculative: Optional[bool] = None,
+                                           latency_budget_ms: Optional[int] = None,
+                                           session_id: Optional[str] = None) -> Dict:
+        """Async version of process_query_with_fallback; the LLM call is awaited, not blocked on.
+
+        In speculative mode the questionnaire fallback is computed in a worker
+        thread while the LLM runs, so a low-confidence answer costs only the
+        slower of the two. The latency budget covers document retrieval and the
+        LLM together; whatever has not finished in time is cancelled and the
+        fallback answer is returned instead.
+        """
+        if speculative is None:
+            speculative = llm_config.speculative_fallback
+        if latency_budget_ms is None:
+            latency_budget_ms = llm_config.latency_budget_ms
+        
+        session = await self.aopen_session(session_id, patient_id, doctor_id)
+        history = session.history() if session else None
+        active_questionnaire_id = session.current_questionnaire_id if session else None
+        patient_context, doctor_context = self.get_query_contexts(db, patient_id, doctor_id)
+
+        fallback_task = None
+        if speculative:
+            fallback_task = asyncio.ensure_future(asyncio.to_thread(
+                self.build_fallback_result_in_new_session, query, patient_context, doctor_context,
+                active_questionnaire_id
+            ))
+            # Unused when the AI answer wins; retrieve its outcome so errors are not reported as unhandled
+            fallback_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        async def retrieve_and_generate():
+            retrieved_docs = await self.aretrieve_documents(query, db)
+            response, confidence = await self.agenerate_openai_response_with_confidence(
+                query, patient_context, doctor_context, retrieved_docs, history
+            )
+            return retrieved_docs, response, confidence
+
+        try:
+            if latency_budget_ms > 0:
+                # One deadline for the query embedding and the LLM; wait_for cancels whichever is running
+                retrieved_docs, response, confidence = await asyncio.wait_for(
+                    retrieve_and_generate(), latency_budget_ms / 1000
+                )
+            else:
+                retrieved_docs, response, confidence = await retrieve_and_generate()
+            
+            if confidence >= DefaultValues.CONFIDENCE_THRESHOLD:
+                return self.finish_turn(session, query, self.build_ai_result(
+                    response, confidence, patient_context, doctor_context, retrieved_docs
+                ))
+            else:
+                print(LogMessages.AI_CONFIDENCE_LOW.format(confidence=confidence))
+                
+        except asyncio.TimeoutError:
+            print(LogMessages.LATENCY_BUDGET_EXCEEDED.format(budget_ms=latency_budget_ms))
+            confidence = 0.0
+        except Exception as e:
+            print(f"{LogMessages.OPENAI_FAILED}: {e}")
+            confidence = 0.0
+        
+        if fallback_task is not None:
+            try:
+                result = await fallback_task
+                result["ai_confidence"] = confidence
+                return self.finish_turn(session, query, result)
+            except Exception as e:
+                print(f"{ErrorMessages.QUESTIONNAIRE_ERROR}: {e}")
+        
+        return self.finish_turn(session, query, self.build_fallback_result(
+            query, db, patient_context, doctor_context, confidence, active_questionnaire_id
+        ))
+
+    async def astream_query_with_fallback(self, query: str, db: Session, patient_id: Optional[int] = None,
+                                          doctor_id: Optional[int] = None,
+                                          session_id: Optional[str] = None) -> AsyncIterator[Tuple[str, object]]:
+        """Stream a query as ("token", text) events followed by one ("done", result) event.
+
+        Tokens are relayed as the LLM produces them, minus the confidence
+        marker. If the AI fails or is not confident enough, the final result
+        carries the database fallback response with fallback_mode set, and the
+        client replaces the streamed text with it.
+        """
+        session = await self.aopen_session(session_id, patient_id, doctor_id)
+        history = session.history() if session else None
+        active_questionnaire_id = session.current_questionnaire_id if session else None
+        patient_context, doctor_context = self.get_query_contexts(db, patient_id, doctor_id)
+        retrieved_docs = await self.aretrieve_documents(query, db)
+
+        streamed = []
+        marker_filter = ConfidenceMarkerFilter()
+        try:
+            async for delta in llm_service.astream_response(
+                query, patient_context, doctor_context, retrieved_docs, history
+            ):
+                text = marker_filter.feed(delta)
+                if text:
+                    streamed.append(text)
+                    yield "token", text
+
+            tail, confidence = marker_filter.finish()
+            if tail:
+                streamed.append(tail)
+                yield "token", tail
+
+            if confidence >= DefaultValues.CONFIDENCE_THRESHOLD:
+                yield "done", self.finish_turn(session, query, self.build_ai_result(
+                    "".join(streamed), confidence, patient_context, doctor_context, retrieved_docs
+                ))
+                return
+            print(LogMessages.AI_CONFIDENCE_LOW.format(confidence=confidence))
+
+        except Exception as e:
+            print(f"{LogMessages.OPENAI_FAILED}: {e}")
+            confidence = 0.0
+
+        yield "done", self.finish_turn(session, query, self.build_fallback_result(
+            query, db, patient_context, doctor_context, confidence, active_questionnaire_id
+        ))
@@ -1,26 +1,29 @@
 import openai
 from typing import List, Dict, Optional
 import uuid
-from config import OPENAI_API_KEY, EMBEDDING_MODEL
+from config import OPENAI_API_KEY
 from sqlalchemy.orm import Session
 from models import Patient, Document, Doctor
+from document_index import DocumentIndex, create_ann_index
+from retrieval_backends import VectorBackend
+from llm_service import llm_service
 
 # Initialize OpenAI client
 openai.api_key = OPENAI_API_KEY
 
 class RAGService:
     def __init__(self):
-        # Simple in-memory document storage for demo
-        self.documents = []
+        # Simple in-memory document storage for demo (the numpy retrieval backend)
+        self.backend = VectorBackend(DocumentIndex(
+            embed=llm_service.embed_texts,
+            min_similarity=-1.0,
+            ann=create_ann_index() if create_ann_index is not None else None
+        ))
     
     def get_embedding(self, text: str) -> List[float]:
-        """Get embedding for text using OpenAI"""
+        """Get embedding for text (served from the shared embedding cache when seen before)"""
         try:
-            response = openai.embeddings.create(
-                input=text,
-                model=EMBEDDING_MODEL
-            )
-            return response.data[0].embedding
+            return llm_service.embed_texts([text])[0]
         except Exception as e:
             print(f"Error getting embedding: {e}")
             return []
@@ -28,61 +31,20 @@ class RAGService:
     def add_document(self, title: str, content: str, doc_type: str = "guideline"):
         """Add document to storage"""
         try:
-            doc_id = str(uuid.uuid4())
-            embedding = self.get_embedding(content)
-            
-            if embedding:
-                self.documents.append({
-                    "id": doc_id,
-                    "title": title,
-                    "content": content,
-                    "type": doc_type,
-                    "embedding": embedding
-                })
-                return True
+            document = Document(id=str(uuid.uuid4()), title=title, content=content, document_type=doc_type)
+            return self.backend.add([document]) == 1
         except Exception as e:
             print(f"Error adding document: {e}")
         return False
     
     def search_documents(self, query: str, n_results: int = 5) -> List[Dict]:
-        """Search for relevant documents using simple similarity"""
+        """Search for relevant documents using cosine similarity over the embedding matrix"""
         try:
-            if not self.documents:
-                return []
-            
-            query_embedding = self.get_embedding(query)
-            if not query_embedding:
-                return []
-            
-            # Simple similarity search (cosine similarity)
-            results = []
-            for doc in self.documents:
-                similarity = self.cosine_similarity(query_embedding, doc["embedding"])
-                results.append({
-                    "content": doc["content"],
-                    "metadata": {"title": doc["title"], "type": doc["type"]},
-                    "distance": 1 - similarity
-                })
-            
-            # Sort by similarity and return top results
-            results.sort(key=lambda x: x["distance"])
-            return results[:n_results]
-            
+            return self.backend.search(query, n_results)
         except Exception as e:
             print(f"Error searching documents: {e}")
             return []
     
-    def cosine_similarity(self, a: List[float], b: List[float]) -> float:
-        """Calculate cosine similarity between two vectors"""
-        import math
-        dot_product = sum(x * y for x, y in zip(a, b))
-        magnitude_a = math.sqrt(sum(x * x for x in a))
-        magnitude_b = math.sqrt(sum(x * x for x in b))
-        
-        if magnitude_a == 0 or magnitude_b == 0:
-            return 0
-        return dot_product / (magnitude_a * magnitude_b)
-    
     def get_patient_context(self, db: Session, patient_id: int) -> Optional[Dict]:
         """Get patient context from database"""
         try:
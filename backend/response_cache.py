@@ -0,0 +1,240 @@
+"""
+Response cache for repeated chat questions.
+
+LLM answers are cached under the normalized query text plus a hash of the
+patient, doctor and document context, so the same FAQ asked in the same
+context is answered without another LLM round trip. An optional semantic
+tier also serves near-identical phrasings whose query embedding is within a
+cosine similarity threshold of a cached one.
+
+Entries expire after a TTL, are evicted least-recently-used beyond an entry
+count or memory cap, and the whole cache is dropped whenever a Questionnaire
+or Document row changes.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from model_watch import watch_model
+from models import Document, Questionnaire
+
+try:
+    import numpy as np
+except ImportError:  # The semantic tier is disabled without numpy
+    np = None
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = re.compile(r"^[^\w]+|[^\w]+$")
+
+# Rough per-entry bookkeeping overhead counted against the memory cap
+_ENTRY_OVERHEAD_BYTES = 256
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop leading/trailing punctuation"""
+    return _EDGE_PUNCTUATION.sub("", _WHITESPACE.sub(" ", query.lower()).strip())
+
+
+def context_hash(patient_context: Optional[Dict] = None, doctor_context: Optional[Dict] = None,
+                 retrieved_docs: Optional[List[Dict]] = None) -> str:
+    """Stable hash of everything besides the query that shapes the answer"""
+    payload = json.dumps(
+        {"patient": patient_context, "doctor": doctor_context, "docs": retrieved_docs},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    response: str
+    confidence: float
+    context_hash: str
+    created_at: float
+    size_bytes: int
+    embedding: Optional[object] = None  # Unit-normalized numpy vector for the semantic tier
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache of (response, confidence) per query and context"""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 16 * 1024 * 1024, ttl_seconds: float = 3600,
+                 similarity_threshold: float = 0.0, embed: Optional[Callable[[str], List[float]]] = None,
+                 enabled: bool = True):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.embed = embed
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._counters = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return bool(self.similarity_threshold) and self.embed is not None and np is not None
+
+    def _embed(self, normalized_query: str):
+        vector = np.asarray(self.embed(normalized_query), dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def _remove(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size_bytes
+
+    def _is_expired(self, entry: CacheEntry, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+
+    def _find_similar(self, embedding, context_key: str, now: float) -> Optional[Tuple[str, str]]:
+        """Key of the most similar live entry in the same context above the threshold"""
+        best_key, best_score = None, self.similarity_threshold
+        for key, entry in self._entries.items():
+            if entry.context_hash != context_key or entry.embedding is None or self._is_expired(entry, now):
+                continue
+            score = float(np.dot(embedding, entry.embedding))
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def get(self, query: str, patient_context: Optional[Dict] = None, doctor_context: Optional[Dict] = None,
+            retrieved_docs: Optional[List[Dict]] = None) -> Optional[Tuple[str, float]]:
+        """Cached (response, confidence) for this query and context, or None"""
+        if not self.enabled:
+            return None
+
+        normalized = normalize_query(query)
+        context_key = context_hash(patient_context, doctor_context, retrieved_docs)
+        key = (normalized, context_key)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._is_expired(entry, now):
+                    self._entries.move_to_end(key)
+                    self._counters["exact_hits"] += 1
+                    return entry.response, entry.confidence
+                self._remove(key)
+                self._counters["expirations"] += 1
+
+            if not self.semantic_enabled or not self._entries:
+                self._counters["misses"] += 1
+                return None
+
+        # Embedding happens outside the lock; it is usually a network call
+        try:
+            embedding = self._embed(normalized)
+        except Exception as e:
+            print(f"Response cache embedding failed: {e}")
+            embedding = None
+
+        with self._lock:
+            similar_key = self._find_similar(embedding, context_key, now) if embedding is not None else None
+            if similar_key is None:
+                self._counters["misses"] += 1
+                return None
+            entry = self._entries[similar_key]
+            self._entries.move_to_end(similar_key)
+            self._counters["semantic_hits"] += 1
+            return entry.response, entry.confidence
+
+    def put(self, query: str, response: str, confidence: float, patient_context: Optional[Dict] = None,
+            doctor_context: Optional[Dict] = None, retrieved_docs: Optional[List[Dict]] = None):
+        """Store a response, evicting least-recently-used entries beyond the caps"""
+        if not self.enabled:
+            return
+
+        normalized = normalize_query(query)
+        context_key = context_hash(patient_context, doctor_context, retrieved_docs)
+        key = (normalized, context_key)
+
+        embedding = None
+        if self.semantic_enabled:
+            try:
+                embedding = self._embed(normalized)
+            except Exception as e:
+                print(f"Response cache embedding failed: {e}")
+
+        size_bytes = (len(response.encode("utf-8")) + len(normalized) + len(context_key) + _ENTRY_OVERHEAD_BYTES +
+                      (embedding.nbytes if embedding is not None else 0))
+        if size_bytes > self.max_bytes:
+            return
+
+        entry = CacheEntry(response, confidence, context_key, time.time(), size_bytes, embedding)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size_bytes
+            self._counters["stores"] += 1
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and size for monitoring"""
+        with self._lock:
+            lookups = self._counters["exact_hits"] + self._counters["semantic_hits"] + self._counters["misses"]
+            hits = self._counters["exact_hits"] + self._counters["semantic_hits"]
+            return {
+                "enabled": self.enabled,
+                "semantic_enabled": self.semantic_enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "similarity_threshold": self.similarity_threshold,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                **self._counters
+            }
+
+
+# Caches cleared whenever chat knowledge (questionnaires, documents) changes
+_registered_caches: List[ResponseCache] = []
+
+
+def register_cache(cache: ResponseCache) -> ResponseCache:
+    """Have cache cleared after any committed Questionnaire or Document change"""
+    _registered_caches.append(cache)
+    return cache
+
+
+def invalidate_all():
+    for cache in _registered_caches:
+        cache.clear()
+
+
+# =============================================================================
+# INVALIDATION HOOKS
+# =============================================================================
+
+for _model in (Questionnaire, Document):
+    watch_model(_model, lambda changed: invalidate_all())
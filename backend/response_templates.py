@@ -0,0 +1,82 @@
+"""
+Single-pass renderer for questionnaire response templates.
+
+Each response_template is parsed once into literal and slot segments and
+cached per questionnaire id. Rendering is a single join over the segments
+using a slot -> value mapping, instead of one str.replace per placeholder.
+"""
+
+import re
+import threading
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from text_config import TemplatePlaceholders
+
+# Placeholders are written as "{name}" in templates
+SLOT_NAMES = tuple(placeholder.strip("{}") for placeholder in TemplatePlaceholders.PLACEHOLDERS)
+SLOT_PATTERN = re.compile(r"\{(" + "|".join(re.escape(name) for name in SLOT_NAMES) + r")\}")
+
+
+class ParsedTemplate:
+    """A template split into alternating literal and slot segments"""
+
+    __slots__ = ("source", "literals", "slots", "slot_names")
+
+    def __init__(self, source: str):
+        literals = []
+        slots = []
+        position = 0
+        for match in SLOT_PATTERN.finditer(source):
+            literals.append(source[position:match.start()])
+            slots.append(match.group(1))
+            position = match.end()
+        literals.append(source[position:])
+
+        self.source = source
+        # literals has exactly one more element than slots
+        self.literals: Tuple[str, ...] = tuple(literals)
+        self.slots: Tuple[str, ...] = tuple(slots)
+        self.slot_names: FrozenSet[str] = frozenset(slots)
+
+    def render(self, values: Dict[str, str]) -> str:
+        if not self.slots:
+            return self.source
+
+        parts = [self.literals[0]]
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            parts.append(values[slot])
+            parts.append(literal)
+        return "".join(parts)
+
+
+class TemplateRenderer:
+    """Caches parsed templates per questionnaire id"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: Dict[int, ParsedTemplate] = {}
+
+    def get(self, questionnaire_id: Optional[int], template: str) -> ParsedTemplate:
+        """Return the parsed template, reparsing if the template text changed"""
+        if questionnaire_id is None:
+            return ParsedTemplate(template)
+
+        parsed = self._cache.get(questionnaire_id)
+        if parsed is not None and parsed.source == template:
+            return parsed
+
+        parsed = ParsedTemplate(template)
+        with self._lock:
+            self._cache[questionnaire_id] = parsed
+        return parsed
+
+    def render(self, questionnaire_id: Optional[int], template: str, values: Dict[str, str]) -> str:
+        return self.get(questionnaire_id, template).render(values)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+# Global template renderer instance
+template_renderer = TemplateRenderer()
@@ -0,0 +1,377 @@
+"""
+Interchangeable retrieval backends for the RAG layer.
+
+Every backend indexes Document rows (or objects with the same id, title,
+content and document_type attributes) in chunks, and answers queries in the
+retrieved_docs format the LLM prompt expects:
+
+    {"content": ..., "metadata": {"title", "type", "document_id", "chunk"}, "score": ...}
+
+where a higher score is a better match. Backends, selected by RAG_BACKEND:
+
+    numpy   in-memory float32 embedding matrix (DocumentIndex)
+    memmap  DocumentIndex over the shared memory-mapped embedding store
+    chroma  ChromaDB collection (needs the chromadb package)
+    bm25    BM25 inverted index; no embeddings API involved
+    hybrid  bm25 plus memmap (numpy with EMBEDDING_STORE_ENABLED=false),
+            fused by reciprocal rank (default)
+
+The numpy, memmap and bm25 backends of the application wrap the global
+document_index and lexical_index, which follow Document changes through ORM
+hooks; `sync` catches a backend up with the Document table, queueing
+embedding work on the background ingestion pipeline where there is one.
+"""
+
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from config import (
+    CHROMA_PERSIST_DIRECTORY, EMBEDDING_BATCH_SIZE, RAG_BACKEND, RAG_RRF_K, RAG_TOP_K
+)
+from document_index import DocumentIndex, chunk_document, document_index, embedding_text
+from document_ingestion import DocumentIngestion, IngestionJob, document_ingestion
+from lexical_index import BM25Index, lexical_index, reciprocal_rank_fusion
+from model_watch import watch_model
+from models import Document
+
+try:
+    import chromadb
+    from chromadb.config import Settings
+except ImportError:  # The chroma backend is unavailable without chromadb
+    chromadb = None
+
+
+def _embed_with_llm_service(texts: List[str]) -> List[List[float]]:
+    from llm_service import llm_service
+    return llm_service.embed_texts(texts)
+
+
+class RetrievalBackend(ABC):
+    """Interface shared by every retrieval backend"""
+
+    name = "base"
+
+    @abstractmethod
+    def add(self, documents: Sequence[Document]) -> int:
+        """Index documents in one batch, replacing earlier versions; returns documents indexed"""
+
+    @abstractmethod
+    def remove(self, document_ids: Sequence[int]):
+        """Drop every chunk of these documents"""
+
+    @abstractmethod
+    def search(self, query: str, k: Optional[int] = None) -> List[Dict]:
+        """Top-k chunks for a query, best first"""
+
+    @abstractmethod
+    def sync(self, db: Session, retry_failed: bool = True) -> Optional[IngestionJob]:
+        """Index Document rows the backend does not have yet; returns a queued ingestion job, if any"""
+
+    @abstractmethod
+    def clear(self):
+        """Drop everything indexed"""
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Index state for GET /documents/index"""
+
+
+class VectorBackend(RetrievalBackend):
+    """Embedding search over a DocumentIndex (numpy matrix, or memmap with an embedding store)"""
+
+    def __init__(self, index: DocumentIndex, ingestion: Optional[DocumentIngestion] = None):
+        self.index = index
+        self.ingestion = ingestion or DocumentIngestion(index)
+        self.name = "memmap" if index.store is not None else "numpy"
+
+    def add(self, documents: Sequence[Document]) -> int:
+        job = IngestionJob(id="add", document_ids=[document.id for document in documents])
+        self.ingestion.ingest(job, list(documents))
+        return len(documents) - len(job.failed_document_ids)
+
+    def remove(self, document_ids: Sequence[int]):
+        self.index.remove(document_ids)
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Dict]:
+        return self.index.search(query, k)
+
+    def sync(self, db: Session, retry_failed: bool = True) -> Optional[IngestionJob]:
+        # Documents that are not embedded yet are queued, not embedded inline
+        missing_ids = self.index.sync(db)
+        return self.ingestion.submit(missing_ids, retry_failed=retry_failed) if missing_ids else None
+
+    def clear(self):
+        self.index.clear()
+
+    def stats(self) -> Dict:
+        return {"backend": self.name, **self.index.stats()}
+
+
+class LexicalBackend(RetrievalBackend):
+    """BM25 keyword search; works without the embeddings API"""
+
+    name = "bm25"
+
+    def __init__(self, index: BM25Index):
+        self.index = index
+
+    def add(self, documents: Sequence[Document]) -> int:
+        self.index.add_documents(documents)
+        return len(documents)
+
+    def remove(self, document_ids: Sequence[int]):
+        self.index.remove(document_ids)
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Dict]:
+        return self.index.search(query, k)
+
+    def sync(self, db: Session, retry_failed: bool = True) -> Optional[IngestionJob]:
+        self.index.sync(db)
+        return None
+
+    def clear(self):
+        self.index.clear()
+
+    def stats(self) -> Dict:
+        return {"backend": self.name, **self.index.stats()}
+
+
+class HybridBackend(RetrievalBackend):
+    """Several backends queried together, rankings fused by reciprocal rank"""
+
+    name = "hybrid"
+
+    def __init__(self, backends: Sequence[RetrievalBackend], rrf_k: int = RAG_RRF_K, top_k: int = RAG_TOP_K):
+        self.backends = list(backends)
+        self.rrf_k = rrf_k
+        self.top_k = top_k
+
+    def add(self, documents: Sequence[Document]) -> int:
+        return min(backend.add(documents) for backend in self.backends)
+
+    def remove(self, document_ids: Sequence[int]):
+        for backend in self.backends:
+            backend.remove(document_ids)
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Dict]:
+        k = self.top_k if k is None else k
+        rankings = []
+        for backend in self.backends:
+            try:
+                rankings.append(backend.search(query, k))
+            except Exception as e:
+                print(f"Error searching {backend.name} backend: {e}")
+        rankings = [ranking for ranking in rankings if ranking]
+        if len(rankings) > 1:
+            return reciprocal_rank_fusion(rankings, k=self.rrf_k, top_k=k)
+        return rankings[0] if rankings else []
+
+    def sync(self, db: Session, retry_failed: bool = True) -> Optional[IngestionJob]:
+        job = None
+        for backend in self.backends:
+            try:
+                job = backend.sync(db, retry_failed=retry_failed) or job
+            except Exception as e:
+                print(f"Error syncing {backend.name} backend: {e}")
+        return job
+
+    def clear(self):
+        for backend in self.backends:
+            backend.clear()
+
+    def stats(self) -> Dict:
+        return {"backend": self.name, **{backend.name: backend.stats() for backend in self.backends}}
+
+
+class ChromaBackend(RetrievalBackend):
+    """ChromaDB collection of chunk embeddings (cosine space), one entry per "document_id:chunk" """
+
+    name = "chroma"
+
+    def __init__(self, embed: Callable[[List[str]], List[List[float]]] = _embed_with_llm_service,
+                 directory: str = CHROMA_PERSIST_DIRECTORY, collection_name: str = "healthcare_document_chunks",
+                 top_k: int = RAG_TOP_K, batch_size: int = EMBEDDING_BATCH_SIZE):
+        if chromadb is None:
+            raise RuntimeError("The chroma retrieval backend needs the chromadb package")
+        self.embed = embed
+        self.directory = directory
+        self.collection_name = collection_name
+        self.top_k = top_k
+        self.batch_size = batch_size
+
+        self._lock = threading.RLock()
+        self._collection = None
+        self._chunk_counts: Optional[Dict] = None  # document id -> chunks in the collection
+        self._stale = True
+        register_backend(self)
+
+    def _get_collection(self):
+        """Open the collection on first use and read which documents it holds"""
+        if self._collection is None:
+            client = chromadb.PersistentClient(path=self.directory, settings=Settings(anonymized_telemetry=False))
+            self._collection = client.get_or_create_collection(
+                name=self.collection_name, metadata={"hnsw:space": "cosine"}
+            )
+            counts = {}
+            for metadata in self._collection.get(include=["metadatas"])["metadatas"] or []:
+                document_id = metadata.get("document_id")
+                counts[document_id] = counts.get(document_id, 0) + 1
+            self._chunk_counts = counts
+        return self._collection
+
+    def _delete_locked(self, document_ids):
+        collection = self._get_collection()
+        ids = [
+            f"{document_id}:{chunk}"
+            for document_id in document_ids
+            for chunk in range(self._chunk_counts.pop(document_id, 0))
+        ]
+        if ids:
+            collection.delete(ids=ids)
+
+    def add(self, documents: Sequence[Document]) -> int:
+        chunks = [chunk for document in documents for chunk in chunk_document(document)]
+        if not chunks:
+            return 0
+        texts = [embedding_text(chunk) for chunk in chunks]
+        embeddings = []
+        for start in range(0, len(texts), self.batch_size):
+            embeddings.extend(self.embed(texts[start:start + self.batch_size]))
+
+        with self._lock:
+            self._delete_locked({chunk["id"] for chunk in chunks})
+            self._get_collection().upsert(
+                ids=[f"{chunk['id']}:{chunk['chunk']}" for chunk in chunks],
+                embeddings=embeddings,
+                documents=[chunk["content"] for chunk in chunks],
+                metadatas=[
+                    {"title": chunk["title"] or "", "type": chunk["type"] or "", "document_id": chunk["id"],
+                     "chunk": chunk["chunk"]}
+                    for chunk in chunks
+                ]
+            )
+            for chunk in chunks:
+                self._chunk_counts[chunk["id"]] = self._chunk_counts.get(chunk["id"], 0) + 1
+        return len(documents)
+
+    def remove(self, document_ids: Sequence[int]):
+        with self._lock:
+            self._delete_locked(document_ids)
+
+    def mark_stale(self, document_ids=()):
+        """Drop chunks of changed documents and re-read them on the next sync"""
+        with self._lock:
+            if self._collection is not None:
+                self._delete_locked(document_ids)
+            self._stale = True
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Dict]:
+        k = self.top_k if k is None else k
+        with self._lock:
+            collection = self._get_collection()
+            count = collection.count()
+        if k <= 0 or count == 0:
+            return []
+        try:
+            results = collection.query(
+                query_embeddings=self.embed([query]), n_results=min(k, count),
+                include=["documents", "metadatas", "distances"]
+            )
+        except Exception as e:
+            print(f"Error searching documents: {e}")
+            return []
+        return [
+            {
+                "content": content,
+                "metadata": {"title": metadata.get("title"), "type": metadata.get("type"),
+                             "document_id": metadata.get("document_id"), "chunk": metadata.get("chunk", 0)},
+                "distance": distance,
+                "score": 1 - distance
+            }
+            for content, metadata, distance in zip(
+                results["documents"][0], results["metadatas"][0], results["distances"][0]
+            )
+        ]
+
+    def sync(self, db: Session, retry_failed: bool = True) -> Optional[IngestionJob]:
+        """Embed Document rows missing from the collection (inline: Chroma has no background pipeline)"""
+        if not self._stale:
+            return None
+        with self._lock:
+            self._get_collection()
+            missing_ids = [doc_id for (doc_id,) in db.query(Document.id).all() if doc_id not in self._chunk_counts]
+            if missing_ids:
+                self.add(db.query(Document).filter(Document.id.in_(missing_ids)).all())
+            self._stale = False
+        return None
+
+    def clear(self):
+        with self._lock:
+            collection = self._get_collection()
+            ids = collection.get(include=[])["ids"]
+            if ids:
+                collection.delete(ids=ids)
+            self._chunk_counts = {}
+            self._stale = True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            collection = self._get_collection()
+            return {
+                "backend": self.name,
+                "collection": self.collection_name,
+                "documents": len(self._chunk_counts),
+                "chunks": collection.count(),
+                "stale": self._stale
+            }
+
+
+def create_backend(name: str = RAG_BACKEND) -> RetrievalBackend:
+    """The application's retrieval backend, built on the global indexes"""
+    if name == "bm25":
+        return LexicalBackend(lexical_index)
+    if name == "chroma":
+        if chromadb is not None:
+            return ChromaBackend()
+        print("RAG_BACKEND=chroma needs the chromadb package, using hybrid")
+        name = "hybrid"
+    if name == "memmap" and document_index.store is None:
+        print("RAG_BACKEND=memmap needs EMBEDDING_STORE_ENABLED=true, using numpy")
+    vector = VectorBackend(document_index, document_ingestion)
+    if name in ("numpy", "memmap"):
+        return vector
+    if name != "hybrid":
+        print(f"Unknown RAG_BACKEND '{name}', using hybrid")
+    return HybridBackend([vector, LexicalBackend(lexical_index)])
+
+
+# =============================================================================
+# INVALIDATION HOOKS (backends not built on the global indexes)
+# =============================================================================
+
+_backends = weakref.WeakSet()
+
+
+def register_backend(backend: RetrievalBackend) -> RetrievalBackend:
+    """Have committed Document changes passed to the backend's mark_stale (clear after bulk changes)"""
+    _backends.add(backend)
+    return backend
+
+
+def _apply_document_changes(changed):
+    for backend in list(_backends):
+        if changed is None:
+            backend.clear()
+        else:
+            backend.mark_stale(changed)
+
+
+watch_model(Document, _apply_document_changes)
+
+
+# Global retrieval backend used for chat (RAG_BACKEND)
+rag_backend = create_backend()
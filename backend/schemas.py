@@ -147,6 +147,27 @@ class Document(DocumentBase):
     class Config:
         from_attributes = True
 
+class DocumentBulkCreate(BaseModel):
+    documents: List[DocumentCreate]
+
+class IngestionJob(BaseModel):
+    job_id: str
+    status: str  # queued, running, completed, failed
+    total_documents: int
+    processed_documents: int
+    total_chunks: int
+    embedded_chunks: int
+    reused_documents: int
+    failed_document_ids: List[int] = []
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class DocumentBulkResponse(BaseModel):
+    documents: List[Document]
+    ingestion_job: Optional[IngestionJob] = None
+
 # Questionnaire Schemas
 class QuestionnaireBase(BaseModel):
     trigger_keywords: str
@@ -191,7 +212,7 @@ class ChatMessage(BaseModel):
     message: str
     patient_id: Optional[int] = None
     doctor_id: Optional[int] = None
-    session_id: Optional[int] = None
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -199,7 +220,7 @@ class ChatResponse(BaseModel):
     doctor_context: Optional[dict] = None
     retrieved_documents: Optional[List[str]] = None
     current_question: Optional[str] = None
-    session_id: Optional[int] = None
+    session_id: Optional[str] = None
     fallback_mode: bool = False
     ai_confidence: Optional[float] = None
 
@@ -254,6 +275,19 @@ class DoctorAvailableSlots(BaseModel):
     day_of_week: int
     available_slots: List[AvailableTimeSlot]
 
+class SlotOpening(BaseModel):
+    doctor_id: int
+    doctor_name: str
+    date: str  # YYYY-MM-DD format
+    time: str  # HH:MM format
+    slot_id: Optional[int] = None
+
+class SpecialityAvailableSlots(BaseModel):
+    speciality_id: int
+    from_date: str  # YYYY-MM-DD format
+    to_date: str  # YYYY-MM-DD format
+    openings: List[SlotOpening]
+
 # Health Package Schemas
 class HealthPackageTestBase(BaseModel):
     test_name: str
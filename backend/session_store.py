@@ -0,0 +1,262 @@
+"""
+Conversation sessions for multi-turn chat.
+
+Clients continue a conversation with the session's token, a random value
+stored in chat_sessions.token (row ids are sequential and easy to guess).
+A session is only continued for the patient and doctor it was opened for;
+any other request starts a new one. Sessions live in an in-process LRU
+keyed by token, so a turn looks its session up in O(1) without touching
+the database. Each session
+keeps a rolling window of recent turns (CHAT_SESSION_HISTORY_TURNS) and
+the questionnaire it is waiting on an answer for. Changes are written
+behind: a worker thread writes dirty sessions to chat_sessions every
+CHAT_SESSION_FLUSH_SECONDS. Only creating a session (to get its id) and
+loading one that is not cached hit the database on the request path.
+Sessions evicted before being written stay queued until the next flush.
+Existing databases need migrate_chat_session_tokens.py for the token column.
+"""
+
+import json
+import re
+import secrets
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+from config import CHAT_SESSION_CACHE_SIZE, CHAT_SESSION_FLUSH_SECONDS, CHAT_SESSION_HISTORY_TURNS, CHAT_SESSIONS_ENABLED
+from database import SessionLocal
+from models import ChatSession
+from text_config import ConfidencePatterns
+from timezone_utils import get_local_now
+
+# Longer messages are cut before they are kept in a session
+_MAX_TURN_CHARS = 2000
+
+
+@dataclass
+class ConversationSession:
+    id: int
+    token: str
+    patient_id: Optional[int] = None
+    doctor_id: Optional[int] = None
+    turns: Deque[Dict] = field(default_factory=deque)  # {"user": ..., "assistant": ...}, oldest first
+    current_questionnaire_id: Optional[int] = None  # Questionnaire whose question awaits an answer
+    current_question: Optional[str] = None
+    status: str = "active"
+
+    def history(self) -> List[Dict]:
+        return list(self.turns)
+
+    def to_session_data(self) -> str:
+        return json.dumps({"turns": list(self.turns), "current_question": self.current_question})
+
+
+def _clip(text: Optional[str]) -> str:
+    text = re.sub(ConfidencePatterns.CONFIDENCE_REPLACEMENT, "", text or "").strip()
+    return text[:_MAX_TURN_CHARS]
+
+
+class SessionStore:
+    """LRU of active conversation sessions with write-behind to chat_sessions"""
+
+    def __init__(self, max_sessions: int = CHAT_SESSION_CACHE_SIZE, history_turns: int = CHAT_SESSION_HISTORY_TURNS,
+                 flush_interval_seconds: float = CHAT_SESSION_FLUSH_SECONDS, session_factory=SessionLocal,
+                 enabled: bool = CHAT_SESSIONS_ENABLED):
+        self.max_sessions = max(1, max_sessions)
+        self.history_turns = max(0, history_turns)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.session_factory = session_factory
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._dirty: Dict[str, ConversationSession] = {}  # Written by the next flush, cached or not
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._counters = {
+            "hits": 0, "loads": 0, "created": 0, "rejected": 0, "evictions": 0, "flushes": 0, "rows_written": 0
+        }
+
+    def _cache(self, session: ConversationSession) -> ConversationSession:
+        """Insert under the lock, keeping a concurrently cached copy if there is one"""
+        existing = self._sessions.get(session.token)
+        if existing is not None:
+            self._sessions.move_to_end(session.token)
+            return existing
+        self._sessions[session.token] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self._counters["evictions"] += 1
+        return session
+
+    def _from_row(self, row: ChatSession) -> ConversationSession:
+        turns = []
+        current_question = None
+        try:
+            data = json.loads(row.session_data) if row.session_data else {}
+            turns = data.get("turns", [])
+            current_question = data.get("current_question")
+        except (ValueError, AttributeError) as e:
+            print(f"⚠️ Ignoring unreadable data of chat session {row.id}: {e}")
+        return ConversationSession(
+            id=row.id,
+            token=row.token,
+            patient_id=row.patient_id,
+            doctor_id=row.doctor_id,
+            turns=deque(turns[-self.history_turns:] if self.history_turns else [], maxlen=self.history_turns),
+            current_questionnaire_id=row.current_questionnaire_id,
+            current_question=current_question,
+            status=row.status or "active"
+        )
+
+    @staticmethod
+    def _owned_by(session: ConversationSession, patient_id: Optional[int], doctor_id: Optional[int]) -> bool:
+        return session.patient_id == patient_id and session.doctor_id == doctor_id
+
+    def lookup(self, token: Optional[str], patient_id: Optional[int] = None,
+               doctor_id: Optional[int] = None) -> Optional[ConversationSession]:
+        """The cached session for token if it belongs to this patient and doctor, without touching the database"""
+        if not self.enabled or not token:
+            return None
+        with self._lock:
+            session = self._sessions.get(token) or self._dirty.get(token)
+            if session is None or not self._owned_by(session, patient_id, doctor_id):
+                return None
+            self._counters["hits"] += 1
+            return self._cache(session)
+
+    def get_or_create(self, token: Optional[str] = None, patient_id: Optional[int] = None,
+                      doctor_id: Optional[int] = None) -> Optional[ConversationSession]:
+        """The session for token, or a new one when it is unknown or belongs to someone else (None when disabled)"""
+        if not self.enabled:
+            return None
+
+        if token:
+            with self._lock:
+                session = self._sessions.get(token) or self._dirty.get(token)
+                if session is not None and self._owned_by(session, patient_id, doctor_id):
+                    self._counters["hits"] += 1
+                    return self._cache(session)
+
+            if session is None:
+                db = self.session_factory()
+                try:
+                    row = db.query(ChatSession).filter(ChatSession.token == token).first()
+                finally:
+                    db.close()
+                if row is not None:
+                    with self._lock:
+                        self._counters["loads"] += 1
+                        session = self._cache(self._from_row(row))
+                        if self._owned_by(session, patient_id, doctor_id):
+                            return session
+
+            if session is not None:
+                # Another patient's (or doctor's) conversation is never continued
+                with self._lock:
+                    self._counters["rejected"] += 1
+                print(f"⚠️ Chat session {session.id} belongs to another patient or doctor, starting a new session")
+
+        db = self.session_factory()
+        try:
+            row = ChatSession(token=secrets.token_urlsafe(24), patient_id=patient_id, doctor_id=doctor_id,
+                              session_data=None, status="active")
+            db.add(row)
+            db.commit()
+            session = ConversationSession(
+                id=row.id, token=row.token, patient_id=patient_id, doctor_id=doctor_id,
+                turns=deque(maxlen=self.history_turns)
+            )
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        with self._lock:
+            self._counters["created"] += 1
+            return self._cache(session)
+
+    def record_turn(self, session: ConversationSession, user_message: str, result: Dict):
+        """Append a turn and note the questionnaire it leaves open; written by the next flush"""
+        with self._lock:
+            session.turns.append({"user": _clip(user_message), "assistant": _clip(result.get("response"))})
+            session.current_question = result.get("current_question")
+            session.current_questionnaire_id = result.get("questionnaire_id") if session.current_question else None
+            self._dirty[session.token] = session
+        self._start_flusher()
+
+    def _start_flusher(self):
+        if self._flusher is None and self.flush_interval_seconds > 0:
+            with self._lock:
+                if self._flusher is None:
+                    self._stop.clear()
+                    self._flusher = threading.Thread(target=self._flush_loop, name="session-flush", daemon=True)
+                    self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval_seconds):
+            self.flush()
+
+    def flush(self) -> int:
+        """Write every dirty session to chat_sessions in one transaction; returns rows written"""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            pending = self._dirty
+            self._dirty = {}
+            now = get_local_now()
+            mappings = [{
+                "id": session.id,
+                "session_data": session.to_session_data(),
+                "current_questionnaire_id": session.current_questionnaire_id,
+                "status": session.status,
+                "updated_at": now
+            } for session in pending.values()]
+
+        db = self.session_factory()
+        try:
+            db.bulk_update_mappings(ChatSession, mappings)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Error writing chat sessions: {e}")
+            with self._lock:
+                # Keep changes made since the snapshot; retry the rest on the next flush
+                for token, session in pending.items():
+                    self._dirty.setdefault(token, session)
+            return 0
+        finally:
+            db.close()
+
+        with self._lock:
+            self._counters["flushes"] += 1
+            self._counters["rows_written"] += len(mappings)
+        return len(mappings)
+
+    def shutdown(self):
+        """Stop the flush thread and write what is left"""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=self.flush_interval_seconds + 5)
+            self._flusher = None
+        self.flush()
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "cached_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "pending_writes": len(self._dirty),
+                "history_turns": self.history_turns,
+                **self._counters
+            }
+
+
+# Global session store
+session_store = SessionStore()
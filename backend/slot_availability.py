@@ -0,0 +1,245 @@
+"""
+Batched doctor slot availability.
+
+Weekly DoctorTimeSlots rules are expanded into concrete slots in memory and
+checked against the set of booked appointment times, which is fetched with a
+single range query per request instead of one query per slot.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import Appointment, Doctor, DoctorTimeSlots
+
+# Appointment statuses that occupy a slot
+ACTIVE_APPOINTMENT_STATUSES = ("scheduled", "confirmed")
+
+# Upper bound on the number of days a single range request may cover
+MAX_RANGE_DAYS = 31
+
+# Appointments cannot be booked on these weekdays (0=Monday, 6=Sunday)
+CLOSED_WEEKDAYS = (6,)
+
+DEFAULT_SLOT_MINUTES = 30
+
+
+def parse_date(value: str) -> date:
+    """Parse a YYYY-MM-DD string (raises ValueError on bad input)"""
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def parse_time(value: str) -> time:
+    """Parse an HH:MM string (raises ValueError on bad input)"""
+    return datetime.strptime(value, "%H:%M").time()
+
+
+def date_range(start_date: date, end_date: date) -> List[date]:
+    """Inclusive list of dates between start_date and end_date"""
+    if end_date < start_date:
+        raise ValueError("End date must not be before start date")
+    days = (end_date - start_date).days + 1
+    if days > MAX_RANGE_DAYS:
+        raise ValueError(f"Date range cannot exceed {MAX_RANGE_DAYS} days")
+    return [start_date + timedelta(days=offset) for offset in range(days)]
+
+
+def iter_slot_times(time_slot: DoctorTimeSlots, day: date) -> Iterator[datetime]:
+    """Yield the start datetime of every slot a weekly rule produces on day"""
+    step = timedelta(minutes=time_slot.slot_duration_minutes or DEFAULT_SLOT_MINUTES)
+    current = datetime.combine(day, time_slot.start_time)
+    end = datetime.combine(day, time_slot.end_time)
+    while current < end:
+        yield current
+        current += step
+
+
+def expand_day_rules(time_slots: List[DoctorTimeSlots], day: date) -> List[Tuple[datetime, DoctorTimeSlots]]:
+    """(slot_datetime, rule) for every slot the rules produce on day, in time order.
+
+    Overlapping rules can produce the same start time; the slot is listed once,
+    under the first rule (lowest id), on every read path and in the calendar.
+    """
+    slots: Dict[datetime, DoctorTimeSlots] = {}
+    for time_slot in time_slots:
+        for slot_datetime in iter_slot_times(time_slot, day):
+            slots.setdefault(slot_datetime, time_slot)
+    return sorted(slots.items(), key=lambda item: item[0])
+
+
+def get_weekly_time_slots(db: Session, doctor_ids: Iterable[int],
+                          days_of_week: Optional[Iterable[int]] = None) -> Dict[Tuple[int, int], List[DoctorTimeSlots]]:
+    """Fetch available weekly rules for several doctors, keyed by (doctor_id, day_of_week)"""
+    doctor_ids = list(doctor_ids)
+    if not doctor_ids:
+        return {}
+
+    query = db.query(DoctorTimeSlots).filter(
+        DoctorTimeSlots.doctor_id.in_(doctor_ids),
+        DoctorTimeSlots.is_available == True
+    )
+    if days_of_week is not None:
+        query = query.filter(DoctorTimeSlots.day_of_week.in_(list(set(days_of_week))))
+
+    rules: Dict[Tuple[int, int], List[DoctorTimeSlots]] = defaultdict(list)
+    for time_slot in query.order_by(DoctorTimeSlots.id).all():
+        rules[(time_slot.doctor_id, time_slot.day_of_week)].append(time_slot)
+    return rules
+
+
+def get_booked_datetimes(db: Session, doctor_ids: Iterable[int],
+                         start_date: date, end_date: date) -> Set[Tuple[int, datetime]]:
+    """Fetch (doctor_id, datetime) for every active appointment in the date range with one query"""
+    doctor_ids = list(doctor_ids)
+    if not doctor_ids:
+        return set()
+
+    range_start = datetime.combine(start_date, time.min)
+    range_end = datetime.combine(end_date + timedelta(days=1), time.min)
+    rows = db.query(Appointment.doctor_id, Appointment.date).filter(
+        Appointment.doctor_id.in_(doctor_ids),
+        Appointment.date >= range_start,
+        Appointment.date < range_end,
+        Appointment.status.in_(ACTIVE_APPOINTMENT_STATUSES)
+    ).all()
+    return {(doctor_id, booked_at.replace(tzinfo=None)) for doctor_id, booked_at in rows}
+
+
+def build_day_slots(doctor_id: int, day: date, time_slots: List[DoctorTimeSlots],
+                    booked: Set[Tuple[int, datetime]]) -> List[Dict]:
+    """Expand the rules for one doctor and day into slot dicts"""
+    return [
+        {
+            "time": slot_datetime.strftime("%H:%M"),
+            "is_available": (doctor_id, slot_datetime) not in booked,
+            "slot_id": time_slot.id
+        }
+        for slot_datetime, time_slot in expand_day_rules(time_slots, day)
+    ]
+
+
+def get_doctor_availability(db: Session, doctor: Doctor, start_date: date, end_date: date,
+                            now: Optional[datetime] = None) -> List[Dict]:
+    """Availability for one doctor over an inclusive date range (two queries in total).
+
+    With now, the range is clamped to start today, and slots that can no
+    longer be booked (past times, closed weekdays) are left out.
+    """
+    days = date_range(start_date, end_date)
+    if now is not None:
+        days = [day for day in days if day >= now.date()]
+        if not days:
+            return []
+
+    from slot_calendar import slot_calendar
+    availability = slot_calendar.get_doctor_availability(db, doctor, days)
+    if availability is None:
+        availability = _expand_doctor_availability(db, doctor, days)
+
+    if now is not None:
+        for day in availability:
+            if day["day_of_week"] in CLOSED_WEEKDAYS:
+                day["available_slots"] = []
+            elif day["date"] == now.strftime("%Y-%m-%d"):
+                day["available_slots"] = [slot for slot in day["available_slots"]
+                                          if slot["time"] > now.strftime("%H:%M")]
+    return availability
+
+
+def _expand_doctor_availability(db: Session, doctor: Doctor, days: List[date]) -> List[Dict]:
+    rules = get_weekly_time_slots(db, [doctor.id], {day.weekday() for day in days})
+    booked = get_booked_datetimes(db, [doctor.id], days[0], days[-1]) if rules else set()
+
+    return [
+        {
+            "doctor_id": doctor.id,
+            "doctor_name": doctor.name,
+            "date": day.strftime("%Y-%m-%d"),
+            "day_of_week": day.weekday(),
+            "available_slots": build_day_slots(doctor.id, day, rules.get((doctor.id, day.weekday()), []), booked)
+        }
+        for day in days
+    ]
+
+
+def _format_opening(doctor_id: int, doctor_name: str, slot_datetime: datetime, slot_id: Optional[int]) -> Dict:
+    return {
+        "doctor_id": doctor_id,
+        "doctor_name": doctor_name,
+        "date": slot_datetime.strftime("%Y-%m-%d"),
+        "time": slot_datetime.strftime("%H:%M"),
+        "slot_id": slot_id
+    }
+
+
+def find_speciality_openings(db: Session, speciality_id: int, start_date: date, end_date: date,
+                             window_start: Optional[time] = None, window_end: Optional[time] = None,
+                             limit: int = 10, now: Optional[datetime] = None) -> List[Dict]:
+    """Earliest free slots across every available doctor in a speciality.
+
+    Rules and bookings for all doctors are fetched with one query each; days
+    are walked in order and the search stops as soon as `limit` openings have
+    been collected.
+    """
+    days = date_range(start_date, end_date)
+    doctors = db.query(Doctor.id, Doctor.name).filter(
+        Doctor.speciality_id == speciality_id,
+        Doctor.is_available == True
+    ).all()
+    if not doctors:
+        return []
+
+    doctor_names = {doctor_id: name for doctor_id, name in doctors}
+
+    from slot_calendar import slot_calendar
+    free_slots = slot_calendar.iter_free_slots(db, list(doctor_names), start_date, end_date)
+    if free_slots is not None:
+        openings = []
+        for slot_datetime, doctor_id, slot_id in free_slots:
+            slot_time = slot_datetime.time()
+            if slot_datetime.weekday() in CLOSED_WEEKDAYS:
+                continue
+            if window_start is not None and slot_time < window_start:
+                continue
+            if window_end is not None and slot_time >= window_end:
+                continue
+            if now is not None and slot_datetime <= now:
+                continue
+            openings.append(_format_opening(doctor_id, doctor_names[doctor_id], slot_datetime, slot_id))
+            if len(openings) >= limit:
+                break
+        return openings
+
+    rules = get_weekly_time_slots(db, doctor_names, {day.weekday() for day in days})
+    if not rules:
+        return []
+    booked = get_booked_datetimes(db, doctor_names, start_date, end_date)
+
+    openings = []
+    for day in days:
+        if day.weekday() in CLOSED_WEEKDAYS:
+            continue
+
+        day_openings = []
+        for doctor_id in doctor_names:
+            for slot_datetime, time_slot in expand_day_rules(rules.get((doctor_id, day.weekday()), []), day):
+                slot_time = slot_datetime.time()
+                if window_start is not None and slot_time < window_start:
+                    continue
+                if window_end is not None and slot_time >= window_end:
+                    continue
+                if now is not None and slot_datetime <= now:
+                    continue
+                if (doctor_id, slot_datetime) in booked:
+                    continue
+                day_openings.append((slot_datetime, doctor_id, time_slot.id))
+
+        day_openings.sort()
+        for slot_datetime, doctor_id, slot_id in day_openings:
+            openings.append(_format_opening(doctor_id, doctor_names[doctor_id], slot_datetime, slot_id))
+            if len(openings) >= limit:
+                return openings
+
+    return openings
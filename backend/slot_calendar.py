@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Materialized doctor slot calendar (optional, enable with SLOT_CALENDAR_ENABLED=true).
+
+Weekly DoctorTimeSlots rules are pre-expanded into concrete rows of the
+doctor_slot_calendar table for a rolling horizon, each with a booked/free
+flag. Availability reads become a single indexed range scan. The table is
+kept in sync inside the same transaction as bookings and time slot edits.
+The horizon rolls forward at startup and on the first read of each day.
+
+Rebuild after bulk rule changes:
+
+    python slot_calendar.py rebuild [--days 60] [--doctor 3 --doctor 7]
+"""
+
+import argparse
+import threading
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import SLOT_CALENDAR_ENABLED, SLOT_CALENDAR_HORIZON_DAYS
+from models import Appointment, Doctor, DoctorSlotCalendar
+from slot_availability import ACTIVE_APPOINTMENT_STATUSES, expand_day_rules, get_weekly_time_slots
+from timezone_utils import get_local_now
+
+
+class SlotCalendar:
+    """Maintains and reads the doctor_slot_calendar table"""
+
+    def __init__(self, enabled: bool = SLOT_CALENDAR_ENABLED, horizon_days: int = SLOT_CALENDAR_HORIZON_DAYS):
+        self.enabled = enabled
+        self.horizon_days = horizon_days
+        self._lock = threading.Lock()
+        self._extend_lock = threading.Lock()
+        self._built_through: Optional[date] = None
+        self._extended_on: Optional[date] = None  # Last day a read tried to roll the horizon forward
+
+    def today(self) -> date:
+        return get_local_now().date()
+
+    # -------------------------------------------------------------------------
+    # Maintenance
+    # -------------------------------------------------------------------------
+
+    def built_through(self, db: Session) -> Optional[date]:
+        """Last date materialized in the calendar (cached per process)"""
+        if self._built_through is None:
+            self._built_through = db.query(func.max(DoctorSlotCalendar.slot_date)).scalar()
+        return self._built_through
+
+    def _get_booked_appointments(self, db: Session, doctor_ids: List[int],
+                                 start_date: date, end_date: date) -> Dict[Tuple[int, datetime], int]:
+        rows = db.query(Appointment.id, Appointment.doctor_id, Appointment.date).filter(
+            Appointment.doctor_id.in_(doctor_ids),
+            Appointment.date >= datetime.combine(start_date, time.min),
+            Appointment.date < datetime.combine(end_date + timedelta(days=1), time.min),
+            Appointment.status.in_(ACTIVE_APPOINTMENT_STATUSES)
+        ).all()
+        return {(doctor_id, booked_at.replace(tzinfo=None)): appointment_id
+                for appointment_id, doctor_id, booked_at in rows}
+
+    def _materialize(self, db: Session, doctor_ids: Optional[List[int]], start_date: date, end_date: date) -> int:
+        """Insert calendar rows for [start_date, end_date]; overlapping rows must already be gone"""
+        if end_date < start_date:
+            return 0
+        if doctor_ids is None:
+            doctor_ids = [doctor_id for (doctor_id,) in db.query(Doctor.id).all()]
+        if not doctor_ids:
+            return 0
+
+        rules_by_weekday: Dict[int, List[Tuple[int, list]]] = defaultdict(list)
+        for (doctor_id, day_of_week), time_slots in get_weekly_time_slots(db, doctor_ids).items():
+            rules_by_weekday[day_of_week].append((doctor_id, time_slots))
+        if not rules_by_weekday:
+            return 0
+
+        booked = self._get_booked_appointments(db, doctor_ids, start_date, end_date)
+        rows = []
+        day = start_date
+        while day <= end_date:
+            for doctor_id, time_slots in rules_by_weekday.get(day.weekday(), []):
+                for slot_datetime, time_slot in expand_day_rules(time_slots, day):
+                    appointment_id = booked.get((doctor_id, slot_datetime))
+                    rows.append({
+                        "doctor_id": doctor_id,
+                        "slot_date": day,
+                        "slot_datetime": slot_datetime,
+                        "time_slot_id": time_slot.id,
+                        "is_booked": appointment_id is not None,
+                        "appointment_id": appointment_id
+                    })
+            day += timedelta(days=1)
+
+        if rows:
+            db.bulk_insert_mappings(DoctorSlotCalendar, rows)
+        return len(rows)
+
+    def rebuild(self, db: Session, doctor_ids: Optional[List[int]] = None,
+                horizon_days: Optional[int] = None) -> int:
+        """Re-expand the horizon from today for some or all doctors (caller commits)"""
+        horizon_days = horizon_days or self.horizon_days
+        today = self.today()
+        end_date = today + timedelta(days=horizon_days - 1)
+
+        with self._lock:
+            db.flush()
+            query = db.query(DoctorSlotCalendar)
+            if doctor_ids is not None:
+                query = query.filter(DoctorSlotCalendar.doctor_id.in_(doctor_ids))
+            else:
+                # Full rebuilds also drop days that have already passed
+                db.query(DoctorSlotCalendar).filter(
+                    DoctorSlotCalendar.slot_date < today
+                ).delete(synchronize_session=False)
+            query.filter(DoctorSlotCalendar.slot_date >= today).delete(synchronize_session=False)
+
+            count = self._materialize(db, doctor_ids, today, end_date)
+            if doctor_ids is None:
+                self._built_through = end_date
+            return count
+
+    def ensure_horizon(self, db: Session) -> int:
+        """Roll the horizon forward so it always covers today + horizon_days (caller commits)"""
+        if not self.enabled:
+            return 0
+
+        target = self.today() + timedelta(days=self.horizon_days - 1)
+        built_through = self.built_through(db)
+        if built_through is None or built_through < self.today():
+            return self.rebuild(db)
+        if built_through >= target:
+            return 0
+
+        with self._lock:
+            count = self._materialize(db, None, built_through + timedelta(days=1), target)
+            db.query(DoctorSlotCalendar).filter(
+                DoctorSlotCalendar.slot_date < self.today()
+            ).delete(synchronize_session=False)
+            self._built_through = target
+            return count
+
+    def _extend_if_behind(self, db: Session):
+        """Roll the horizon forward in its own transaction, at most once a day per process"""
+        today = self.today()
+        with self._extend_lock:
+            if self._extended_on == today:
+                return
+            self._extended_on = today
+            session = Session(bind=db.get_bind())
+            try:
+                # Another process may have extended the table already
+                self._built_through = None
+                count = self.ensure_horizon(session)
+                session.commit()
+                print(f"✅ Slot calendar extended through {self._built_through}: {count} slots written")
+            except Exception as e:
+                session.rollback()
+                self._built_through = None
+                print(f"❌ Error extending slot calendar: {e}")
+            finally:
+                session.close()
+
+    def sync_doctors(self, db: Session, doctor_ids: Iterable[int]):
+        """Re-expand the calendar for doctors whose time slot rules changed (caller commits)"""
+        if not self.enabled:
+            return
+        doctor_ids = [doctor_id for doctor_id in set(doctor_ids) if doctor_id is not None]
+        built_through = self.built_through(db)
+        if not doctor_ids or built_through is None:
+            return
+
+        with self._lock:
+            db.flush()
+            today = self.today()
+            db.query(DoctorSlotCalendar).filter(
+                DoctorSlotCalendar.doctor_id.in_(doctor_ids),
+                DoctorSlotCalendar.slot_date >= today
+            ).delete(synchronize_session=False)
+            self._materialize(db, doctor_ids, today, built_through)
+
+    def remove_doctor(self, db: Session, doctor_id: int):
+        """Drop every calendar row of a deleted doctor (caller commits)"""
+        if not self.enabled:
+            return
+        db.query(DoctorSlotCalendar).filter(
+            DoctorSlotCalendar.doctor_id == doctor_id
+        ).delete(synchronize_session=False)
+
+    def mark_booked(self, db: Session, doctor_id: int, slot_datetime: datetime,
+                    appointment_id: Optional[int], is_booked: bool = True):
+        """Flip the booked flag for one slot (caller commits)"""
+        if not self.enabled:
+            return
+        db.query(DoctorSlotCalendar).filter(
+            DoctorSlotCalendar.doctor_id == doctor_id,
+            DoctorSlotCalendar.slot_datetime == slot_datetime.replace(tzinfo=None)
+        ).update(
+            {"is_booked": is_booked, "appointment_id": appointment_id if is_booked else None},
+            synchronize_session=False
+        )
+
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
+
+    def covers(self, db: Session, start_date: date, end_date: date) -> bool:
+        """Whether the materialized horizon can answer this date range"""
+        if not self.enabled:
+            return False
+        built_through = self.built_through(db)
+        if built_through is None or built_through < self.today() + timedelta(days=self.horizon_days - 1):
+            # Long-running processes would otherwise fall back to rule expansion once the horizon passes
+            self._extend_if_behind(db)
+            built_through = self.built_through(db)
+        return built_through is not None and start_date >= self.today() and end_date <= built_through
+
+    def get_doctor_availability(self, db: Session, doctor: Doctor, days: List[date]) -> Optional[List[Dict]]:
+        """Availability for one doctor from a single range scan, or None if not covered"""
+        if not days or not self.covers(db, days[0], days[-1]):
+            return None
+
+        rows = db.query(
+            DoctorSlotCalendar.slot_datetime,
+            DoctorSlotCalendar.time_slot_id,
+            DoctorSlotCalendar.is_booked
+        ).filter(
+            DoctorSlotCalendar.doctor_id == doctor.id,
+            DoctorSlotCalendar.slot_date >= days[0],
+            DoctorSlotCalendar.slot_date <= days[-1]
+        ).order_by(DoctorSlotCalendar.slot_datetime).all()
+
+        slots_by_day: Dict[date, List[Dict]] = defaultdict(list)
+        for slot_datetime, time_slot_id, is_booked in rows:
+            slots_by_day[slot_datetime.date()].append({
+                "time": slot_datetime.strftime("%H:%M"),
+                "is_available": not is_booked,
+                "slot_id": time_slot_id
+            })
+
+        return [
+            {
+                "doctor_id": doctor.id,
+                "doctor_name": doctor.name,
+                "date": day.strftime("%Y-%m-%d"),
+                "day_of_week": day.weekday(),
+                "available_slots": slots_by_day.get(day, [])
+            }
+            for day in days
+        ]
+
+    def iter_free_slots(self, db: Session, doctor_ids: List[int], start_date: date,
+                        end_date: date) -> Optional[Iterator[Tuple[datetime, int, Optional[int]]]]:
+        """Free (slot_datetime, doctor_id, time_slot_id) in time order, or None if not covered"""
+        if not self.covers(db, start_date, end_date):
+            return None
+
+        query = db.query(
+            DoctorSlotCalendar.slot_datetime,
+            DoctorSlotCalendar.doctor_id,
+            DoctorSlotCalendar.time_slot_id
+        ).filter(
+            DoctorSlotCalendar.doctor_id.in_(doctor_ids),
+            DoctorSlotCalendar.slot_date >= start_date,
+            DoctorSlotCalendar.slot_date <= end_date,
+            DoctorSlotCalendar.is_booked == False
+        ).order_by(DoctorSlotCalendar.slot_datetime, DoctorSlotCalendar.doctor_id)
+        return iter(query.yield_per(500))
+
+
+# Global slot calendar instance
+slot_calendar = SlotCalendar()
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the materialized doctor slot calendar")
+    parser.add_argument("command", choices=["rebuild", "extend"])
+    parser.add_argument("--days", type=int, default=SLOT_CALENDAR_HORIZON_DAYS, help="Horizon in days")
+    parser.add_argument("--doctor", type=int, action="append", help="Only rebuild these doctor ids")
+    args = parser.parse_args()
+
+    calendar = SlotCalendar(enabled=True, horizon_days=args.days)
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            count = calendar.rebuild(db, doctor_ids=args.doctor)
+        else:
+            count = calendar.ensure_horizon(db)
+        db.commit()
+        print(f"✅ Slot calendar {args.command} complete: {count} slots written")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error updating slot calendar: {e}")
+    finally:
+        db.close()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test the IVF approximate nearest neighbour index: recall against exact
+search, incremental inserts and removals, and reloading saved centroids
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from ann_index import IVFFlatIndex
+from benchmark_ann import run_benchmark, synthetic_corpus
+from document_index import DocumentIndex
+
+ROWS = 6000
+DIMENSIONS = 32
+
+
+def chunks(document_ids):
+    return [{"id": int(i), "chunk": 0, "title": f"Doc {i}", "content": "", "type": "synthetic"} for i in document_ids]
+
+
+def build_index(ann, rows=ROWS, seed=0):
+    vectors, _, _ = synthetic_corpus(rows, DIMENSIONS, topics=60, spread=1.5, seed=seed)
+    index = DocumentIndex(top_k=10, min_similarity=-1.0, ann=ann)
+    for start in range(0, rows, 1000):
+        index.add_embeddings(chunks(range(start, start + 1000)), vectors[start:start + 1000])
+    return index, vectors
+
+
+def test_recall_against_exact_search():
+    """The benchmark reports high recall, and probing every cell is exact"""
+    print("🧪 Benchmarking recall@10 against exact search...")
+    report = run_benchmark(rows=ROWS, dimensions=DIMENSIONS, topics=60, spread=1.0, queries=50, nprobes=(8, 10000))
+    exact, probed, everything = report
+    assert probed["recall"] >= 0.9, probed
+    assert everything["recall"] == 1.0, everything
+    print(f"   ✅ recall@10 {probed['recall']:.3f} with nprobe=8 over {probed['cells']} cells "
+          f"(p50 {probed['p50_ms']:.2f} ms vs exact {exact['p50_ms']:.2f} ms)")
+
+
+def test_incremental_inserts_and_removals():
+    """Documents added after training are found, and removals keep cells consistent"""
+    print("🧪 Testing inserts and removals on a trained index...")
+    ann = IVFFlatIndex(min_rows=2000, nprobe=4)
+    index, vectors = build_index(ann)
+    assert ann.trained and ann.stats()["rows"] == ROWS
+
+    new_vector = np.random.default_rng(5).standard_normal(DIMENSIONS)
+    index.add_embeddings(chunks([ROWS]), [new_vector])
+    assert index.search_embedding(new_vector, k=1)[0]["metadata"]["document_id"] == ROWS
+
+    index.remove(range(0, ROWS, 3))
+    assert ann.stats()["rows"] == len(index)
+    for document_id in (1, 2, 4, 5999):
+        best = index.search_embedding(vectors[document_id], k=1)[0]
+        assert best["metadata"]["document_id"] == document_id
+    print(f"   ✅ {len(index)} rows still reachable through their cells")
+
+
+def test_centroids_reload_from_disk():
+    """A restarted index reuses saved centroids instead of retraining"""
+    print("🧪 Testing save and load of the ANN index...")
+    path = os.path.join(tempfile.mkdtemp(), "ann_ivf.npz")
+    first = IVFFlatIndex(min_rows=2000, path=path, model="test-model")
+    first_index, vectors = build_index(first)
+    assert os.path.exists(path)
+
+    restarted = IVFFlatIndex(min_rows=2000, path=path, model="test-model")
+    restarted_index, _ = build_index(restarted)
+    assert restarted.trained_rows == first.trained_rows
+    assert np.array_equal(restarted.centroids, first.centroids)
+    query = vectors[42] + 0.1
+    assert [hit["metadata"]["document_id"] for hit in first_index.search_embedding(query)] == \
+        [hit["metadata"]["document_id"] for hit in restarted_index.search_embedding(query)]
+
+    other_model = IVFFlatIndex(min_rows=100000, path=path, model="other-model")
+    build_index(other_model)
+    assert not other_model.trained, "centroids of another embedding model are ignored"
+    print(f"   ✅ {len(restarted.centroids)} cells reloaded")
+
+
+if __name__ == "__main__":
+    test_recall_against_exact_search()
+    test_incremental_inserts_and_removals()
+    test_centroids_reload_from_disk()
+    print("\n🎉 All ANN index tests passed!")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for slot booking: hundreds of parallel requests for
+the same doctor/time slot must produce exactly one appointment
+"""
+
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from appointment_booking import SlotConflictError, claim_slot, find_same_day_appointment
+from models import Appointment, Base, Doctor, Patient
+
+PARALLEL_BOOKINGS = 200
+
+
+@contextmanager
+def booking_database():
+    """Fresh file-backed SQLite database with one doctor and one patient per booking, removed afterwards"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(directory, 'booking_concurrency.db')}",
+            poolclass=NullPool,
+            connect_args={"check_same_thread": False, "timeout": 60}
+        )
+        try:
+            Base.metadata.create_all(engine)
+            Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+            db = Session()
+            doctor = Doctor(name="Dr. Stress", specialization="General Medicine")
+            db.add(doctor)
+            db.add_all([
+                Patient(first_name=f"Patient{i}", last_name="Test", phone=f"90000{i:05d}")
+                for i in range(PARALLEL_BOOKINGS)
+            ])
+            db.commit()
+            doctor_id = doctor.id
+            patient_ids = [patient_id for (patient_id,) in db.query(Patient.id).order_by(Patient.id).all()]
+            db.close()
+            yield Session, doctor_id, patient_ids
+        finally:
+            engine.dispose()
+
+
+def next_weekday_slot():
+    """10:00 on the next Monday"""
+    today = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
+    return today + timedelta(days=7 - today.weekday())
+
+
+def test_parallel_bookings_single_winner():
+    """Fire PARALLEL_BOOKINGS bookings at one slot at the same moment"""
+    print(f"🧪 Firing {PARALLEL_BOOKINGS} parallel bookings at one slot...")
+
+    with booking_database() as (Session, doctor_id, patient_ids):
+        slot_datetime = next_weekday_slot()
+        barrier = threading.Barrier(PARALLEL_BOOKINGS)
+
+        def book(patient_id):
+            db = Session()
+            try:
+                barrier.wait()
+                claim_slot(db, Appointment(
+                    patient_id=patient_id,
+                    doctor_id=doctor_id,
+                    date=slot_datetime,
+                    status="scheduled"
+                ))
+                return "booked"
+            except SlotConflictError:
+                return "conflict"
+            except Exception as e:
+                return f"error: {e}"
+            finally:
+                db.close()
+
+        with ThreadPoolExecutor(max_workers=PARALLEL_BOOKINGS) as executor:
+            results = list(executor.map(book, patient_ids))
+
+        booked = results.count("booked")
+        conflicts = results.count("conflict")
+        errors = [result for result in results if result.startswith("error")]
+        print(f"   📊 booked={booked} conflicts={conflicts} errors={len(errors)}")
+
+        assert not errors, errors[:3]
+        assert booked == 1, f"Expected exactly one booking, got {booked}"
+        assert conflicts == PARALLEL_BOOKINGS - 1
+
+        db = Session()
+        try:
+            stored = db.query(Appointment).filter(
+                Appointment.doctor_id == doctor_id,
+                Appointment.date == slot_datetime
+            ).count()
+        finally:
+            db.close()
+        assert stored == 1, f"Expected one stored appointment, found {stored}"
+    print("   ✅ Exactly one booking succeeded")
+
+
+@contextmanager
+def booked_slot_database():
+    """Test database where the first patient holds the next Monday 10:00 slot"""
+    with booking_database() as (Session, doctor_id, patient_ids):
+        slot_datetime = next_weekday_slot()
+        db = Session()
+        try:
+            claim_slot(db, Appointment(patient_id=patient_ids[0], doctor_id=doctor_id,
+                                       date=slot_datetime, status="scheduled"))
+        finally:
+            db.close()
+        yield Session, doctor_id, patient_ids, slot_datetime
+
+
+def test_cancelled_slot_can_be_rebooked():
+    """Cancelling frees the slot again; the unique index only covers active appointments"""
+    print("🧪 Rebooking a cancelled slot...")
+    with booked_slot_database() as (Session, doctor_id, patient_ids, slot_datetime):
+        db = Session()
+        try:
+            db.query(Appointment).filter(Appointment.doctor_id == doctor_id).update({"status": "cancelled"})
+            db.commit()
+
+            claim_slot(db, Appointment(patient_id=patient_ids[0], doctor_id=doctor_id,
+                                       date=slot_datetime, status="scheduled"))
+            try:
+                claim_slot(db, Appointment(patient_id=patient_ids[1], doctor_id=doctor_id,
+                                           date=slot_datetime, status="scheduled"))
+                raise AssertionError("Second active booking for the same slot was accepted")
+            except SlotConflictError:
+                pass
+        finally:
+            db.close()
+    print("   ✅ Cancelled slot rebooked once, duplicate rejected")
+
+
+def test_same_day_lookup_uses_date_range():
+    """Same-day duplicate check matches by day range, not string prefix"""
+    print("🧪 Checking same-day duplicate lookup...")
+    with booked_slot_database() as (Session, doctor_id, patient_ids, slot_datetime):
+        db = Session()
+        try:
+            patient = db.query(Patient).filter(Patient.id == patient_ids[0]).first()
+            assert find_same_day_appointment(db, patient, doctor_id, slot_datetime.date()) is not None
+            assert find_same_day_appointment(db, patient, doctor_id, (slot_datetime + timedelta(days=1)).date()) is None
+
+            other = db.query(Patient).filter(Patient.id == patient_ids[2]).first()
+            assert find_same_day_appointment(db, other, doctor_id, slot_datetime.date()) is None
+        finally:
+            db.close()
+    print("   ✅ Same-day lookup matches only the booked day and person")
+
+
+if __name__ == "__main__":
+    test_parallel_bookings_single_winner()
+    test_cancelled_slot_can_be_rebooked()
+    test_same_day_lookup_uses_date_range()
+    print("\n🎉 All booking concurrency tests passed!")
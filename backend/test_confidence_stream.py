@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test that the streaming confidence filter hides the [CONFIDENCE: X.X] marker
+however the completion is split into tokens
+"""
+
+import random
+import re
+
+from confidence_stream import ConfidenceMarkerFilter
+from text_config import ConfidencePatterns, DefaultValues
+
+TEST_COMPLETIONS = [
+    "Drink plenty of water and rest.\n\n[CONFIDENCE: 0.85]",
+    "See the guideline [1] and the [CONF] notes. [CONFIDENCE:0.4]",
+    "A response without any marker  ",
+    "Marker in the middle [CONFIDENCE: 0.7] and more text",
+    "Short [CONFIDENCE: 1.0]\n",
+]
+
+
+def stream_through_filter(chunks):
+    marker_filter = ConfidenceMarkerFilter()
+    shown = "".join(marker_filter.feed(chunk) for chunk in chunks)
+    tail, confidence = marker_filter.finish()
+    return shown + tail, confidence
+
+
+def random_chunks(text, rng):
+    cuts = sorted(rng.sample(range(1, len(text)), rng.randint(0, min(10, len(text) - 1))))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+def test_marker_never_shown():
+    """Streamed output equals the non-streamed cleanup for any token split"""
+    print("🧪 Testing confidence marker filtering...")
+    rng = random.Random(42)
+    for completion in TEST_COMPLETIONS:
+        match = re.search(ConfidencePatterns.CONFIDENCE_REGEX, completion)
+        expected_text = re.sub(ConfidencePatterns.CONFIDENCE_REPLACEMENT, '', completion).rstrip()
+        expected_confidence = float(match.group(1)) if match else DefaultValues.DEFAULT_CONFIDENCE
+
+        for _ in range(200):
+            shown, confidence = stream_through_filter(random_chunks(completion, rng))
+            assert shown == expected_text, (completion, shown)
+            assert confidence == expected_confidence, (completion, confidence)
+    print("   ✅ Marker hidden and confidence parsed for every split")
+
+
+def test_text_is_not_delayed():
+    """Only a possible marker prefix is held back"""
+    print("🧪 Testing lookahead buffer size...")
+    marker_filter = ConfidenceMarkerFilter()
+    assert marker_filter.feed("Hello") == "Hello"
+    assert marker_filter.feed(" there [CONF") == " there"
+    assert marker_filter.feed("IDENCE: 0.") == ""
+    assert marker_filter.feed("9]") == ""
+    assert marker_filter.finish() == ("", 0.9)
+    print("   ✅ Text forwarded immediately, only the marker is buffered")
+
+
+if __name__ == "__main__":
+    test_marker_never_shown()
+    test_text_is_not_delayed()
+    print("\n🎉 All confidence stream tests passed!")
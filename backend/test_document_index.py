@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory document index: top-k against a brute-force scan, row
+removal, chunking, syncing with the Document table through the ingestion
+pipeline and grounding of chat answers
+"""
+
+import math
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from document_index import DocumentIndex, chunk_text, document_index
+from document_ingestion import DocumentIngestion, IngestionJob
+from embedding_store import EmbeddingStore
+from models import Base, Document
+from rag_service_enhanced import EnhancedRAGService
+from session_store import SessionStore
+
+DIMENSIONS = 64
+TOPIC_WORDS = ["fever", "diabetes", "visiting", "parking", "vaccination"]
+
+
+def random_vectors(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [[rng.uniform(-1, 1) for _ in range(DIMENSIONS)] for _ in range(count)]
+
+
+def brute_force_top_k(vectors, query, k):
+    """The old per-document cosine loop from rag_service_simple"""
+    def cosine(a, b):
+        dot = sum(x * y for x, y in zip(a, b))
+        return dot / (math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(x * x for x in b)))
+    scored = sorted(((cosine(query, vector), i) for i, vector in enumerate(vectors)), reverse=True)
+    return [i for _, i in scored[:k]]
+
+
+def keyword_embed(texts):
+    """Deterministic stand-in for the embedding API: one dimension per topic word"""
+    return [[1.0 if word in text.lower() else 0.0 for word in TOPIC_WORDS] + [0.1] for text in texts]
+
+
+def test_top_k_matches_brute_force():
+    """Matrix top-k returns the same documents, in order, as the Python loop"""
+    print("🧪 Testing top-k against brute-force cosine similarity...")
+    vectors = random_vectors(2000)
+    index = DocumentIndex(top_k=5, min_similarity=-1.0)
+    index.add_embeddings(
+        [{"id": i, "chunk": 0, "title": f"Doc {i}", "content": f"content {i}", "type": "guideline"}
+         for i in range(len(vectors))],
+        vectors
+    )
+
+    for query in random_vectors(20, seed=11):
+        expected = brute_force_top_k(vectors, query, 5)
+        actual = [hit["metadata"]["document_id"] for hit in index.search_embedding(query)]
+        assert actual == expected, (actual, expected)
+
+    started = time.perf_counter()
+    for query in random_vectors(100, seed=13):
+        index.search_embedding(query)
+    elapsed_ms = (time.perf_counter() - started) * 10
+    print(f"   ✅ 20 queries match, {elapsed_ms:.2f} ms per search over {len(index)} documents")
+
+
+def test_remove_keeps_rows_contiguous():
+    """Removing a document moves the last row into its place"""
+    print("🧪 Testing document removal...")
+    vectors = random_vectors(10)
+    index = DocumentIndex(top_k=10, min_similarity=-1.0)
+    index.add_embeddings(
+        [{"id": i, "chunk": 0, "title": f"Doc {i}", "content": "", "type": "note"} for i in range(10)],
+        vectors
+    )
+    index.remove([3, 9, 0])
+    assert len(index) == 7
+    for document_id in (1, 2, 4, 5, 6, 7, 8):
+        best = index.search_embedding(vectors[document_id], k=1)[0]
+        assert best["metadata"]["document_id"] == document_id
+        assert abs(best["distance"]) < 1e-5
+    print("   ✅ Remaining documents still found by their own embedding")
+
+
+def test_chunk_text_overlaps():
+    """Long documents become overlapping chunks that cover the whole text"""
+    print("🧪 Testing document chunking...")
+    sentences = [f"Guideline sentence number {i} about patient care." for i in range(100)]
+    text = " ".join(sentences)
+    chunks = chunk_text(text, chunk_size=300, overlap=60)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.split(" ")[0] in previous, "consecutive chunks should overlap"
+    for sentence in sentences:
+        assert any(sentence in chunk for chunk in chunks), sentence
+    assert chunk_text("Short note.") == ["Short note."]
+    print(f"   ✅ {len(text)} characters -> {len(chunks)} chunks")
+
+
+def sync_and_ingest(ingestion, db):
+    """What a chat lookup triggers, but with the ingestion job run inline"""
+    missing_ids = document_index.sync(db)
+    if missing_ids:
+        ingestion.run(IngestionJob(id="inline", document_ids=missing_ids))
+
+
+def test_sync_with_document_table():
+    """Committed inserts, updates and deletes are reflected after re-ingestion"""
+    print("🧪 Testing sync with the Document table...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    original_embed, original_store = document_index.embed, document_index.store
+    document_index.embed = keyword_embed
+    document_index.store = EmbeddingStore(tempfile.mkdtemp(), "keyword-test")
+    document_index.clear()
+    ingestion = DocumentIngestion(document_index, session_factory=Session)
+
+    db = Session()
+    try:
+        fever = Document(title="Fever care", content="Treat a fever with fluids and rest.")
+        parking = Document(title="Parking", content="Parking is free for patients.")
+        db.add_all([fever, parking])
+        db.commit()
+
+        sync_and_ingest(ingestion, db)
+        hits = document_index.search("my child has a fever")
+        assert [hit["metadata"]["title"] for hit in hits][0] == "Fever care"
+        assert document_index.document_count == 2
+
+        parking.content = "Visiting hours are 10 AM to 6 PM."
+        parking.title = "Visiting hours"
+        db.commit()
+        sync_and_ingest(ingestion, db)
+        hits = document_index.search("what are the visiting hours")
+        assert hits[0]["metadata"]["title"] == "Visiting hours"
+
+        db.delete(fever)
+        db.commit()
+        sync_and_ingest(ingestion, db)
+        hits = document_index.search("my child has a fever")
+        assert all(hit["metadata"]["title"] != "Fever care" for hit in hits)
+        assert document_index.document_count == 1
+        print("   ✅ Index follows committed document changes")
+    finally:
+        db.close()
+        document_index.embed, document_index.store = original_embed, original_store
+        document_index.clear()
+
+
+def test_failed_documents_do_not_rescan():
+    """Documents that cannot be embedded are not looked for again on every chat lookup"""
+    print("🧪 Testing sync after failed embeddings...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add_all([Document(title=f"Guide {i}", content=f"Guideline {i}.") for i in range(50)])
+    db.commit()
+
+    def failing_embed(texts):
+        raise RuntimeError("embeddings API unavailable")
+    index = DocumentIndex(embed=failing_embed)
+    ingestion = DocumentIngestion(index, session_factory=Session)
+    ingestion.run(IngestionJob(id="inline", document_ids=index.sync(db)))
+    ingestion.shutdown()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    missing = [index.sync(db) for _ in range(5)]
+    assert len(missing[0]) == 50 and missing[1:] == [[]] * 4, missing
+    assert len(statements) == 2, statements  # One rescan after the job finished
+    assert index.stats()["unindexed_documents"] == 50 and not index.stats()["stale"]
+
+    statements.clear()
+    index._recheck_at = 0  # RETRY_AFTER_SECONDS later
+    assert len(index.sync(db)) == 50 and len(statements) == 2
+    db.close()
+    print(f"   ✅ 5 lookups ran one scan for {len(missing[0])} unembedded documents")
+
+
+def test_chat_answers_are_grounded():
+    """process_query_with_fallback passes the matching documents to the LLM"""
+    print("🧪 Testing retrieval in process_query_with_fallback...")
+    service = EnhancedRAGService()
+    service.session_store = SessionStore(enabled=False)
+    seen = {}
+    service.get_query_contexts = lambda db, patient_id, doctor_id: (None, None)
+    service.retrieve_documents = lambda query, db: [
+        {"content": "Vaccination clinic runs on Saturdays.",
+         "metadata": {"title": "Vaccination", "type": "guideline", "document_id": 1}, "distance": 0.1}
+    ]
+
+    def fake_llm(query, patient_context=None, doctor_context=None, retrieved_docs=None, history=None):
+        seen["docs"] = retrieved_docs
+        return "The vaccination clinic runs on Saturdays.", 0.9
+    service.generate_openai_response_with_confidence = fake_llm
+
+    result = service.process_query_with_fallback("When is the vaccination clinic?", None)
+    assert seen["docs"][0]["content"] == "Vaccination clinic runs on Saturdays."
+    assert result["retrieved_documents"] == ["Vaccination"]
+    print("   ✅ Retrieved documents reach the prompt and the response")
+
+
+if __name__ == "__main__":
+    test_top_k_matches_brute_force()
+    test_remove_keeps_rows_contiguous()
+    test_chunk_text_overlaps()
+    test_sync_with_document_table()
+    test_failed_documents_do_not_rescan()
+    test_chat_answers_are_grounded()
+    print("\n🎉 All document index tests passed!")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test the background document ingestion pipeline: chunking long documents,
+batched embedding with bounded concurrency, job progress and failures
+"""
+
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from document_index import DocumentIndex
+from document_ingestion import DocumentIngestion
+from embedding_store import EmbeddingStore
+from models import Base, Document
+
+BULK_DOCUMENTS = 300
+BATCH_SIZE = 16
+MAX_CONCURRENCY = 3
+
+
+class SlowBatchEmbed:
+    """Fake embeddings API that records batch sizes and concurrent requests"""
+
+    def __init__(self, delay: float = 0.01, fail_when=None):
+        self.delay = delay
+        self.fail_when = fail_when
+        self.batch_sizes = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.batch_sizes.append(len(texts))
+        try:
+            time.sleep(self.delay)
+            if self.fail_when and any(self.fail_when(text) for text in texts):
+                raise RuntimeError("embedding API error")
+            return [[1.0, float(len(text) % 7), float(text.count("fever"))] for text in texts]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def create_test_database(documents):
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add_all(documents)
+    db.commit()
+    document_ids = [document.id for document in documents]
+    db.close()
+    return Session, document_ids
+
+
+def wait_for(job, timeout: float = 10):
+    deadline = time.time() + timeout
+    while job.status in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_bulk_job_batches_and_bounds_concurrency():
+    """Hundreds of documents are embedded in a background job, in bounded batches"""
+    print(f"🧪 Ingesting {BULK_DOCUMENTS} documents in the background...")
+    Session, document_ids = create_test_database([
+        Document(title=f"Guideline {i}", content=f"Guideline {i} text. " * (5 if i % 10 else 200))
+        for i in range(BULK_DOCUMENTS)
+    ])
+    embed = SlowBatchEmbed()
+    index = DocumentIndex(embed=embed, min_similarity=-1.0)
+    ingestion = DocumentIngestion(index, session_factory=Session, batch_size=BATCH_SIZE,
+                                  max_concurrency=MAX_CONCURRENCY)
+
+    started = time.perf_counter()
+    job = ingestion.submit(document_ids)
+    submit_ms = (time.perf_counter() - started) * 1000
+    assert job.status in ("queued", "running")
+    assert ingestion.submit(document_ids[:10]) is None, "queued documents are not queued twice"
+
+    wait_for(job)
+    ingestion.shutdown()
+    assert job.status == "completed", job.to_dict()
+    assert job.processed_documents == BULK_DOCUMENTS
+    assert index.document_count == BULK_DOCUMENTS
+    assert job.embedded_chunks == job.total_chunks == len(index) > BULK_DOCUMENTS
+    assert max(embed.batch_sizes) <= BATCH_SIZE
+    assert len(embed.batch_sizes) < job.total_chunks / 4, "many inputs per embeddings call"
+    assert 1 < embed.max_in_flight <= MAX_CONCURRENCY
+    print(f"   ✅ submit returned in {submit_ms:.1f} ms; {job.total_chunks} chunks in "
+          f"{len(embed.batch_sizes)} requests, max {embed.max_in_flight} in flight")
+
+
+def test_failed_batch_marks_documents_failed():
+    """Documents in a failed batch are reported; the rest are indexed"""
+    print("🧪 Testing a failing embeddings batch...")
+    Session, document_ids = create_test_database([
+        Document(title="Fever care", content="Treat a fever with fluids."),
+        Document(title="Broken", content="This text makes the API fail."),
+        Document(title="Parking", content="Parking is free."),
+    ])
+    embed = SlowBatchEmbed(delay=0, fail_when=lambda text: "API fail" in text)
+    index = DocumentIndex(embed=embed, min_similarity=-1.0)
+    ingestion = DocumentIngestion(index, session_factory=Session, batch_size=1)
+
+    job = wait_for(ingestion.submit(document_ids))
+    assert job.status == "failed"
+    assert job.failed_document_ids == [document_ids[1]]
+    assert index.document_count == 2
+    assert ingestion.submit([document_ids[1]], retry_failed=False) is None, "recent failures are not retried by chat"
+    assert ingestion.submit([document_ids[1]]) is not None
+    ingestion.shutdown()
+    print(f"   ✅ {job.error}")
+
+
+def test_stored_embeddings_are_reused():
+    """Re-ingesting unchanged documents reads the store instead of the API"""
+    print("🧪 Testing re-ingestion with an embedding store...")
+    Session, document_ids = create_test_database([
+        Document(title=f"Guideline {i}", content=f"Content {i}") for i in range(20)
+    ])
+    directory = tempfile.mkdtemp()
+
+    first_embed = SlowBatchEmbed(delay=0)
+    first = DocumentIngestion(DocumentIndex(embed=first_embed, store=EmbeddingStore(directory, "test-model")),
+                              session_factory=Session)
+    wait_for(first.submit(document_ids))
+
+    second_embed = SlowBatchEmbed(delay=0)
+    second = DocumentIngestion(DocumentIndex(embed=second_embed, store=EmbeddingStore(directory, "test-model")),
+                               session_factory=Session)
+    job = wait_for(second.submit(document_ids))
+    first.shutdown()
+    second.shutdown()
+    assert job.reused_documents == 20 and job.embedded_chunks == 0
+    assert second_embed.batch_sizes == []
+    print("   ✅ 20 documents reused from the store, no embeddings requests")
+
+
+if __name__ == "__main__":
+    test_bulk_job_batches_and_bounds_concurrency()
+    test_failed_batch_marks_documents_failed()
+    test_stored_embeddings_are_reused()
+    print("\n🎉 All document ingestion tests passed!")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test the shared embedding cache: memory and SQLite tiers, batching of
+misses, model separation and zero-cost re-indexing of unchanged documents
+"""
+
+import os
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from document_index import DocumentIndex
+from document_ingestion import DocumentIngestion, IngestionJob
+from embedding_cache import EmbeddingCache
+from models import Base, Document
+
+
+class RecordingEmbed:
+    """Fake embeddings API that records every request it receives"""
+
+    def __init__(self):
+        self.requests = []
+
+    @property
+    def texts(self):
+        return sum(len(request) for request in self.requests)
+
+    def __call__(self, texts):
+        self.requests.append(list(texts))
+        return [[float(len(text)), float(text.count("a")), 0.5] for text in texts]
+
+
+def test_repeated_texts_hit_memory():
+    """The same text is embedded once, duplicates in a batch included"""
+    print("🧪 Testing the memory tier...")
+    api = RecordingEmbed()
+    cache = EmbeddingCache(api, "test-model")
+
+    first = cache.embed(["fever", "headache", "fever"])
+    second = cache.embed(["headache", "fever", "rash"])
+    assert api.requests == [["fever", "headache"], ["rash"]]
+    assert first[0] == first[2] == second[1]
+    assert cache.stats()["memory_hits"] == 2
+    print(f"   ✅ {api.texts} texts sent to the API for 6 lookups")
+
+
+def test_disk_tier_survives_restart():
+    """A new cache instance on the same file serves stored embeddings"""
+    print("🧪 Testing the SQLite tier across restarts...")
+    path = os.path.join(tempfile.mkdtemp(), "embeddings.db")
+    EmbeddingCache(RecordingEmbed(), "test-model", path=path).embed(["fever", "visiting hours"])
+
+    api = RecordingEmbed()
+    restarted = EmbeddingCache(api, "test-model", path=path)
+    vectors = restarted.embed(["visiting hours", "fever"])
+    assert api.requests == []
+    assert vectors[1] == [5.0, 0.0, 0.5]
+    assert restarted.stats()["disk_hits"] == 2
+
+    other_model = RecordingEmbed()
+    EmbeddingCache(other_model, "other-model", path=path).embed(["fever"])
+    assert other_model.requests == [["fever"]], "embeddings of another model are never reused"
+    print("   ✅ Restarted cache made no API calls")
+
+
+def test_lru_bounds_memory():
+    """The memory tier keeps at most max_entries vectors"""
+    print("🧪 Testing LRU eviction...")
+    api = RecordingEmbed()
+    cache = EmbeddingCache(api, "test-model", max_entries=2)
+    cache.embed(["a"])
+    cache.embed(["b"])
+    cache.embed(["a"])
+    cache.embed(["c"])  # Evicts "b", the least recently used
+    cache.embed(["a", "b"])
+    assert api.requests[-1] == ["b"]
+    assert cache.stats()["memory_entries"] == 2
+    print("   ✅ Least recently used entry evicted")
+
+
+def test_reindex_unchanged_documents_is_free():
+    """Re-indexing the knowledge base from scratch costs no API calls"""
+    print("🧪 Testing re-indexing through the cache...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add_all([Document(title=f"Guideline {i}", content=f"Care guideline number {i}.") for i in range(30)])
+    db.commit()
+    path = os.path.join(tempfile.mkdtemp(), "embeddings.db")
+
+    def reindex():
+        """A fresh worker with an empty index and no embedding store"""
+        api = RecordingEmbed()
+        index = DocumentIndex(embed=EmbeddingCache(api, "test-model", path=path).embed)
+        DocumentIngestion(index, session_factory=Session).run(
+            IngestionJob(id="reindex", document_ids=index.sync(db))
+        )
+        return index, api
+
+    first, first_api = reindex()
+    second, second_api = reindex()
+    db.close()
+    assert first_api.texts == 30 and len(first) == 30
+    assert second_api.requests == [] and len(second) == 30
+    print("   ✅ 30 documents re-indexed with 0 API calls")
+
+
+if __name__ == "__main__":
+    test_repeated_texts_hit_memory()
+    test_disk_tier_survives_restart()
+    test_lru_bounds_memory()
+    test_reindex_unchanged_documents_is_free()
+    print("\n🎉 All embedding cache tests passed!")
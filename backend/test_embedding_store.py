@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test the memory-mapped embedding store: persistence across restarts, sharing
+between worker processes, model changes and compaction
+"""
+
+import tempfile
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from document_index import DocumentIndex
+from document_ingestion import DocumentIngestion, IngestionJob
+from embedding_store import EmbeddingStore
+from models import Base, Document
+
+DIMENSIONS = 8
+
+
+class CountingEmbed:
+    """Fake embedding API that records how many texts it was asked to embed"""
+
+    def __init__(self):
+        self.texts = 0
+
+    def __call__(self, texts):
+        self.texts += len(texts)
+        return [[float(len(text) % (i + 2)) + 0.5 for i in range(DIMENSIONS)] for text in texts]
+
+
+def test_rows_survive_restart():
+    """Embeddings appended by one instance are mapped, not recomputed, by the next"""
+    print("🧪 Testing persistence across restarts...")
+    directory = tempfile.mkdtemp()
+    vectors = np.random.default_rng(1).standard_normal((3, DIMENSIONS)).astype(np.float32)
+
+    store = EmbeddingStore(directory, "test-model")
+    rows = store.append([(1, 0, "a"), (2, 0, "b"), (2, 1, "c")], vectors)
+    assert rows == [0, 1, 2]
+
+    reopened = EmbeddingStore(directory, "test-model")
+    reopened.open()
+    assert isinstance(reopened.vectors, np.memmap)
+    assert reopened.lookup(2, 0, "b") == 1
+    assert reopened.lookup(2, 1, "c") == 2
+    assert reopened.lookup(2, 0, "changed text") is None
+    assert np.array_equal(reopened.vectors[1], vectors[1])
+    print(f"   ✅ {reopened.stats()['rows']} rows mapped from disk")
+
+
+def test_workers_share_appends():
+    """A second worker sees rows appended by the first after reload"""
+    print("🧪 Testing appends shared between workers...")
+    directory = tempfile.mkdtemp()
+    worker_a = EmbeddingStore(directory, "test-model")
+    worker_b = EmbeddingStore(directory, "test-model")
+    worker_a.open()
+    worker_b.open()
+
+    worker_a.append([(1, 0, "a")], np.ones((1, DIMENSIONS)))
+    worker_b.append([(2, 0, "b")], np.full((1, DIMENSIONS), 2.0))
+    worker_a.reload()
+    assert worker_a.lookup(1, 0, "a") == 0
+    assert worker_a.lookup(2, 0, "b") == 1
+    assert worker_a.vectors[1][0] == 2.0
+    print("   ✅ Rows from both workers visible to each")
+
+
+def test_model_change_resets_store():
+    """Embeddings from another model are never reused"""
+    print("🧪 Testing embedding model change...")
+    directory = tempfile.mkdtemp()
+    EmbeddingStore(directory, "old-model").append([(1, 0, "a")], np.ones((1, DIMENSIONS)))
+
+    store = EmbeddingStore(directory, "new-model")
+    store.open()
+    assert store.lookup(1, 0, "a") is None
+    assert store.stats()["rows"] == 0
+    print("   ✅ Store reset for the new model")
+
+
+def test_compact_drops_superseded_rows():
+    """Compaction keeps only the latest row of each live document"""
+    print("🧪 Testing compaction...")
+    directory = tempfile.mkdtemp()
+    store = EmbeddingStore(directory, "test-model")
+    store.append([(1, 0, "v1"), (2, 0, "x")], np.ones((2, DIMENSIONS)))
+    store.append([(1, 0, "v2")], np.full((1, DIMENSIONS), 3.0))
+
+    dropped = store.compact(keep_document_ids=[1])
+    assert dropped == 2
+    assert store.stats()["rows"] == 1
+    assert store.lookup(1, 0, "v2") == 0
+    assert store.vectors[0][0] == 3.0
+    assert store.lookup(2, 0, "x") is None
+    print(f"   ✅ {dropped} rows dropped")
+
+
+def test_index_restart_reuses_embeddings():
+    """A restarted document index only embeds documents whose text changed"""
+    print("🧪 Testing document index restart with a store...")
+    directory = tempfile.mkdtemp()
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add_all([
+        Document(title=f"Guideline {i}", content=f"Content of guideline number {i} " * (i + 1))
+        for i in range(20)
+    ])
+    db.commit()
+
+    def start_worker():
+        """Startup: map stored embeddings, then ingest whatever is missing"""
+        embed = CountingEmbed()
+        index = DocumentIndex(embed=embed, min_similarity=-1.0, store=EmbeddingStore(directory, "test-model"))
+        missing_ids = index.sync(db)
+        if missing_ids:
+            DocumentIngestion(index, session_factory=Session).run(IngestionJob(id="startup", document_ids=missing_ids))
+        return index, embed
+
+    first, first_embed = start_worker()
+    assert first_embed.texts == 20
+
+    restarted, restarted_embed = start_worker()
+    assert restarted_embed.texts == 0 and len(restarted) == 20
+
+    db.query(Document).filter(Document.id == 5).update({"content": "Updated content"})
+    db.commit()
+    changed, changed_embed = start_worker()
+    assert changed_embed.texts == 1 and len(changed) == 20
+
+    query = CountingEmbed()(["Guideline 7"])[0]
+    assert [hit["metadata"]["document_id"] for hit in first.search_embedding(query, k=5)] == \
+        [hit["metadata"]["document_id"] for hit in restarted.search_embedding(query, k=5)]
+    db.close()
+    print("   ✅ Restart mapped 20 stored embeddings; one changed document re-embedded")
+
+
+def test_search_ignores_superseded_rows():
+    """Store-backed search ranks only live chunks, however many old versions the store holds"""
+    print("🧪 Testing store-backed search with superseded rows...")
+    index = DocumentIndex(embed=CountingEmbed(), min_similarity=-1.0,
+                          store=EmbeddingStore(tempfile.mkdtemp(), "test-model"))
+    query = np.eye(DIMENSIONS)[0]
+    for version in range(50):
+        # Old versions of document 1 point straight at the query; the live one points away
+        vector = query if version < 49 else -query
+        index.add_embeddings([{"id": 1, "chunk": 0, "title": "Doc", "content": f"v{version}", "type": "x"}], [vector])
+    index.add_embeddings([{"id": 2, "chunk": 0, "title": "Other", "content": "o", "type": "x"}], [np.ones(DIMENSIONS)])
+
+    hits = index.search_embedding(query, k=5)
+    assert [hit["metadata"]["document_id"] for hit in hits] == [2, 1]
+    assert abs(hits[1]["score"] + 1) < 1e-6
+    stats = index.stats()
+    assert index.store.stats()["rows"] == 51 and stats["chunks"] == 2 and stats["dimensions"] == DIMENSIONS, stats
+    print(f"   ✅ 2 live chunks scored out of {index.store.stats()['rows']} stored rows")
+
+
+if __name__ == "__main__":
+    test_rows_survive_restart()
+    test_workers_share_appends()
+    test_model_change_resets_store()
+    test_compact_drops_superseded_rows()
+    test_index_restart_reuses_embeddings()
+    test_search_ignores_superseded_rows()
+    print("\n🎉 All embedding store tests passed!")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test the precompiled entity extractor against the original per-message
+regex and keyword loops
+"""
+
+import re
+import time
+
+from entity_extractor import EntityExtractor
+from text_config import HealthKeywords
+
+TEST_MESSAGES = [
+    "I have a headache since yesterday",
+    "chest pain 9/10 for a few hours",
+    "fever of 103.5 F since last week",
+    "temperature is 100 degrees and my stomach aches",
+    "lower back pain 3 out of 10, just started",
+    "pain level 6 in my left arm since monday",
+    "my alarm went off and my legs hurt for 7 days",
+    "weekend was fine",
+    "Hello",
+    "",
+]
+
+
+def legacy_extract(user_input: str):
+    """The original extraction code from process_questionnaire_response"""
+    user_input_lower = user_input.lower()
+
+    pain_level = None
+    pain_match = re.search(r'(\d+)/10|(\d+)\s*out\s*of\s*10|pain\s*level\s*(\d+)', user_input_lower)
+    if pain_match:
+        pain_level = pain_match.group(1) or pain_match.group(2) or pain_match.group(3)
+
+    temperature = None
+    temp_match = re.search(r'(\d+(?:\.\d+)?)\s*°?[fF]|(\d+(?:\.\d+)?)\s*degrees', user_input_lower)
+    if temp_match:
+        temperature = temp_match.group(1) or temp_match.group(2)
+
+    detected_location = None
+    for location, keywords in HealthKeywords.PAIN_LOCATIONS.items():
+        if any(keyword in user_input_lower for keyword in keywords):
+            detected_location = location
+            break
+
+    detected_duration = None
+    for duration, keywords in HealthKeywords.DURATION_KEYWORDS.items():
+        if any(keyword in user_input_lower for keyword in keywords):
+            detected_duration = duration
+            break
+
+    return pain_level, temperature, detected_location, detected_duration
+
+
+def test_extractor_matches_legacy():
+    """EntityExtractor returns the same entities as the legacy code"""
+    print("🧪 Testing entity extractor...")
+    extractor = EntityExtractor()
+
+    for message, entities in zip(TEST_MESSAGES, extractor.extract_batch(TEST_MESSAGES)):
+        expected = legacy_extract(message)
+        actual = (entities.pain_level_text, entities.temperature_text, entities.pain_location, entities.duration)
+        assert actual == expected, f"Mismatch for '{message}': expected {expected}, got {actual}"
+        print(f"   ✅ '{message}' -> {entities}")
+
+
+def benchmark_extractor(copies: int = 2000):
+    """Time legacy extraction against a batch run of the extractor"""
+    extractor = EntityExtractor()
+    messages = TEST_MESSAGES * copies
+
+    start = time.perf_counter()
+    for message in messages:
+        legacy_extract(message)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    extractor.extract_batch(messages)
+    batch_time = time.perf_counter() - start
+
+    print(f"📊 Legacy extraction: {legacy_time * 1000:.1f} ms for {len(messages)} messages")
+    print(f"📊 Batch extraction:  {batch_time * 1000:.1f} ms for {len(messages)} messages")
+
+
+if __name__ == "__main__":
+    test_extractor_matches_legacy()
+    benchmark_extractor()
+    print("\n🎉 Entity extractor test completed!")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test the BM25 lexical index: scores against the textbook formula, postings
+maintenance, sync with the Document table, reciprocal-rank fusion and
+retrieval without embeddings
+"""
+
+import math
+import random
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from document_index import document_index
+from lexical_index import BM25Index, lexical_index, reciprocal_rank_fusion, tokenize
+from models import Base, Document
+from rag_service_enhanced import EnhancedRAGService
+
+CORPUS = [
+    ("Fever care", "Treat a fever with fluids and rest. See a doctor if the fever lasts three days."),
+    ("Visiting hours", "Visiting hours are 10 AM to 6 PM every day."),
+    ("Diabetes diet", "Patients with diabetes should limit sugar and eat regular meals."),
+    ("Child fever", "A child with a high fever needs paracetamol and fluids."),
+    ("Parking", "Parking is free for patients and visitors."),
+]
+
+
+def chunks_of(corpus):
+    return [
+        {"id": i, "chunk": 0, "title": title, "content": content, "type": "guideline"}
+        for i, (title, content) in enumerate(corpus)
+    ]
+
+
+def reference_bm25(corpus, query, k1=1.5, b=0.75):
+    """Okapi BM25 computed directly from the definition"""
+    documents = [tokenize(f"{title}\n\n{content}") for title, content in corpus]
+    average = sum(len(tokens) for tokens in documents) / len(documents)
+    scores = []
+    for tokens in documents:
+        score = 0.0
+        for term in set(tokenize(query)):
+            containing = sum(1 for other in documents if term in other)
+            if not containing:
+                continue
+            idf = math.log(1 + (len(documents) - containing + 0.5) / (containing + 0.5))
+            frequency = tokens.count(term)
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * len(tokens) / average))
+        scores.append(score)
+    return scores
+
+
+def test_scores_match_reference():
+    """Index scores equal the BM25 formula and rank the best match first"""
+    print("🧪 Testing BM25 scores against the reference formula...")
+    index = BM25Index(top_k=5)
+    index.add_chunks(chunks_of(CORPUS))
+
+    for query in ("my child has a fever", "visiting hours", "diabetes sugar", "free parking for visitors"):
+        expected = reference_bm25(CORPUS, query)
+        for hit in index.search(query):
+            assert abs(hit["score"] - expected[hit["metadata"]["document_id"]]) < 1e-9
+        best = max(range(len(CORPUS)), key=lambda i: expected[i])
+        assert index.search(query)[0]["metadata"]["document_id"] == best
+    assert index.search("the and of") == [], "stopword-only queries match nothing"
+    print("   ✅ Scores match for 4 queries")
+
+
+def test_remove_cleans_postings():
+    """Removing documents drops their postings and length statistics"""
+    print("🧪 Testing document removal...")
+    index = BM25Index()
+    index.add_chunks(chunks_of(CORPUS))
+    index.remove([0, 3])
+    assert index.search("fever") == []
+    assert "fever" not in index._postings and "paracetamol" not in index._postings
+
+    index.add_chunks([{"id": 1, "chunk": 0, "title": "Visiting hours", "content": "Now 9 AM to 8 PM.",
+                       "type": "guideline"}])
+    assert index.document_count == 3, "re-adding a document replaces its chunks"
+    assert index.search("visiting")[0]["content"] == "Now 9 AM to 8 PM."
+    print("   ✅ Postings of removed documents are gone")
+
+
+def test_search_is_fast():
+    """Top-k over thousands of chunks takes milliseconds"""
+    print("🧪 Timing BM25 search...")
+    rng = random.Random(3)
+    vocabulary = [f"term{i}" for i in range(3000)]
+    index = BM25Index(top_k=5)
+    index.add_chunks([
+        {"id": i, "chunk": 0, "title": f"Doc {i}", "content": " ".join(rng.choices(vocabulary, k=120)),
+         "type": "note"}
+        for i in range(5000)
+    ])
+    queries = [" ".join(rng.choices(vocabulary, k=4)) for _ in range(50)]
+    started = time.perf_counter()
+    for query in queries:
+        assert len(index.search(query)) == 5
+    elapsed_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    assert elapsed_ms < 50
+    print(f"   ✅ {elapsed_ms:.2f} ms per search over {len(index)} chunks")
+
+
+def test_reciprocal_rank_fusion():
+    """Chunks ranked well by both retrievers come first"""
+    print("🧪 Testing reciprocal-rank fusion...")
+
+    def hits(*document_ids):
+        return [{"content": "", "metadata": {"document_id": i, "chunk": 0, "title": f"Doc {i}"}} for i in document_ids]
+
+    fused = reciprocal_rank_fusion([hits(1, 2, 3), hits(3, 1, 4)], top_k=3)
+    assert [hit["metadata"]["document_id"] for hit in fused] == [1, 3, 2]
+    assert fused[0]["score"] == 1 / 61 + 1 / 62
+    print("   ✅ Fused order 1, 3, 2")
+
+
+def test_retrieval_without_embeddings():
+    """Chat retrieval falls back to BM25 and follows committed document changes"""
+    print("🧪 Testing retrieval with embeddings unavailable...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    original_embed = document_index.embed
+    document_index.embed = None  # No API key: the vector index is unavailable
+    lexical_index.clear()
+    service = EnhancedRAGService()
+
+    db = Session()
+    try:
+        db.add_all([Document(title=title, content=content, document_type="guideline") for title, content in CORPUS])
+        db.commit()
+        hits = service.retrieve_documents("my child has a high fever", db)
+        assert hits[0]["metadata"]["title"] == "Child fever"
+
+        parking = db.query(Document).filter(Document.title == "Parking").first()
+        parking.content = "The car park is closed for repairs."
+        db.commit()
+        hits = service.retrieve_documents("is parking free", db)
+        assert all("free" not in hit["content"] for hit in hits)
+        print("   ✅ BM25 grounds answers and sees committed updates")
+    finally:
+        db.close()
+        document_index.embed = original_embed
+        lexical_index.clear()
+
+
+if __name__ == "__main__":
+    test_scores_match_reference()
+    test_remove_cleans_postings()
+    test_search_is_fast()
+    test_reciprocal_rank_fusion()
+    test_retrieval_without_embeddings()
+    print("\n🎉 All lexical index tests passed!")
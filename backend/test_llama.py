@@ -17,7 +17,6 @@ def test_llama_setup():
     
     try:
         from llm_service import llm_service
-        from llm_config import LLMProvider
         
         print("✅ LLM service imported successfully")
         
@@ -26,7 +25,7 @@ def test_llama_setup():
         print(f"📋 Available providers: {[p.value for p in available_providers]}")
         
         # Test each provider
-        for provider in [LLMProvider.OPENAI]:
+        for provider in llm_service.config.get_routing_providers():
             print(f"\n🧪 Testing {provider.value}...")
             print("-" * 30)
             
@@ -126,6 +125,13 @@ def show_setup_instructions():
     print("2. Add to .env file:")
     print("   LLM_PROVIDER=openai")
     print("   OPENAI_API_KEY=your_key_here")
+    
+    print("\n🔧 Option 2: Use LLaMA locally via Ollama")
+    print("-" * 30)
+    print("1. Install Ollama and run: ollama pull llama3.2")
+    print("2. Add to .env file:")
+    print("   LLM_PROVIDERS=ollama,openai")
+    print("   OLLAMA_MODEL=llama3.2")
 
 if __name__ == "__main__":
     print("🚀 LLaMA Integration Test")
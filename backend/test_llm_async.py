@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test the async LLM path: bounded concurrency and cancellation, using a fake
+client in place of AsyncOpenAI (no network access needed)
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from llm_config import LLMProvider
+from llm_service import LLMService
+
+
+class FakeCompletions:
+    """Stands in for AsyncOpenAI().chat.completions"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        message = SimpleNamespace(content="Drink plenty of fluids. [CONFIDENCE: 0.9]")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def make_service(max_concurrency: int, delay: float):
+    service = LLMService()
+    service.config.max_concurrency = max_concurrency
+    completions = FakeCompletions(delay)
+    service._async_openai_clients[LLMProvider.OPENAI] = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return service, completions
+
+
+def test_concurrency_is_bounded():
+    """No more than max_concurrency completions are in flight at once"""
+    print("🧪 Testing bounded LLM concurrency...")
+
+    async def run():
+        service, completions = make_service(max_concurrency=2, delay=0.05)
+        results = await asyncio.gather(*[service._agenerate_openai(f"question {i}") for i in range(6)])
+        return completions, results
+
+    completions, results = asyncio.run(run())
+    assert len(results) == 6
+    assert completions.max_in_flight == 2, completions.max_in_flight
+    assert all(confidence == 0.9 for _, confidence in results)
+    print(f"   ✅ max in flight = {completions.max_in_flight}")
+
+
+def test_cancellation_releases_slot():
+    """Cancelling a waiting request aborts the call and frees its semaphore slot"""
+    print("🧪 Testing LLM call cancellation...")
+
+    async def run():
+        service, completions = make_service(max_concurrency=1, delay=10)
+        task = asyncio.ensure_future(service._agenerate_openai("slow question"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+        completions.delay = 0
+        await asyncio.wait_for(service._agenerate_openai("next question"), timeout=1)
+        return completions
+
+    completions = asyncio.run(run())
+    assert completions.cancelled == 1
+    assert completions.in_flight == 0
+    print("   ✅ Cancelled call aborted and slot released")
+
+
+if __name__ == "__main__":
+    test_concurrency_is_bounded()
+    test_cancellation_releases_slot()
+    print("\n🎉 All async LLM tests passed!")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test hedged LLM requests: a call slower than its provider's p95 is
+duplicated, the first answer wins and the loser is cancelled, and hedges
+stay within the configured share of traffic (fake providers, no network)
+"""
+
+import asyncio
+import time
+
+from llm_config import LLMConfig, LLMProvider
+from llm_service import LLMService
+
+FAST_SECONDS = 0.01
+
+
+class FakeProviders:
+    """Stands in for _agenerate_with_provider: per-provider delays, counting cancellations"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.calls = []
+        self.cancelled = []
+
+    async def __call__(self, provider, query, *args):
+        self.calls.append(provider)
+        try:
+            await asyncio.sleep(self.delays[provider](len(self.calls)))
+        except asyncio.CancelledError:
+            self.cancelled.append(provider)
+            raise
+        return f"{provider.value} answer to {query} [CONFIDENCE: 0.9]", 0.9
+
+
+def make_service(providers: str, budget_percent: float):
+    service = LLMService()
+    service.config = LLMConfig()
+    service.config.providers = providers
+    service.config.hedging_enabled = True
+    service.config.hedge_min_samples = 20
+    service.response_cache.enabled = False
+    service.hedge_budget.ratio = budget_percent / 100
+    # Both providers have answered quickly before, ollama slightly faster
+    for _ in range(20):
+        service.router.record_success(LLMProvider.OLLAMA, FAST_SECONDS)
+        service.router.record_success(LLMProvider.STUB, FAST_SECONDS * 2)
+    return service
+
+
+def test_slow_call_is_hedged():
+    """The hedge to the secondary provider answers first and the slow primary is cancelled"""
+    print("🧪 Testing a hedged slow completion...")
+    service = make_service("ollama,stub", budget_percent=100)
+    fake = FakeProviders({LLMProvider.OLLAMA: lambda n: 5, LLMProvider.STUB: lambda n: FAST_SECONDS})
+    service._agenerate_with_provider = fake
+
+    async def run():
+        started = time.perf_counter()
+        result = await service.agenerate_response_with_confidence("slow question")
+        await asyncio.sleep(0)  # Let the cancelled primary unwind
+        return result, time.perf_counter() - started
+
+    (response, confidence), elapsed = asyncio.run(run())
+    assert response.startswith("stub answer") and confidence == 0.9, response
+    assert elapsed < 1, elapsed
+    assert fake.calls == [LLMProvider.OLLAMA, LLMProvider.STUB]
+    assert fake.cancelled == [LLMProvider.OLLAMA]
+    stats = service.hedge_budget.stats()
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1 and stats["hedge_win_rate"] == 1.0, stats
+    # The cancelled primary still counts as a slow sample, so its p95 does not drift down
+    latencies = list(service.router._get_health(LLMProvider.OLLAMA).latencies)
+    assert len(latencies) == 21 and latencies[-1] >= FAST_SECONDS, latencies
+    print(f"   ✅ answered in {elapsed * 1000:.0f} ms instead of 5 s")
+
+
+def test_fast_call_is_not_hedged():
+    """Calls that finish within the p95 send a single request"""
+    print("🧪 Testing that fast completions are not duplicated...")
+    service = make_service("ollama,stub", budget_percent=100)
+    fake = FakeProviders({LLMProvider.OLLAMA: lambda n: 0, LLMProvider.STUB: lambda n: 0})
+    service._agenerate_with_provider = fake
+
+    asyncio.run(service.agenerate_response_with_confidence("fast question"))
+    assert fake.calls == [LLMProvider.OLLAMA]
+    assert service.hedge_budget.stats()["hedges"] == 0
+    print("   ✅ one request sent")
+
+
+def test_hedges_stay_within_budget():
+    """With every call slow, no more than the budgeted share is hedged"""
+    print("🧪 Testing the hedge budget...")
+    service = make_service("ollama", budget_percent=10)
+    # Every call overshoots a fixed hedge delay; a hedge to the same provider is no faster
+    service._hedge_delay = lambda provider: FAST_SECONDS / 2
+    fake = FakeProviders({LLMProvider.OLLAMA: lambda n: FAST_SECONDS * 2})
+    service._agenerate_with_provider = fake
+
+    async def run():
+        for i in range(50):
+            await service.agenerate_response_with_confidence(f"question {i}")
+
+    asyncio.run(run())
+    stats = service.hedge_budget.stats()
+    assert stats["requests"] == 50 and 1 <= stats["hedges"] <= 5, stats
+    assert stats["hedge_wins"] + stats["primary_wins"] == stats["hedges"]
+    print(f"   ✅ {stats['hedges']} hedges for {stats['requests']} slow calls (rate {stats['hedge_rate']})")
+
+
+if __name__ == "__main__":
+    test_slow_call_is_hedged()
+    test_fast_call_is_not_hedged()
+    test_hedges_stay_within_budget()
+    print("\n🎉 All LLM hedging tests passed!")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test LLM provider routing: latency-aware ordering, circuit breakers and
+failover inside LLMService, using the stub provider (no network access needed)
+"""
+
+import asyncio
+
+from llm_config import LLMConfig, LLMProvider
+from llm_router import CLOSED, HALF_OPEN, OPEN, LLMRouter
+from llm_service import LLMService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_routes_to_fastest_provider():
+    """Unmeasured providers are tried first, then providers are ordered by p50"""
+    print("🧪 Testing latency-aware provider ordering...")
+    router = LLMRouter(window=10)
+    providers = [LLMProvider.OPENAI, LLMProvider.OLLAMA]
+    assert router.route(providers) == providers
+
+    for latency in (0.9, 1.1, 1.0):
+        router.record_success(LLMProvider.OPENAI, latency)
+    assert router.route(providers) == [LLMProvider.OLLAMA, LLMProvider.OPENAI], "unmeasured provider goes first"
+
+    for latency in (0.2, 0.3, 5.0):
+        router.record_success(LLMProvider.OLLAMA, latency)
+    assert router.route(providers) == [LLMProvider.OLLAMA, LLMProvider.OPENAI]
+    stats = router.stats()["ollama"]
+    assert stats["p50_ms"] == 300.0 and stats["p95_ms"] > 4000, stats
+    print(f"   ✅ ollama p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms")
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Consecutive failures open the breaker; one trial after the cooldown closes it again"""
+    print("🧪 Testing the circuit breaker...")
+    clock = FakeClock()
+    router = LLMRouter(failure_threshold=3, cooldown_seconds=30, clock=clock)
+    provider = LLMProvider.OLLAMA
+
+    for _ in range(3):
+        assert router.acquire(provider)
+        router.record_failure(provider)
+    assert router.stats()["ollama"]["state"] == OPEN
+    assert router.route([provider]) == [] and not router.acquire(provider)
+
+    clock.now = 31
+    assert router.route([provider]) == [provider]
+    assert router.acquire(provider), "one trial request after the cooldown"
+    assert router.stats()["ollama"]["state"] == HALF_OPEN
+    assert not router.acquire(provider), "only one trial at a time"
+    router.record_failure(provider)
+    assert router.stats()["ollama"]["state"] == OPEN, "a failed trial reopens the breaker"
+
+    clock.now = 62
+    assert router.acquire(provider)
+    router.record_success(provider, 0.1)
+    stats = router.stats()["ollama"]
+    assert stats["state"] == CLOSED and stats["error_rate"] == 0.8, stats
+    print(f"   ✅ breaker closed again, error rate {stats['error_rate']}")
+
+
+def make_service(providers: str):
+    service = LLMService()
+    service.config = LLMConfig()
+    service.config.providers = providers
+    service.response_cache.enabled = False
+    return service
+
+
+def test_service_skips_dead_provider():
+    """Once a provider's breaker is open, requests go straight to the next provider"""
+    print("🧪 Testing LLMService failover with a dead provider...")
+    service = make_service("ollama,stub")
+    calls = []
+
+    def dead_ollama(*args, **kwargs):
+        calls.append(args[0])
+        raise ConnectionError("connection refused")
+
+    service._generate_openai = dead_ollama
+    for i in range(5):
+        response, confidence = service.generate_response_with_confidence(f"question {i}")
+        assert "stub provider" in response and confidence == 0.8, response
+
+    assert len(calls) == service.config.breaker_failure_threshold, calls
+    stats = service.router.stats()
+    assert stats["ollama"]["state"] == OPEN and stats["ollama"]["rejected"] >= 2, stats
+    assert stats["stub"]["calls"] == 5
+    print(f"   ✅ ollama called {len(calls)} times for 5 requests, then skipped")
+
+
+def test_async_and_stream_use_router():
+    """The async and streaming paths record outcomes on the same router"""
+    print("🧪 Testing async and streaming routing...")
+    service = make_service("stub")
+
+    async def run():
+        response, confidence = await service.agenerate_response_with_confidence("async question")
+        deltas = [delta async for delta in service.astream_response("stream question")]
+        return response, confidence, "".join(deltas)
+
+    response, confidence, streamed = asyncio.run(run())
+    assert confidence == 0.8 and "[CONFIDENCE: 0.8]" in streamed
+    assert service.router.stats()["stub"]["calls"] == 2
+    print("   ✅ both requests routed to the stub provider")
+
+
+if __name__ == "__main__":
+    test_routes_to_fastest_provider()
+    test_circuit_breaker_opens_and_recovers()
+    test_service_skips_dead_provider()
+    test_async_and_stream_use_router()
+    print("\n🎉 All LLM router tests passed!")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test the stub LLM provider (latency distributions, token streams and
+confidence markers) and the load-test harness, against a fake server
+"""
+
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+from llm_config import LLMConfig, LLMProvider
+from llm_service import LLMService
+from chat_load_harness import RequestFactory, parse_mix, run_load_test
+from mock_llm import MockLLM, parse_latency
+
+
+def test_latency_distributions():
+    """Each distribution is repeatable for a seed and centred where configured"""
+    print("🧪 Testing mock latency distributions...")
+    for spec, expected_median_ms in [("fixed:200", 200), ("uniform:100:300", 200),
+                                     ("normal:200:20", 200), ("lognormal:200:0.5", 200)]:
+        first = MockLLM("ok", latency=spec, seed=7).sample_latency()
+        mock = MockLLM("ok", latency=spec, seed=7)
+        samples = [mock.sample_latency() * 1000 for _ in range(2000)]
+        assert abs(np.median(samples) - expected_median_ms) < 15, (spec, np.median(samples))
+        assert first * 1000 == samples[0], "same seed, same latencies"
+        print(f"   ✅ {spec:<18} median {np.median(samples):6.1f} ms, p99 {np.percentile(samples, 99):6.1f} ms")
+
+    try:
+        parse_latency("gamma:1:2")
+        assert False, "unknown distributions are rejected"
+    except ValueError:
+        pass
+
+
+def test_tokens_and_confidence():
+    """Streams join back into the full answer; confidence comes from the configured range"""
+    print("🧪 Testing mock token streams and confidence markers...")
+    mock = MockLLM("Rest and drink fluids.", confidence="0.4:0.6", token_delay_ms=5, seed=1)
+
+    async def stream():
+        started = time.perf_counter()
+        tokens = [token async for token in mock.astream()]
+        return tokens, time.perf_counter() - started
+
+    tokens, elapsed = asyncio.run(stream())
+    text = "".join(tokens)
+    assert text.startswith("Rest and drink fluids. [CONFIDENCE: ") and len(tokens) == 6, tokens
+    assert 0.4 <= float(text.split("CONFIDENCE: ")[1].rstrip("]")) <= 0.6
+    assert elapsed >= 0.025, elapsed
+    assert MockLLM("No marker", confidence="").text() == "No marker"
+    print(f"   ✅ {len(tokens)} tokens in {elapsed * 1000:.0f} ms")
+
+
+def test_stub_selected_by_llm_provider():
+    """LLM_PROVIDER=stub routes only to the stub, so no request reaches OpenAI"""
+    print("🧪 Testing LLM_PROVIDER=stub...")
+    config = LLMConfig()
+    config.provider = "stub"
+    config.providers = ""
+    assert config.get_routing_providers() == [LLMProvider.STUB]
+
+    service = LLMService()
+    service.config = config
+    service.response_cache.enabled = False
+    config.configs[LLMProvider.STUB].update(latency="fixed:30", confidence="0.7")
+    started = time.perf_counter()
+    response, confidence = asyncio.run(service.agenerate_response_with_confidence("I have a headache"))
+    assert confidence == 0.7 and time.perf_counter() - started >= 0.03
+    assert set(service.router.stats()) == {"stub"}
+    print(f"   ✅ answered by the stub with confidence {confidence}")
+
+
+def test_load_test_harness():
+    """The harness offers the target rate and reports per-scenario percentiles"""
+    print("🧪 Testing the load-test harness against a fake server...")
+
+    async def fake_server(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/chat":
+            await asyncio.sleep(0.02)
+            return httpx.Response(200, json={"response": "ok"})
+        if request.url.path == "/appointments/book":
+            return httpx.Response(409, json={"detail": "slot taken"})
+        return httpx.Response(200, json={"available_slots": []})
+
+    async def run():
+        transport = httpx.MockTransport(fake_server)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await run_load_test(client, rps=200, duration=1, mix=parse_mix("chat=2,slots=1,book=1"),
+                                       factory=RequestFactory([1, 2], range(1, 10)))
+
+    report = asyncio.run(run())
+    total = report["total"]
+    assert total["requests"] == 200 and total["errors"] == 0, total
+    assert total["throughput_rps"] > 150, total
+    assert report["book"]["rejected"] == report["book"]["requests"] > 0
+    assert report["chat"]["p50_ms"] >= 20 > report["slots"]["p50_ms"], report
+    print(f"   ✅ {total['throughput_rps']:.0f} requests/s, chat p95 {report['chat']['p95_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    test_latency_distributions()
+    test_tokens_and_confidence()
+    test_stub_selected_by_llm_provider()
+    test_load_test_harness()
+    print("\n🎉 All mock LLM and load-test tests passed!")
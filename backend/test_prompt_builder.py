@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test the token-budgeted prompt builder: compact context rendering,
+rank-ordered chunk fitting with truncation, and token savings reporting
+"""
+
+import prompt_builder
+from prompt_builder import PromptBuilder, TokenCounter, render_context
+from text_config import ContextLabels
+
+PATIENT = {
+    "id": 7, "name": "Asha Rao", "age": 42, "gender": "F", "diagnosis": "Type 2 diabetes",
+    "medications": None, "lab_results": "", "last_visit": "2024-05-02T10:00:00"
+}
+
+
+def chunk(title, sentences, score):
+    content = " ".join(f"{title} guidance sentence {i} about diet, exercise and follow up visits." for i in range(sentences))
+    return {"content": content, "metadata": {"title": title}, "score": score}
+
+
+def test_compact_context_rendering():
+    """Context is rendered as field lines without empty values or dict syntax"""
+    print("🧪 Testing compact context rendering...")
+    text = render_context(PATIENT)
+    assert "name: Asha Rao" in text and "last visit: 2024-05-02T10:00:00" in text
+    assert "medications" not in text and "lab results" not in text
+    assert "{" not in text and "'" not in text
+    assert render_context(None) == ""
+    print(f"   ✅ {len(text)} characters instead of {len(str(PATIENT))}")
+
+
+def test_chunks_fit_budget_by_rank():
+    """Top-ranked chunks are kept whole, the next one truncated, the rest dropped"""
+    print("🧪 Testing rank-ordered chunk fitting...")
+    builder = PromptBuilder(context_budget_tokens=400, min_chunk_tokens=20)
+    docs = [chunk("Diabetes", 6, 0.9), chunk("Exercise", 6, 0.8), chunk("Sleep", 12, 0.7), chunk("Parking", 12, 0.2)]
+    messages = builder.build("What should I eat?", PATIENT, None, docs)
+
+    user = messages[1]["content"]
+    context = user.split(f"{ContextLabels.USER_QUERY}:")[0]
+    assert builder.counter.count(context) <= 400 + 10, builder.counter.count(context)
+    assert "Diabetes guidance sentence 5" in user and "Exercise guidance sentence 5" in user
+    assert "Sleep guidance sentence 0" in user and "Sleep guidance sentence 11" not in user and "…" in user
+    assert "Parking" not in user
+    last = builder.stats()["last_request"]
+    assert (last["chunks_included"], last["chunks_truncated"], last["chunks_dropped"]) == (2, 1, 1), last
+    print(f"   ✅ {last['prompt_tokens']} prompt tokens, unbounded {last['unbounded_prompt_tokens']}")
+
+
+def test_savings_are_reported():
+    """stats() accumulates prompt tokens against the unbounded prompt"""
+    print("🧪 Testing prompt token reporting...")
+    builder = PromptBuilder(context_budget_tokens=200)
+    docs = [chunk("Fever", 30, 0.9), chunk("Cough", 30, 0.8)]
+    for query in ("I have a fever", "I have a cough"):
+        builder.build(query, PATIENT, {"id": 3, "name": "Dr. Mehta", "specialization": "General Medicine"}, docs)
+    builder.build("Hello", None, None, None)
+
+    stats = builder.stats()
+    assert stats["requests"] == 3
+    assert stats["tokens_saved"] > 0 and stats["savings_percent"] > 50, stats
+    assert stats["unbounded_prompt_tokens"] - stats["prompt_tokens"] == stats["tokens_saved"]
+    assert stats["last_request"]["chunks_included"] == 0
+    print(f"   ✅ {stats['savings_percent']}% fewer tokens ({stats['tokenizer']} token counts)")
+
+
+def test_history_keeps_recent_turns():
+    """Conversation history is rendered oldest first within its own budget, newest turns kept"""
+    print("🧪 Testing conversation history budget...")
+    builder = PromptBuilder(history_budget_tokens=60)
+    history = [{"user": f"Question {i} about my knee pain and swelling?",
+                "assistant": f"Answer {i}: rest, ice and keep the leg raised."} for i in range(6)]
+    user = builder.build("Should I see a doctor?", None, None, None, history)[1]["content"]
+
+    assert f"{ContextLabels.CONVERSATION_HISTORY}:" in user
+    assert "Question 5" in user and "Question 0" not in user
+    assert user.index("Question 4") < user.index("Question 5")
+    turns = builder.stats()["last_request"]["history_turns"]
+    assert 0 < turns < 6, turns
+    print(f"   ✅ {turns} of {len(history)} turns kept")
+
+
+def test_offline_tiktoken_falls_back_to_estimate():
+    """A tokenizer that cannot be downloaded leaves builders usable with estimated counts"""
+    print("🧪 Testing token counting without the tiktoken encoding file...")
+
+    class OfflineTiktoken:
+        @staticmethod
+        def encoding_for_model(model):
+            raise ConnectionError("no network")
+
+    original = prompt_builder.tiktoken
+    prompt_builder.tiktoken = OfflineTiktoken
+    try:
+        counter = TokenCounter()
+        assert counter.count("twelve chars") == 3 and not counter.exact
+        assert PromptBuilder().build("Hello")[1]["content"].endswith("Hello")
+    finally:
+        prompt_builder.tiktoken = original
+    print("   ✅ Token counts estimated from text length")
+
+
+if __name__ == "__main__":
+    test_compact_context_rendering()
+    test_chunks_fit_budget_by_rank()
+    test_savings_are_reported()
+    test_history_keeps_recent_turns()
+    test_offline_tiktoken_falls_back_to_estimate()
+    print("\n🎉 All prompt builder tests passed!")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Query plan regression tests: every hot endpoint query must be answered from
+an index, never a full table scan.
+
+The queries are run against a fresh SQLite database and the SQL they emit is
+checked with EXPLAIN QUERY PLAN. Set TEST_POSTGRES_URL to a scratch Postgres
+database to run the same check with EXPLAIN there as well.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+
+import migrate_indexes
+from appointment_booking import find_active_slot_appointment, find_same_day_appointment
+from models import (
+    Appointment, Base, CallbackRequest, Doctor, DoctorTimeSlots, HealthPackageBooking, Patient, Questionnaire
+)
+from slot_availability import get_booked_datetimes, get_weekly_time_slots
+from slot_calendar import SlotCalendar
+
+SLOT_DATETIME = datetime(2030, 1, 7, 10, 0)
+SLOT_DAY = SLOT_DATETIME.date()
+
+
+def _calendar():
+    calendar = SlotCalendar(enabled=True)
+    calendar._built_through = calendar.today() + timedelta(days=calendar.horizon_days)
+    return calendar
+
+
+def _calendar_days():
+    today = _calendar().today()
+    return [today + timedelta(days=offset) for offset in range(7)]
+
+
+# (name, callable) pairs mirroring the queries behind each hot endpoint
+HOT_QUERIES = [
+    ("GET /questionnaires", lambda db: db.query(Questionnaire).filter(
+        Questionnaire.is_active == True
+    ).order_by(Questionnaire.priority.asc()).offset(0).limit(100).all()),
+    ("GET /questionnaires?category", lambda db: db.query(Questionnaire).filter(
+        Questionnaire.is_active == True, Questionnaire.category == "symptoms"
+    ).order_by(Questionnaire.priority.asc()).offset(0).limit(100).all()),
+    ("GET /doctors/speciality/{id}", lambda db: db.query(Doctor).filter(
+        Doctor.speciality_id == 1, Doctor.is_available == True
+    ).all()),
+    ("GET /doctors/{id}/time-slots", lambda db: db.query(DoctorTimeSlots).filter(
+        DoctorTimeSlots.doctor_id == 1, DoctorTimeSlots.is_available == True
+    ).all()),
+    ("availability: weekly rules", lambda db: get_weekly_time_slots(db, [1, 2], [0, 1, 2])),
+    ("availability: booked appointments", lambda db: get_booked_datetimes(
+        db, [1, 2], SLOT_DAY, SLOT_DAY + timedelta(days=6)
+    )),
+    ("POST /appointments/book: slot check", lambda db: find_active_slot_appointment(db, 1, SLOT_DATETIME)),
+    ("POST /appointments/book: same-day check", lambda db: find_same_day_appointment(
+        db, Patient(first_name="Asha", last_name="Rao", phone="9000000000"), 1, SLOT_DAY
+    )),
+    ("POST /patients: duplicate check", lambda db: db.query(Patient).filter(
+        Patient.first_name == "Asha", Patient.last_name == "Rao", Patient.phone == "9000000000"
+    ).first()),
+    ("GET /patients/{id}/appointments", lambda db: db.query(Appointment).filter(
+        Appointment.patient_id == 1
+    ).all()),
+    ("GET /health-packages/bookings?status", lambda db: db.query(HealthPackageBooking).filter(
+        HealthPackageBooking.status == "confirmed"
+    ).offset(0).limit(100).all()),
+    ("GET /callback-requests?status", lambda db: db.query(CallbackRequest).filter(
+        CallbackRequest.status == "pending"
+    ).order_by(CallbackRequest.created_at.desc()).all()),
+    ("slot calendar: doctor availability", lambda db: _calendar().get_doctor_availability(
+        db, Doctor(id=1, name="Dr. Plan"), _calendar_days()
+    )),
+    ("slot calendar: free slots", lambda db: list(_calendar().iter_free_slots(
+        db, [1, 2], _calendar_days()[0], _calendar_days()[-1]
+    ))),
+]
+
+
+def capture_queries(engine):
+    """Run every hot query against engine and return [(name, statement, parameters)]"""
+    captured = []
+    current = {"name": None}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current["name"] and statement.lstrip().upper().startswith("SELECT"):
+            captured.append((current["name"], statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    db = sessionmaker(bind=engine)()
+    try:
+        for name, run in HOT_QUERIES:
+            current["name"] = name
+            run(db)
+    finally:
+        current["name"] = None
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        db.close()
+    return captured
+
+
+def find_sqlite_full_scans(engine, captured):
+    """EXPLAIN QUERY PLAN lines that scan a whole table or index"""
+    failures = []
+    with engine.connect() as conn:
+        for name, statement, parameters in captured:
+            plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+            for row in plan:
+                detail = row[-1]
+                print(f"   {name}: {detail}")
+                if detail.startswith("SCAN") and "CONSTANT ROW" not in detail:
+                    failures.append(f"{name}: {detail}")
+    return failures
+
+
+def find_postgres_full_scans(engine, captured):
+    """EXPLAIN lines with a sequential scan when the planner is told to avoid them"""
+    failures = []
+    with engine.connect() as conn:
+        # Tiny test tables always favour a seq scan; this only leaves one when no index applies
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        for name, statement, parameters in captured:
+            plan = conn.exec_driver_sql("EXPLAIN " + statement, parameters).fetchall()
+            for (line,) in plan:
+                if "Seq Scan" in line:
+                    failures.append(f"{name}: {line.strip()}")
+    return failures
+
+
+def test_sqlite_query_plans_use_indexes():
+    """Every hot query is an index search on SQLite"""
+    print("🧪 Checking SQLite query plans...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    captured = capture_queries(engine)
+    assert {name for name, _, _ in captured} == {name for name, _ in HOT_QUERIES}
+
+    failures = find_sqlite_full_scans(engine, captured)
+    assert not failures, "Full scans found:\n" + "\n".join(failures)
+    print(f"   ✅ {len(captured)} queries use indexes")
+
+
+def test_migration_drops_superseded_index():
+    """Upgrading a database with the old doctor/date index leaves only its replacement"""
+    print("🧪 Checking the index migration...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_appointments_doctor_date_status")
+        conn.exec_driver_sql("CREATE INDEX ix_appointments_doctor_date ON appointments (doctor_id, date)")
+
+    assert migrate_indexes.migrate_database(engine)
+    names = {index["name"] for index in inspect(engine).get_indexes("appointments")}
+    assert "ix_appointments_doctor_date" not in names, names
+    assert "ix_appointments_doctor_date_status" in names, names
+    print("   ✅ ix_appointments_doctor_date dropped")
+
+
+def test_postgres_query_plans_use_indexes():
+    """Same check on Postgres when TEST_POSTGRES_URL points at a scratch database"""
+    postgres_url = os.getenv("TEST_POSTGRES_URL")
+    if not postgres_url:
+        print("⏭️  TEST_POSTGRES_URL not set, skipping Postgres query plans")
+        return
+
+    print("🧪 Checking Postgres query plans...")
+    engine = create_engine(postgres_url)
+    Base.metadata.create_all(engine)
+
+    captured = capture_queries(engine)
+    failures = find_postgres_full_scans(engine, captured)
+    assert not failures, "Sequential scans found:\n" + "\n".join(failures)
+    print(f"   ✅ {len(captured)} queries use indexes")
+
+
+if __name__ == "__main__":
+    test_sqlite_query_plans_use_indexes()
+    test_migration_drops_superseded_index()
+    test_postgres_query_plans_use_indexes()
+    print("\n🎉 All query plan tests passed!")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test that the compiled questionnaire matcher picks the same winner as the
+original per-request keyword loop
+"""
+
+import time
+
+from comprehensive_questionnaires import COMPREHENSIVE_QUESTIONNAIRES
+from questionnaire_index import QuestionnaireEntry, QuestionnaireSnapshot, split_keywords
+
+TEST_QUERIES = [
+    "Hello",
+    "hi there, I need help",
+    "I have a headache since yesterday",
+    "my chest pain is 8/10",
+    "I need an appointment with a cardiologist",
+    "how much does the full body checkup cost?",
+    "my baby has a fever of 101 degrees",
+    "can you call me back",
+    "where is the hospital located",
+    "I feel stressed and anxious",
+    "side effects of my medication",
+    "blood sugar is high after the accident",
+    "nothing relevant here",
+    "",
+]
+
+
+def build_entries():
+    """Build entries in the same (priority, id) order the index loads them"""
+    entries = [
+        QuestionnaireEntry(
+            id=i + 1,
+            trigger_keywords=q["trigger_keywords"],
+            question=q["question"],
+            response_template=q["response_template"],
+            category=q["category"],
+            priority=q["priority"],
+            keywords=tuple(split_keywords(q["trigger_keywords"]))
+        )
+        for i, q in enumerate(COMPREHENSIVE_QUESTIONNAIRES)
+    ]
+    return sorted(entries, key=lambda entry: (entry.priority, entry.id))
+
+
+def legacy_match(entries, query):
+    """The original nested substring loop from find_matching_questionnaire"""
+    query_lower = query.lower()
+    for entry in entries:
+        keywords = [kw.strip().lower() for kw in entry.trigger_keywords.split(',')]
+        for keyword in keywords:
+            if keyword in query_lower:
+                return entry
+    return None
+
+
+def test_matcher_matches_legacy_loop():
+    """Compiled matcher returns the same questionnaire as the legacy loop"""
+    print("🧪 Testing compiled questionnaire matcher...")
+    entries = build_entries()
+    snapshot = QuestionnaireSnapshot(version=0, entries=entries)
+
+    for query in TEST_QUERIES:
+        expected = legacy_match(entries, query)
+        actual = snapshot.find_match(query)
+        assert (expected and expected.id) == (actual and actual.id), (
+            f"Mismatch for '{query}': expected {expected and expected.id}, got {actual and actual.id}"
+        )
+        print(f"   ✅ '{query}' -> {actual.id if actual else None}")
+
+
+def test_keyword_index_matches_legacy_queries():
+    """Greeting and health keyword sets match the per-request database queries"""
+    print("🧪 Testing category keyword index...")
+    entries = build_entries()
+    snapshot = QuestionnaireSnapshot(version=0, entries=entries)
+
+    legacy_greetings = set()
+    legacy_health = set()
+    for entry in entries:
+        keywords = [kw.strip().lower() for kw in entry.trigger_keywords.split(',')]
+        if entry.category == "general" and any(g in entry.trigger_keywords for g in ["hello", "hi", "hey"]):
+            legacy_greetings.update(keywords)
+        if entry.category in ["symptoms", "appointment", "emergency", "medication"]:
+            legacy_health.update(keywords)
+
+    assert snapshot.greeting_keywords == legacy_greetings
+    assert snapshot.health_keywords == legacy_health
+
+    for query in TEST_QUERIES:
+        query_lower = query.lower()
+        assert snapshot.is_greeting(query_lower) == any(g in query_lower for g in legacy_greetings)
+        assert snapshot.mentions_health_topic(query_lower) == any(k in query_lower for k in legacy_health)
+    print(f"   ✅ {len(legacy_greetings)} greeting and {len(legacy_health)} health keywords")
+
+
+def benchmark_matcher(iterations: int = 2000):
+    """Compare legacy loop and compiled matcher timings"""
+    entries = build_entries()
+    snapshot = QuestionnaireSnapshot(version=0, entries=entries)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for query in TEST_QUERIES:
+            legacy_match(entries, query)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for query in TEST_QUERIES:
+            snapshot.find_match(query)
+    compiled_time = time.perf_counter() - start
+
+    print(f"📊 Legacy loop:      {legacy_time * 1000:.1f} ms")
+    print(f"📊 Compiled matcher: {compiled_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    test_matcher_matches_legacy_loop()
+    test_keyword_index_matches_legacy_queries()
+    benchmark_matcher()
+    print("\n🎉 Questionnaire matcher test completed!")
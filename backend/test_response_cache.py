@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test the chat response cache: normalization, context keys, TTL, LRU and
+memory eviction, the similarity tier and invalidation on knowledge changes
+"""
+
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from llm_service import LLMService
+from models import Base, Document, Questionnaire
+from response_cache import ResponseCache, register_cache
+
+PATIENT = {"name": "Test Patient", "age": 40}
+
+
+def test_normalized_query_hits():
+    """Case, spacing and trailing punctuation do not defeat the cache"""
+    print("🧪 Testing exact-match tier...")
+    cache = ResponseCache()
+    cache.put("What are your visiting hours?", "9 AM to 8 PM. [CONFIDENCE: 0.9]", 0.9, PATIENT)
+
+    assert cache.get("  what are your   VISITING hours ", PATIENT) == ("9 AM to 8 PM. [CONFIDENCE: 0.9]", 0.9)
+    assert cache.get("What are your visiting hours?", {"name": "Other Patient"}) is None
+    assert cache.get("What are your visiting hours?") is None
+
+    stats = cache.stats()
+    assert stats["exact_hits"] == 1 and stats["misses"] == 2
+    print(f"   ✅ hits={stats['exact_hits']} misses={stats['misses']}")
+
+
+def test_ttl_expiry():
+    """Entries older than the TTL are dropped on lookup"""
+    print("🧪 Testing TTL expiry...")
+    cache = ResponseCache(ttl_seconds=0.05)
+    cache.put("Do you accept insurance?", "Yes.", 0.8)
+    assert cache.get("Do you accept insurance?") is not None
+    time.sleep(0.1)
+    assert cache.get("Do you accept insurance?") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+    print("   ✅ Expired entry removed")
+
+
+def test_lru_and_memory_cap():
+    """Least recently used entries go first when either cap is exceeded"""
+    print("🧪 Testing LRU and memory eviction...")
+    cache = ResponseCache(max_entries=2)
+    cache.put("question one", "answer one", 0.9)
+    cache.put("question two", "answer two", 0.9)
+    cache.get("question one")
+    cache.put("question three", "answer three", 0.9)
+    assert cache.get("question two") is None
+    assert cache.get("question one") is not None
+    assert cache.stats()["evictions"] == 1
+
+    cache = ResponseCache(max_bytes=2000)
+    for i in range(10):
+        cache.put(f"question {i}", "x" * 500, 0.9)
+    stats = cache.stats()
+    assert stats["bytes"] <= 2000
+    assert cache.get("question 9") is not None
+    assert cache.get("question 0") is None
+    print(f"   ✅ {stats['entries']} entries kept in {stats['bytes']} bytes")
+
+
+def test_similarity_tier():
+    """Rephrasings above the similarity threshold are served from the cache"""
+    print("🧪 Testing similarity tier...")
+    vectors = {
+        "how do i book an appointment": [1.0, 0.1, 0.0],
+        "how can i book an appointment": [0.98, 0.15, 0.0],
+        "what is the parking fee": [0.0, 0.2, 1.0],
+    }
+    cache = ResponseCache(similarity_threshold=0.95, embed=lambda text: vectors[text])
+    cache.put("How do I book an appointment?", "Use the booking button.", 0.9)
+
+    assert cache.get("How can I book an appointment?") == ("Use the booking button.", 0.9)
+    assert cache.get("What is the parking fee?") is None
+    stats = cache.stats()
+    assert stats["semantic_hits"] == 1 and stats["misses"] == 1
+    print(f"   ✅ semantic hits={stats['semantic_hits']}")
+
+
+def test_llm_service_uses_cache():
+    """A repeated question is answered without another provider call"""
+    print("🧪 Testing LLMService cache integration...")
+    service = LLMService()
+    service.response_cache = ResponseCache()
+    service.config.is_provider_available = lambda provider: True
+    calls = []
+
+    def fake_provider(provider, query, patient_context=None, doctor_context=None, retrieved_docs=None, history=None):
+        calls.append(query)
+        return "Drink plenty of fluids. [CONFIDENCE: 0.9]", 0.9
+    service._generate_with_provider = fake_provider
+
+    first = service.generate_response_with_confidence("I have a cold", PATIENT)
+    second = service.generate_response_with_confidence("i have a cold.", PATIENT)
+    assert first == second
+    assert len(calls) == 1
+    print("   ✅ One provider call for two identical questions")
+
+
+def test_invalidated_on_knowledge_change():
+    """Committing a Questionnaire or Document change clears the cache"""
+    print("🧪 Testing invalidation on questionnaire/document changes...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    cache = register_cache(ResponseCache())
+
+    db = Session()
+    cache.put("What are your visiting hours?", "9 AM to 8 PM.", 0.9)
+    db.add(Questionnaire(trigger_keywords="visiting", question="Visiting hours?",
+                         response_template="10 AM to 6 PM.", category="general"))
+    db.rollback()
+    assert cache.stats()["entries"] == 1
+
+    db.add(Questionnaire(trigger_keywords="visiting", question="Visiting hours?",
+                         response_template="10 AM to 6 PM.", category="general"))
+    db.commit()
+    assert cache.stats()["entries"] == 0
+
+    cache.put("What are your visiting hours?", "10 AM to 6 PM.", 0.9)
+    db.add(Document(title="Visitor policy", content="Visiting hours are 10 AM to 6 PM."))
+    db.commit()
+    assert cache.stats()["entries"] == 0
+    db.close()
+    print(f"   ✅ {cache.stats()['invalidations']} invalidations")
+
+
+if __name__ == "__main__":
+    test_normalized_query_hits()
+    test_ttl_expiry()
+    test_lru_and_memory_cap()
+    test_similarity_tier()
+    test_llm_service_uses_cache()
+    test_invalidated_on_knowledge_change()
+    print("\n🎉 All response cache tests passed!")
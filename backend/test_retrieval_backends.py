@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Conformance and performance suite run against every retrieval backend:
+numpy, memmap, bm25, hybrid and (when chromadb is installed) chroma
+"""
+
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import SessionLocal
+from document_index import DocumentIndex
+from document_ingestion import DocumentIngestion
+from embedding_store import EmbeddingStore
+from lexical_index import BM25Index
+from models import Base, Document
+from retrieval_backends import (
+    ChromaBackend, HybridBackend, LexicalBackend, VectorBackend, chromadb, register_backend
+)
+
+TOPIC_WORDS = ["fever", "diabetes", "visiting", "parking", "vaccination", "pregnancy", "asthma", "cardiac"]
+SEARCH_BUDGET_MS = 50
+
+CORPUS = [
+    ("Fever care", "Treat a fever with fluids and rest."),
+    ("Diabetes diet", "Patients with diabetes should limit sugar."),
+    ("Visiting hours", "Visiting hours are 10 AM to 6 PM."),
+    ("Parking", "Parking is free for patients."),
+    ("Vaccination clinic", "The vaccination clinic runs on Saturdays."),
+]
+
+
+def keyword_embed(texts):
+    """Deterministic stand-in for the embedding API: one dimension per topic word"""
+    return [[1.0 if word in text.lower() else 0.0 for word in TOPIC_WORDS] + [0.1] for text in texts]
+
+
+def vector_backend(session_factory, store=None):
+    index = DocumentIndex(embed=keyword_embed, min_similarity=0.0, store=store)
+    return VectorBackend(index, DocumentIngestion(index, session_factory=session_factory))
+
+
+def backends(session_factory=SessionLocal):
+    """A fresh instance of every backend (name, factory); ingestion jobs read from session_factory"""
+    factories = [
+        ("numpy", lambda: vector_backend(session_factory)),
+        ("memmap", lambda: vector_backend(session_factory, EmbeddingStore(tempfile.mkdtemp(), "keyword-test"))),
+        ("bm25", lambda: LexicalBackend(BM25Index())),
+        ("hybrid", lambda: HybridBackend([vector_backend(session_factory), LexicalBackend(BM25Index())])),
+    ]
+    if chromadb is not None:
+        factories.append(("chroma", lambda: ChromaBackend(embed=keyword_embed, directory=tempfile.mkdtemp())))
+    else:
+        print("   ⚠️ chromadb not installed, skipping the chroma backend")
+    return factories
+
+
+def documents(corpus, first_id=1):
+    return [
+        Document(id=first_id + i, title=title, content=content, document_type="guideline")
+        for i, (title, content) in enumerate(corpus)
+    ]
+
+
+def titles(hits):
+    return [hit["metadata"]["title"] for hit in hits]
+
+
+def test_conformance():
+    """Every backend adds, searches, replaces, removes and clears the same way"""
+    print("🧪 Running the retrieval backend conformance suite...")
+    for name, create in backends():
+        backend = create()
+        assert backend.search("fever") == [], name
+
+        assert backend.add(documents(CORPUS)) == len(CORPUS), name
+        hits = backend.search("my child has a fever", k=3)
+        assert titles(hits)[0] == "Fever care", (name, hits)
+        assert 1 <= len(hits) <= 3, name
+        for hit in hits:
+            assert set(hit["metadata"]) >= {"title", "type", "document_id", "chunk"}, (name, hit)
+            assert isinstance(hit["content"], str) and isinstance(hit["score"], float), (name, hit)
+        assert [hit["score"] for hit in hits] == sorted((hit["score"] for hit in hits), reverse=True), name
+
+        # Re-adding a document replaces it instead of duplicating it
+        backend.add(documents([("Visiting hours", "Visiting hours are now 9 AM to 8 PM.")], first_id=3))
+        visiting = [hit for hit in backend.search("visiting hours", k=5) if hit["metadata"]["document_id"] == 3]
+        assert len(visiting) == 1 and "9 AM" in visiting[0]["content"], (name, visiting)
+
+        backend.remove([1])
+        assert "Fever care" not in titles(backend.search("fever", k=5)), name
+
+        backend.clear()
+        assert backend.search("diabetes") == [], name
+        print(f"   ✅ {name}")
+
+
+def test_sync_with_document_table():
+    """sync indexes Document rows the backend does not have yet"""
+    print("🧪 Testing sync against the Document table...")
+    # One shared connection so the background ingestion thread sees the same in-memory database
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add_all([Document(title=title, content=content, document_type="guideline") for title, content in CORPUS])
+    db.commit()
+
+    for name, create in backends(Session):
+        backend = create()
+        job = backend.sync(db)
+        # Vector backends queue embedding on the background ingestion pipeline
+        deadline = time.time() + 10
+        while job is not None and job.status in ("queued", "running") and time.time() < deadline:
+            time.sleep(0.01)
+        hits = backend.search("when is the vaccination clinic", k=1)
+        assert titles(hits) == ["Vaccination clinic"], (name, hits)
+        print(f"   ✅ {name}")
+    db.close()
+
+
+def test_registered_backends_see_committed_changes():
+    """Row changes reach mark_stale after commit, bulk changes clear, rolled back changes are dropped"""
+    print("🧪 Testing change notifications for registered backends...")
+
+    class RecordingBackend:
+        def __init__(self):
+            self.events = []
+
+        def mark_stale(self, document_ids):
+            self.events.append(sorted(document_ids))
+
+        def clear(self):
+            self.events.append("clear")
+
+    backend = register_backend(RecordingBackend())
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    fever = Document(title="Fever care", content="Fluids and rest.")
+    db.add(fever)
+    db.flush()
+    fever_id = fever.id
+    assert backend.events == [], "nothing is reported before commit"
+    db.commit()
+
+    fever.content = "Fluids, rest and paracetamol."
+    db.commit()
+    db.add(Document(title="Draft", content="Not saved."))
+    db.flush()
+    db.rollback()
+    db.query(Document).filter(Document.title == "Fever care").update({"document_type": "guideline"})
+    db.commit()
+    db.query(Document).delete()
+    db.commit()
+    db.close()
+
+    assert backend.events == [[fever_id], [fever_id], "clear", "clear"], backend.events
+    print("   ✅ insert, update, bulk update and bulk delete reported; rollback dropped")
+
+
+def test_search_performance():
+    """Adding 2000 documents in one batch and searching stay within budget"""
+    print("🧪 Timing batch add and search on every backend...")
+    corpus = [
+        (f"Guideline {i}", f"Guidance on {TOPIC_WORDS[i % len(TOPIC_WORDS)]} number {i} for ward {i % 37}.")
+        for i in range(2000)
+    ]
+    queries = [f"{word} guidance for ward {i}" for i, word in enumerate(TOPIC_WORDS * 10)]
+    for name, create in backends():
+        backend = create()
+        started = time.perf_counter()
+        backend.add(documents(corpus))
+        add_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for query in queries:
+            assert backend.search(query, k=5), (name, query)
+        search_ms = (time.perf_counter() - started) * 1000 / len(queries)
+        assert search_ms < SEARCH_BUDGET_MS, (name, search_ms)
+        print(f"   ✅ {name:<7} add {add_ms:7.1f} ms, search {search_ms:.2f} ms per query")
+
+
+if __name__ == "__main__":
+    test_conformance()
+    test_sync_with_document_table()
+    test_registered_backends_see_committed_changes()
+    test_search_performance()
+    print("\n🎉 All retrieval backend tests passed!")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test the conversation session store: cached lookups without database
+queries, bounded history, write-behind to chat_sessions, and follow-up
+turns that answer the questionnaire question asked before
+"""
+
+import asyncio
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import Base, ChatSession
+from questionnaire_index import QuestionnaireEntry
+from rag_service_enhanced import EnhancedRAGService
+from session_store import SessionStore
+
+PAIN = QuestionnaireEntry(
+    id=4, trigger_keywords="pain", question="Where does it hurt?",
+    response_template="Thanks, rest the painful area and book a visit if it persists.",
+    category="symptoms", priority=1, keywords=("pain",)
+)
+
+
+def make_database():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return sessionmaker(bind=engine), statements
+
+
+def answer(text):
+    return {"response": f"{text} [CONFIDENCE: 0.9]"}
+
+
+def test_cached_turns_skip_database():
+    """After the session is created, turns are served from memory with a bounded history"""
+    print("🧪 Testing cached session lookups...")
+    factory, statements = make_database()
+    store = SessionStore(history_turns=3, flush_interval_seconds=0, session_factory=factory)
+
+    session = store.get_or_create(None, patient_id=7)
+    statements.clear()
+    for turn in range(5):
+        session = store.get_or_create(session.token, patient_id=7)
+        store.record_turn(session, f"question {turn}", answer(f"answer {turn}"))
+
+    assert statements == [], statements
+    history = store.get_or_create(session.token, patient_id=7).history()
+    assert [turn["user"] for turn in history] == ["question 2", "question 3", "question 4"]
+    assert history[-1]["assistant"] == "answer 4"
+    assert store.stats()["hits"] == 6 and store.stats()["pending_writes"] == 1
+    print(f"   ✅ {store.stats()['hits']} lookups, no queries, {len(history)} turns kept")
+
+
+def test_write_behind_and_reload():
+    """flush() writes dirty sessions in one batch; evicted sessions reload from chat_sessions"""
+    print("🧪 Testing write-behind and reload...")
+    factory, statements = make_database()
+    store = SessionStore(max_sessions=1, history_turns=4, flush_interval_seconds=0, session_factory=factory)
+
+    first = store.get_or_create(None)
+    store.record_turn(first, "I have pain", {"response": PAIN.question, "current_question": PAIN.question,
+                                             "questionnaire_id": PAIN.id})
+    second = store.get_or_create(None)
+    store.record_turn(second, "Hello", answer("Hi, how can I help?"))
+
+    assert store.flush() == 2 and store.flush() == 0
+    db = factory()
+    row = db.query(ChatSession).filter(ChatSession.id == first.id).one()
+    db.close()
+    assert row.current_questionnaire_id == PAIN.id and "I have pain" in row.session_data
+
+    statements.clear()
+    reloaded = store.get_or_create(first.token)
+    assert len(statements) == 1 and store.stats()["evictions"] >= 1
+    assert reloaded.current_questionnaire_id == PAIN.id and reloaded.current_question == PAIN.question
+    assert reloaded.history() == first.history()
+    print(f"   ✅ {store.stats()['rows_written']} rows written in {store.stats()['flushes']} flush")
+
+
+def test_follow_up_answers_active_questionnaire():
+    """The next message answers the open question and the LLM sees the earlier turn"""
+    print("🧪 Testing a two-turn questionnaire conversation...")
+    factory, _ = make_database()
+    service = EnhancedRAGService()
+    service.session_store = SessionStore(flush_interval_seconds=0, session_factory=factory)
+    service.get_query_contexts = lambda db, patient_id, doctor_id: (None, None)
+    service.aretrieve_documents = lambda query, db: asyncio.sleep(0, result=[])
+    service.find_matching_questionnaire = lambda query, db: PAIN if "pain" in query else None
+    service.get_active_questionnaire = lambda questionnaire_id, db: PAIN if questionnaire_id == PAIN.id else None
+    service.has_user_response = lambda query, db: False
+    histories = []
+
+    async def unsure_llm(query, patient_context=None, doctor_context=None, retrieved_docs=None, history=None):
+        histories.append(history)
+        return "Not sure", 0.2
+    service.agenerate_openai_response_with_confidence = unsure_llm
+
+    async def conversation():
+        first = await service.aprocess_query_with_fallback("I have pain", None, speculative=False, latency_budget_ms=0)
+        second = await service.aprocess_query_with_fallback(
+            "In my left knee", None, speculative=False, latency_budget_ms=0, session_id=first["session_id"]
+        )
+        return first, second
+
+    first, second = asyncio.run(conversation())
+    assert first["current_question"] == PAIN.question
+    assert second["session_id"] == first["session_id"]
+    assert second["response"] == PAIN.response_template and second["current_question"] is None
+    assert histories[0] == [] and histories[1] == [{"user": "I have pain", "assistant": PAIN.question}]
+    session = service.session_store.lookup(first["session_id"])
+    assert session.current_questionnaire_id is None and len(session.history()) == 2
+    print("   ✅ Follow-up answered from the open questionnaire")
+
+
+def test_other_patient_cannot_continue_session():
+    """A session token sent for another patient starts a new session; the owner's turns never reach the LLM"""
+    print("🧪 Testing session ownership...")
+    factory, _ = make_database()
+    service = EnhancedRAGService()
+    service.session_store = SessionStore(max_sessions=1, flush_interval_seconds=0, session_factory=factory)
+    service.get_query_contexts = lambda db, patient_id, doctor_id: (None, None)
+    service.aretrieve_documents = lambda query, db: asyncio.sleep(0, result=[])
+    histories = []
+
+    async def confident_llm(query, patient_context=None, doctor_context=None, retrieved_docs=None, history=None):
+        histories.append(history)
+        return f"About {query}", 0.9
+    service.agenerate_openai_response_with_confidence = confident_llm
+
+    def ask(query, patient_id, session_id=None):
+        return asyncio.run(service.aprocess_query_with_fallback(
+            query, None, patient_id=patient_id, speculative=False, latency_budget_ms=0, session_id=session_id
+        ))
+
+    alice = ask("My blood test result", patient_id=1)
+    assert len(alice["session_id"]) >= 32 and not alice["session_id"].isdigit()
+
+    cached = ask("What did I ask?", patient_id=2, session_id=alice["session_id"])
+    service.session_store.flush()
+    service.session_store.get_or_create(None, patient_id=3)  # Evicts both, so the next lookup loads from the table
+    loaded = ask("What did I ask?", patient_id=2, session_id=alice["session_id"])
+
+    for result in (cached, loaded):
+        assert result["session_id"] != alice["session_id"]
+    assert histories[1] == [] and histories[2] == [], histories
+    assert service.session_store.stats()["rejected"] == 2
+    owner = ask("And my next step?", patient_id=1, session_id=alice["session_id"])
+    assert owner["session_id"] == alice["session_id"] and histories[3][0]["user"] == "My blood test result"
+    print("   ✅ Patient 2 got new sessions; patient 1 kept theirs")
+
+
+if __name__ == "__main__":
+    test_cached_turns_skip_database()
+    test_write_behind_and_reload()
+    test_follow_up_answers_active_questionnaire()
+    test_other_patient_cannot_continue_session()
+    print("\n🎉 All session store tests passed!")
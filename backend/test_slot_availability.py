@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test batched slot availability against an in-memory database: the doctor
+date-range view (clamping, past slots, Sundays, bookings) and the
+speciality-wide search for the earliest openings
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Appointment, Base, Doctor, DoctorTimeSlots
+from slot_availability import MAX_RANGE_DAYS, find_speciality_openings, get_doctor_availability
+
+MONDAY = date(2030, 1, 7)
+SUNDAY = MONDAY + timedelta(days=6)
+WEDNESDAY_MORNING = datetime(2030, 1, 9, 9, 10)
+
+
+def make_database():
+    """Doctor 1 works 09:00-10:00 in 30 minute slots every day of the week"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Doctor(id=1, name="Dr. Rao", specialization="Cardiology", speciality_id=1))
+    db.add_all([DoctorTimeSlots(doctor_id=1, day_of_week=day, start_time=time(9, 0), end_time=time(10, 0))
+                for day in range(7)])
+    db.commit()
+    return db
+
+
+def make_speciality_database():
+    """Speciality 1: doctors 1 (09:00, 09:30) and 2 (09:15, 09:45) daily; doctor 3 unavailable; doctor 4 elsewhere"""
+    db = make_database()
+    db.add_all([
+        Doctor(id=2, name="Dr. Mehta", specialization="Cardiology", speciality_id=1),
+        Doctor(id=3, name="Dr. Away", specialization="Cardiology", speciality_id=1, is_available=False),
+        Doctor(id=4, name="Dr. Skin", specialization="Dermatology", speciality_id=2),
+    ])
+    for day in range(7):
+        db.add_all([
+            DoctorTimeSlots(doctor_id=2, day_of_week=day, start_time=time(9, 15), end_time=time(10, 15)),
+            DoctorTimeSlots(doctor_id=2, day_of_week=day, start_time=time(8, 0), end_time=time(9, 0),
+                            is_available=False),
+            DoctorTimeSlots(doctor_id=3, day_of_week=day, start_time=time(7, 0), end_time=time(8, 0)),
+            DoctorTimeSlots(doctor_id=4, day_of_week=day, start_time=time(7, 0), end_time=time(8, 0)),
+        ])
+    db.commit()
+    return db
+
+
+def opening_keys(openings):
+    return [(opening["date"][5:], opening["time"], opening["doctor_id"]) for opening in openings]
+
+
+def slot_times(day):
+    return [slot["time"] for slot in day["available_slots"] if slot["is_available"]]
+
+
+def test_range_is_clamped_to_today():
+    """Days before today are dropped from the range; range limits still apply"""
+    print("🧪 Testing date range clamping...")
+    db = make_database()
+    doctor = db.get(Doctor, 1)
+
+    week = get_doctor_availability(db, doctor, MONDAY, SUNDAY, now=WEDNESDAY_MORNING)
+    assert [day["date"] for day in week] == ["2030-01-09", "2030-01-10", "2030-01-11", "2030-01-12", "2030-01-13"]
+    assert get_doctor_availability(db, doctor, MONDAY, MONDAY + timedelta(days=1), now=WEDNESDAY_MORNING) == []
+    assert len(get_doctor_availability(db, doctor, MONDAY, SUNDAY)) == 7
+
+    for start_date, end_date in ((MONDAY, MONDAY + timedelta(days=MAX_RANGE_DAYS)), (SUNDAY, MONDAY)):
+        try:
+            get_doctor_availability(db, doctor, start_date, end_date, now=WEDNESDAY_MORNING)
+            raise AssertionError(f"Range {start_date}..{end_date} was accepted")
+        except ValueError:
+            pass
+    db.close()
+    print("   ✅ Range starts today; over-long and reversed ranges rejected")
+
+
+def test_past_slots_and_sundays_are_skipped():
+    """Slots that already started today and every Sunday slot are left out"""
+    print("🧪 Testing past slot and Sunday skipping...")
+    db = make_database()
+    doctor = db.get(Doctor, 1)
+
+    week = {day["date"]: day for day in get_doctor_availability(db, doctor, MONDAY, SUNDAY, now=WEDNESDAY_MORNING)}
+    assert slot_times(week["2030-01-09"]) == ["09:30"]
+    assert slot_times(week["2030-01-10"]) == ["09:00", "09:30"]
+    assert week["2030-01-13"]["available_slots"] == []
+    # Without now (the single-date endpoints) the rules are listed as they are
+    assert slot_times(get_doctor_availability(db, doctor, SUNDAY, SUNDAY)[0]) == ["09:00", "09:30"]
+    db.close()
+    print("   ✅ Only bookable slots listed")
+
+
+def test_booked_slots_are_not_offered():
+    """Active appointments mark their slot unavailable; cancelled ones free it again"""
+    print("🧪 Testing booked slot exclusion...")
+    db = make_database()
+    thursday = MONDAY + timedelta(days=3)
+    db.add_all([
+        Appointment(patient_id=1, doctor_id=1, date=datetime.combine(thursday, time(9, 0)), status="scheduled"),
+        Appointment(patient_id=2, doctor_id=1, date=datetime.combine(thursday, time(9, 30)), status="cancelled"),
+    ])
+    db.commit()
+
+    days = get_doctor_availability(db, db.get(Doctor, 1), thursday, thursday + timedelta(days=1),
+                                   now=WEDNESDAY_MORNING)
+    assert [(slot["time"], slot["is_available"]) for slot in days[0]["available_slots"]] == \
+        [("09:00", False), ("09:30", True)]
+    assert slot_times(days[1]) == ["09:00", "09:30"]
+    db.close()
+    print("   ✅ Booked slot unavailable, cancelled slot offered")
+
+
+def test_openings_ordered_across_doctors():
+    """Openings of every doctor are merged in time order, day by day"""
+    print("🧪 Testing speciality opening order...")
+    db = make_speciality_database()
+    openings = find_speciality_openings(db, 1, MONDAY, SUNDAY, limit=6, now=datetime.combine(MONDAY, time(8, 0)))
+    assert opening_keys(openings) == [
+        ("01-07", "09:00", 1), ("01-07", "09:15", 2), ("01-07", "09:30", 1), ("01-07", "09:45", 2),
+        ("01-08", "09:00", 1), ("01-08", "09:15", 2),
+    ], opening_keys(openings)
+    assert openings[0]["doctor_name"] == "Dr. Rao" and openings[1]["doctor_name"] == "Dr. Mehta"
+    db.close()
+    print("   ✅ Both doctors interleaved by start time")
+
+
+def test_openings_stop_at_limit():
+    """The search returns at most limit openings, and everything left when fewer exist"""
+    print("🧪 Testing the speciality opening limit...")
+    db = make_speciality_database()
+    assert len(find_speciality_openings(db, 1, MONDAY, SUNDAY, limit=3)) == 3
+    everything = find_speciality_openings(db, 1, MONDAY, SUNDAY, limit=100)
+    assert len(everything) == 6 * 4, len(everything)  # Monday to Saturday, Sunday is closed
+    assert "01-13" not in {key[0] for key in opening_keys(everything)}
+    later = find_speciality_openings(db, 1, MONDAY, SUNDAY, limit=2, window_start=time(9, 30),
+                                     now=datetime.combine(SUNDAY - timedelta(days=1), time(9, 0)))
+    assert opening_keys(later) == [("01-12", "09:30", 1), ("01-12", "09:45", 2)], opening_keys(later)
+    db.close()
+    print(f"   ✅ limit respected, {len(everything)} openings in the week")
+
+
+def test_inactive_doctors_and_rules_excluded():
+    """Unavailable doctors, disabled rules, other specialities and booked slots are never offered"""
+    print("🧪 Testing speciality opening exclusions...")
+    db = make_speciality_database()
+    db.add(Appointment(patient_id=1, doctor_id=1, date=datetime.combine(MONDAY, time(9, 0)), status="scheduled"))
+    db.commit()
+
+    openings = find_speciality_openings(db, 1, MONDAY, SUNDAY, limit=100)
+    assert {opening["doctor_id"] for opening in openings} == {1, 2}
+    assert not {"07:00", "07:30", "08:00", "08:30"} & {opening["time"] for opening in openings}
+    assert ("01-07", "09:00", 1) not in opening_keys(openings)
+    assert find_speciality_openings(db, 2, MONDAY, MONDAY)[0]["doctor_id"] == 4
+    db.close()
+    print("   ✅ Only active doctors' free slots offered")
+
+
+if __name__ == "__main__":
+    test_range_is_clamped_to_today()
+    test_past_slots_and_sundays_are_skipped()
+    test_booked_slots_are_not_offered()
+    test_openings_ordered_across_doctors()
+    test_openings_stop_at_limit()
+    test_inactive_doctors_and_rules_excluded()
+    print("\n🎉 All slot availability tests passed!")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test the materialized slot calendar: bookings and time slot edits keep it
+equal to rule expansion, and the rolling horizon follows the date in a
+long-running process instead of stopping where startup left it
+"""
+
+import asyncio
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import main
+from appointment_booking import claim_slot
+from models import Appointment, Base, Doctor, DoctorSlotCalendar, DoctorTimeSlots, Patient
+from schemas import DoctorTimeSlotCreate
+from slot_availability import find_speciality_openings, get_doctor_availability
+from slot_calendar import SlotCalendar, slot_calendar
+
+START_DAY = date(2030, 1, 7)  # A Monday
+WEEK_END = START_DAY + timedelta(days=6)
+
+
+def make_database():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Doctor(id=1, name="Dr. Rao", specialization="General Medicine", speciality_id=1))
+    db.add(Patient(id=1, first_name="Asha", last_name="Rao", phone="9000000000"))
+    db.add_all([DoctorTimeSlots(doctor_id=1, day_of_week=day, start_time=time(9, 0), end_time=time(10, 0))
+                for day in range(7)])
+    db.commit()
+    return db
+
+
+@contextmanager
+def calendar_enabled(db):
+    """Turn the global calendar on for START_DAY's week, materialized from the current rules"""
+    slot_calendar.enabled, slot_calendar.horizon_days = True, 7
+    slot_calendar.today = lambda: START_DAY
+    slot_calendar._built_through = slot_calendar._extended_on = None
+    try:
+        slot_calendar.ensure_horizon(db)
+        db.commit()
+        yield slot_calendar
+    finally:
+        del slot_calendar.today
+        slot_calendar.enabled, slot_calendar.horizon_days = SlotCalendar().enabled, SlotCalendar().horizon_days
+        slot_calendar._built_through = slot_calendar._extended_on = None
+
+
+def both_paths(db, read):
+    """(calendar answer, rule expansion answer) of a read"""
+    materialized = read()
+    slot_calendar.enabled = False
+    try:
+        return materialized, read()
+    finally:
+        slot_calendar.enabled = True
+
+
+def assert_calendar_matches_rules(db):
+    doctor = db.get(Doctor, 1)
+    materialized, expanded = both_paths(db, lambda: get_doctor_availability(db, doctor, START_DAY, WEEK_END))
+    assert materialized == expanded, (materialized, expanded)
+    materialized, expanded = both_paths(db, lambda: find_speciality_openings(db, 1, START_DAY, WEEK_END, limit=50))
+    assert materialized == expanded, (materialized, expanded)
+    return expanded
+
+
+def test_claimed_slot_leaves_calendar():
+    """claim_slot marks the calendar row booked in the same transaction"""
+    print("🧪 Testing bookings against the slot calendar...")
+    db = make_database()
+    with calendar_enabled(db):
+        slot_datetime = datetime.combine(START_DAY, time(9, 0))
+        claim_slot(db, Appointment(patient_id=1, doctor_id=1, date=slot_datetime, status="scheduled"))
+        row = db.query(DoctorSlotCalendar).filter(DoctorSlotCalendar.slot_datetime == slot_datetime).one()
+        assert row.is_booked and row.appointment_id is not None
+
+        openings = assert_calendar_matches_rules(db)
+        assert openings[0]["date"] == "2030-01-07" and openings[0]["time"] == "09:30", openings[0]
+        monday = get_doctor_availability(db, db.get(Doctor, 1), START_DAY, START_DAY)[0]["available_slots"]
+        assert [slot["is_available"] for slot in monday] == [False, True]
+    db.close()
+    print("   ✅ Booked slot is unavailable on both read paths")
+
+
+def test_time_slot_edits_match_rule_expansion():
+    """Creating, updating, toggling and deleting rules re-expands the calendar for that doctor"""
+    print("🧪 Testing time slot edits against the slot calendar...")
+    db = make_database()
+    with calendar_enabled(db):
+        # Overlapping rule: 09:30 is produced by both and listed once, under the first rule
+        overlap = asyncio.run(main.create_time_slot(
+            {"doctor_id": 1, "day_of_week": 0, "start_time": time(9, 30), "end_time": time(10, 30)}, db
+        ))
+        expanded = assert_calendar_matches_rules(db)
+        monday = [opening["time"] for opening in expanded if opening["date"] == "2030-01-07"]
+        assert monday == ["09:00", "09:30", "10:00"], monday
+
+        afternoon = asyncio.run(main.create_doctor_time_slot(1, DoctorTimeSlotCreate(
+            doctor_id=1, day_of_week=1, start_time=time(14, 0), end_time=time(15, 0)
+        ), db))
+        assert_calendar_matches_rules(db)
+
+        asyncio.run(main.update_time_slot(overlap.id, {"start_time": time(11, 0), "end_time": time(12, 0)}, db))
+        assert_calendar_matches_rules(db)
+
+        asyncio.run(main.toggle_time_slot(afternoon.id, db))
+        expanded = assert_calendar_matches_rules(db)
+        assert "14:00" not in [opening["time"] for opening in expanded]
+
+        asyncio.run(main.delete_time_slot(overlap.id, db))
+        expanded = assert_calendar_matches_rules(db)
+        assert all(opening["time"] in ("09:00", "09:30") for opening in expanded), expanded
+    db.close()
+    print("   ✅ Calendar equals rule expansion after every edit")
+
+
+def test_horizon_rolls_forward_on_read():
+    """A read after the horizon has passed extends the calendar instead of falling back"""
+    print("🧪 Testing the rolling slot calendar horizon...")
+    db = make_database()
+    calendar = SlotCalendar(enabled=True, horizon_days=7)
+    current = {"day": START_DAY}
+    calendar.today = lambda: current["day"]
+    calendar.ensure_horizon(db)
+    db.commit()
+    assert calendar.covers(db, START_DAY, START_DAY + timedelta(days=6))
+
+    current["day"] = START_DAY + timedelta(days=10)
+    week = [current["day"] + timedelta(days=offset) for offset in range(7)]
+    availability = calendar.get_doctor_availability(db, db.get(Doctor, 1), week)
+    assert availability is not None and all(len(day["available_slots"]) == 2 for day in availability)
+    first, last = db.query(func.min(DoctorSlotCalendar.slot_date), func.max(DoctorSlotCalendar.slot_date)).one()
+    assert (first, last) == (week[0], week[-1]), (first, last)
+
+    # Once a day is enough: a failed extension is not retried on every read
+    calendar.ensure_horizon = lambda session: 1 / 0
+    current["day"] += timedelta(days=1)
+    assert not calendar.covers(db, current["day"], current["day"] + timedelta(days=6))
+    assert calendar.covers(db, current["day"], week[-1])
+    db.close()
+    print(f"   ✅ Calendar extended through {last} on the first read")
+
+
+if __name__ == "__main__":
+    test_claimed_slot_leaves_calendar()
+    test_time_slot_edits_match_rule_expansion()
+    test_horizon_rolls_forward_on_read()
+    print("\n🎉 All slot calendar tests passed!")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test speculative fallback and the LLM latency budget with fake LLM and
+questionnaire paths (no network or database needed)
+"""
+
+import asyncio
+import time
+
+from rag_service_enhanced import EnhancedRAGService
+from session_store import SessionStore
+
+LLM_SECONDS = 0.3
+FALLBACK_SECONDS = 0.2
+
+
+def make_service(llm_seconds: float, confidence: float):
+    service = EnhancedRAGService()
+    service.session_store = SessionStore(enabled=False)
+    state = {"llm_cancelled": False}
+
+    service.get_query_contexts = lambda db, patient_id, doctor_id: (None, None)
+
+    async def fake_llm(query, patient_context=None, doctor_context=None, retrieved_docs=None, history=None):
+        try:
+            await asyncio.sleep(llm_seconds)
+        except asyncio.CancelledError:
+            state["llm_cancelled"] = True
+            raise
+        return "AI answer", confidence
+    service.agenerate_openai_response_with_confidence = fake_llm
+
+    def fake_fallback(query, db, patient_context, doctor_context, confidence, active_questionnaire_id=None):
+        time.sleep(FALLBACK_SECONDS)
+        return {"response": "Questionnaire answer", "fallback_mode": True, "ai_confidence": confidence}
+    service.build_fallback_result = fake_fallback
+    service.build_fallback_result_in_new_session = \
+        lambda query, patient_context, doctor_context, active_questionnaire_id=None: \
+        fake_fallback(query, None, patient_context, doctor_context, 0.0, active_questionnaire_id)
+
+    return service, state
+
+
+def timed(coroutine):
+    started = time.perf_counter()
+    result = asyncio.run(coroutine)
+    return result, time.perf_counter() - started
+
+
+def test_speculative_overlaps_fallback():
+    """Low-confidence turns cost max(LLM, fallback) instead of LLM + fallback"""
+    print("🧪 Testing speculative fallback overlap...")
+    service, _ = make_service(LLM_SECONDS, confidence=0.2)
+
+    sequential, sequential_time = timed(service.aprocess_query_with_fallback(
+        "I feel unwell", None, speculative=False, latency_budget_ms=0))
+    speculative, speculative_time = timed(service.aprocess_query_with_fallback(
+        "I feel unwell", None, speculative=True, latency_budget_ms=0))
+
+    assert sequential["response"] == speculative["response"] == "Questionnaire answer"
+    assert speculative["ai_confidence"] == 0.2
+    assert sequential_time >= LLM_SECONDS + FALLBACK_SECONDS
+    assert speculative_time < LLM_SECONDS + FALLBACK_SECONDS * 0.5
+    print(f"   ✅ sequential {sequential_time * 1000:.0f} ms, speculative {speculative_time * 1000:.0f} ms")
+
+
+def test_confident_llm_wins():
+    """A confident LLM answer is returned even though the fallback was computed"""
+    print("🧪 Testing confident LLM answer in speculative mode...")
+    service, _ = make_service(LLM_SECONDS, confidence=0.9)
+    result, _ = timed(service.aprocess_query_with_fallback(
+        "What is a healthy diet?", None, speculative=True, latency_budget_ms=0))
+    assert result["response"] == "AI answer"
+    assert result["fallback_mode"] is False
+    print("   ✅ AI answer used")
+
+
+def test_latency_budget_cancels_llm():
+    """An LLM slower than the budget is cancelled and the fallback is returned"""
+    print("🧪 Testing LLM latency budget...")
+    service, state = make_service(llm_seconds=5, confidence=0.9)
+    result, elapsed = timed(service.aprocess_query_with_fallback(
+        "I have a headache", None, speculative=True, latency_budget_ms=100))
+    assert result["response"] == "Questionnaire answer"
+    assert result["ai_confidence"] == 0.0
+    assert state["llm_cancelled"]
+    assert elapsed < 1, elapsed
+    print(f"   ✅ Fallback returned after {elapsed * 1000:.0f} ms, LLM call cancelled")
+
+
+def test_latency_budget_covers_retrieval():
+    """Retrieval and the LLM share one deadline, though each alone would fit"""
+    print("🧪 Testing the latency budget across retrieval and the LLM...")
+    service, state = make_service(llm_seconds=0.15, confidence=0.9)
+    service.aretrieve_documents = lambda query, db: asyncio.sleep(0.15, result=[])
+    result, elapsed = timed(service.aprocess_query_with_fallback(
+        "I have a headache", None, speculative=True, latency_budget_ms=200))
+    assert result["response"] == "Questionnaire answer"
+    assert state["llm_cancelled"]
+    assert elapsed < 0.3, elapsed
+    print(f"   ✅ Fallback returned after {elapsed * 1000:.0f} ms instead of 300 ms")
+
+
+if __name__ == "__main__":
+    test_speculative_overlaps_fallback()
+    test_confident_llm_wins()
+    test_latency_budget_cancels_llm()
+    test_latency_budget_covers_retrieval()
+    print("\n🎉 All speculative fallback tests passed!")
@@ -15,6 +15,7 @@ class SystemMessages:
     PATIENT_NOT_FOUND = "Patient not found"
     QUESTIONNAIRE_NOT_FOUND = "Questionnaire not found"
     DOCUMENT_NOT_FOUND = "Document not found"
+    INGESTION_JOB_NOT_FOUND = "Ingestion job not found"
     
     # Success Messages
     QUESTIONNAIRES_POPULATED = "Questionnaires populated successfully"
@@ -42,6 +43,7 @@ class ContextLabels:
     PATIENT_INFORMATION = "Patient Information"
     ASSIGNED_DOCTOR = "Assigned Doctor"
     RELEVANT_GUIDELINES = "Relevant Guidelines"
+    CONVERSATION_HISTORY = "Conversation So Far"
     USER_QUERY = "User Query"
     CONTEXT = "Context"
 
@@ -56,12 +58,14 @@ class ErrorMessages:
     DOCTOR_CONTEXT_ERROR = "Error getting doctor context"
     OPENAI_ERROR = "Error generating OpenAI response"
     VECTOR_STORE_WARNING = "Warning: Failed to add document {title} to vector store"
+    CHAT_SESSION_ERROR = "Error opening chat session, answering without history"
 
 # Log Messages
 class LogMessages:
     AI_CONFIDENCE_LOW = "AI confidence too low ({confidence:.2f}), searching local database..."
     OPENAI_FAILED = "OpenAI failed, searching local database"
     FALLBACK_SYSTEM = "OpenAI failed, using fallback system"
+    LATENCY_BUDGET_EXCEEDED = "No AI answer within {budget_ms} ms, using local database response"
 
 # Default Values
 class DefaultValues:
@@ -70,6 +74,7 @@ class DefaultValues:
     MAX_TOKENS = 500
     TEMPERATURE = 0.7
     MODEL_NAME = "gpt-3.5-turbo"
+    STUB_RESPONSE = "This is a test response from the local stub provider. Please consult your doctor for medical advice."
     
     # Default responses
     ADMIN_SETUP_MESSAGE = "I'm your healthcare assistant. Please contact the administrator to set up questionnaires."
@@ -162,6 +167,31 @@ class TemplatePlaceholders:
         "{severity}", "{headache_advice}", "{vomiting_status}", "{nausea_advice}",
         "{user_topic}", "{general_advice}"
     ]
+    
+    # Values used for placeholders that could not be filled from the user's message
+    DEFAULT_VALUES = {
+        "user_choice": DefaultValues.HEALTH_CONCERN,
+        "pain_level": "moderate",
+        "recommendation": "consulting with a healthcare professional",
+        "temperature": "normal",
+        "fever_advice": "monitor and rest",
+        "pain_location": DefaultValues.AFFECTED_AREA,
+        "duration": "a while",
+        "appointment_type": "medical",
+        "doctor_preference": DefaultValues.PREFERRED_DOCTOR,
+        "appointment_timing": DefaultValues.PREFERRED_TIME,
+        "medication_name": DefaultValues.YOUR_MEDICATION,
+        "medication_response": DefaultValues.CONSULT_DOCTOR,
+        "cough_type": "persistent",
+        "cough_advice": "staying hydrated and resting",
+        "headache_location": "your head",
+        "severity": "moderate",
+        "headache_advice": "rest in a quiet, dark room",
+        "vomiting_status": "some discomfort",
+        "nausea_advice": "resting and avoiding solid foods",
+        "user_topic": DefaultValues.HEALTH_CONCERN,
+        "general_advice": "consulting with a healthcare professional"
+    }
 
 # Database Categories
 class DatabaseCategories:
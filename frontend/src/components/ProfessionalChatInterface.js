@@ -108,6 +108,46 @@ const ProfessionalChatInterface = ({ selectedDoctor: propSelectedDoctor, onClose
     setCallbackFlow(false);
   };
 
+  // Stream the assistant's reply into a message bubble as tokens arrive
+  const streamAssistantReply = async (text) => {
+    const streamingId = Date.now() + 1;
+    let streamingStarted = false;
+
+    const result = await chatService.streamMessage(
+      text,
+      selectedPatient ? parseInt(selectedPatient) : null,
+      selectedDoctor ? parseInt(selectedDoctor) : null,
+      (token) => {
+        if (!streamingStarted) {
+          streamingStarted = true;
+          setLoading(false);
+          setMessages(prev => [...prev, {
+            id: streamingId,
+            content: token,
+            sender: 'assistant',
+            timestamp: new Date(),
+            streaming: true,
+          }]);
+        } else {
+          setMessages(prev => prev.map(msg => (
+            msg.id === streamingId ? { ...msg, content: msg.content + token } : msg
+          )));
+        }
+      }
+    );
+
+    if (result.error) {
+      const errorMessage = result.error?.message || result.error?.toString() || 'Failed to send message';
+      setError(errorMessage);
+    }
+
+    // The final response replaces the streamed text (it differs when the guidelines fallback was used)
+    const finalMessage = { ...result.botResponse, id: streamingId, sender: 'assistant' };
+    setMessages(prev => (streamingStarted
+      ? prev.map(msg => (msg.id === streamingId ? finalMessage : msg))
+      : [...prev, finalMessage]));
+  };
+
   const sendMessage = async () => {
     if (!inputMessage.trim()) return;
 
@@ -241,19 +281,7 @@ const ProfessionalChatInterface = ({ selectedDoctor: propSelectedDoctor, onClose
     }
 
     try {
-      const result = await chatService.sendMessage(
-        currentMessage,
-        selectedPatient ? parseInt(selectedPatient) : null,
-        selectedDoctor ? parseInt(selectedDoctor) : null
-      );
-
-      if (result.error) {
-        const errorMessage = result.error?.message || result.error?.toString() || 'Failed to send message';
-        setError(errorMessage);
-        setMessages(prev => [...prev, result.botResponse]);
-      } else {
-        setMessages(prev => [...prev, result.botResponse]);
-      }
+      await streamAssistantReply(currentMessage);
     } catch (err) {
       setError('Failed to send message. Please try again.');
       console.error('Error sending message:', err);
@@ -295,18 +323,7 @@ const ProfessionalChatInterface = ({ selectedDoctor: propSelectedDoctor, onClose
       setLoading(true);
       setError(null);
 
-      chatService.sendMessage(
-        optionText,
-        selectedPatient ? parseInt(selectedPatient) : null,
-        selectedDoctor ? parseInt(selectedDoctor) : null
-      ).then(result => {
-        if (result.error) {
-          const errorMessage = result.error?.message || result.error?.toString() || 'Failed to send message';
-          setError(errorMessage);
-          setMessages(prev => [...prev, result.botResponse]);
-        } else {
-          setMessages(prev => [...prev, result.botResponse]);
-        }
+      streamAssistantReply(optionText).then(() => {
         setLoading(false);
       }).catch(err => {
         setError('Failed to send message. Please try again.');
@@ -9,14 +9,26 @@ const api = axios.create({
   },
 });
 
+// Parse one server-sent event block ("event: x\ndata: {...}")
+const parseSseEvent = (rawEvent) => {
+  let event = 'message';
+  const dataLines = [];
+  rawEvent.split('\n').forEach((line) => {
+    if (line.startsWith('event:')) event = line.slice(6).trim();
+    else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+  });
+  return { event, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : null };
+};
+
 export const apiService = {
   // Chat endpoints
-  sendMessage: async (message, patientId = null, doctorId = null) => {
+  sendMessage: async (message, patientId = null, doctorId = null, sessionId = null) => {
     try {
       const response = await api.post('/chat', {
         message,
         patient_id: patientId,
-        doctor_id: doctorId
+        doctor_id: doctorId,
+        session_id: sessionId
       });
       return response.data;
     } catch (error) {
@@ -25,6 +37,59 @@ export const apiService = {
     }
   },
 
+  // Streaming chat: calls onToken(text) as tokens arrive and resolves with the final response
+  streamMessage: async (message, patientId = null, doctorId = null, { onToken, signal, sessionId = null } = {}) => {
+    const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Accept: 'text/event-stream',
+      },
+      body: JSON.stringify({
+        message,
+        patient_id: patientId,
+        doctor_id: doctorId,
+        session_id: sessionId
+      }),
+      signal,
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error(`Streaming chat failed: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const { event, data } = parseSseEvent(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        if (event === 'token' && onToken) {
+          onToken(data.text);
+        } else if (event === 'done') {
+          result = data;
+        } else if (event === 'error') {
+          throw new Error(data?.detail || 'Streaming chat failed');
+        }
+      }
+    }
+
+    if (!result) {
+      throw new Error('Chat stream ended before the final response');
+    }
+    return result;
+  },
+
   // Patient endpoints
   getPatients: async () => {
     try {
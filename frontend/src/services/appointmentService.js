@@ -91,6 +91,56 @@ class AppointmentService {
     }
   }
 
+  /**
+   * Get available time slots for a doctor for every date in a range (inclusive)
+   */
+  async getAvailableSlotsRange(doctorId, fromDate, toDate) {
+    try {
+      const response = await fetch(
+        `${API_BASE_URL}/doctors/${doctorId}/available-slots?from=${fromDate}&to=${toDate}`
+      );
+
+      if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(`Failed to fetch available slots: ${response.status} - ${errorText}`);
+      }
+
+      return await response.json();
+    } catch (error) {
+      console.error('❌ Error fetching available slots range:', error);
+      throw error;
+    }
+  }
+
+  /**
+   * Find the earliest open slots across all doctors of a speciality
+   * Options: { fromDate, toDate, startTime, endTime, limit }
+   */
+  async findSpecialityOpenings(specialityId, options = {}) {
+    try {
+      const params = new URLSearchParams();
+      if (options.fromDate) params.append('from', options.fromDate);
+      if (options.toDate) params.append('to', options.toDate);
+      if (options.startTime) params.append('start_time', options.startTime);
+      if (options.endTime) params.append('end_time', options.endTime);
+      if (options.limit) params.append('limit', options.limit);
+
+      const response = await fetch(
+        `${API_BASE_URL}/specialities/${specialityId}/available-slots?${params.toString()}`
+      );
+
+      if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(`Failed to search available slots: ${response.status} - ${errorText}`);
+      }
+
+      return await response.json();
+    } catch (error) {
+      console.error('❌ Error searching speciality openings:', error);
+      throw error;
+    }
+  }
+
   /**
    * Book an appointment
    */
@@ -9,7 +9,11 @@ class ChatService {
   // Send a message and get response
   async sendMessage(message, patientId = null, doctorId = null, sessionId = null) {
     try {
-      const response = await apiService.sendMessage(message, patientId, doctorId);
+      const response = await apiService.sendMessage(
+        message, patientId, doctorId, sessionId ?? this.currentSession
+      );
+      // Follow-up messages continue the same conversation on the server
+      this.currentSession = response.session_id ?? this.currentSession;
       
       // Store message in history
       const chatMessage = {
@@ -63,6 +67,78 @@ class ChatService {
     }
   }
 
+  // Send a message and receive the answer token by token.
+  // onToken(text) is called for each streamed chunk; the returned botResponse is the final
+  // answer, which replaces the streamed text when the backend fell back to its guidelines.
+  async streamMessage(message, patientId = null, doctorId = null, onToken = null, signal = null) {
+    let receivedTokens = false;
+    try {
+      const response = await apiService.streamMessage(message, patientId, doctorId, {
+        signal,
+        sessionId: this.currentSession,
+        onToken: (text) => {
+          receivedTokens = true;
+          if (onToken) onToken(text);
+        }
+      });
+      this.currentSession = response.session_id ?? this.currentSession;
+
+      const chatMessage = {
+        id: Date.now(),
+        type: 'user',
+        content: message,
+        timestamp: new Date(),
+        patientId,
+        doctorId
+      };
+
+      const botResponse = {
+        id: Date.now() + 1,
+        type: 'bot',
+        sender: 'assistant',
+        content: response.response,
+        timestamp: new Date(),
+        fallbackMode: response.fallback_mode,
+        aiConfidence: response.ai_confidence,
+        currentQuestion: response.current_question,
+        sessionId: response.session_id,
+        patientContext: response.patient_context,
+        doctorContext: response.doctor_context,
+        retrievedDocuments: response.retrieved_documents
+      };
+
+      this.messageHistory.push(chatMessage, botResponse);
+
+      return {
+        userMessage: chatMessage,
+        botResponse: botResponse,
+        fullResponse: response
+      };
+    } catch (error) {
+      // Nothing shown yet (e.g. streaming unsupported or blocked by a proxy): use the regular endpoint
+      if (!receivedTokens && error?.name !== 'AbortError') {
+        console.warn('Streaming chat unavailable, falling back to /chat:', error);
+        return this.sendMessage(message, patientId, doctorId);
+      }
+
+      console.error('Error streaming message:', error);
+      return {
+        userMessage: null,
+        botResponse: {
+          id: Date.now(),
+          type: 'bot',
+          sender: 'assistant',
+          content: 'I apologize, but I\'m experiencing technical difficulties. Please try again later.',
+          timestamp: new Date(),
+          error: true
+        },
+        error: {
+          message: error?.message || error?.toString() || 'An unknown error occurred'
+        }
+      };
+    }
+  }
+
   // Get message history
   getMessageHistory() {
     return this.messageHistory;
@@ -71,6 +147,7 @@ class ChatService {
   // Clear message history
   clearHistory() {
     this.messageHistory = [];
+    this.currentSession = null;
   }
 
   // Get last N messages
@@ -38,33 +38,114 @@ const ChatbotWidget = {
   }
 };
 
+// Read a /chat/stream response, calling onToken for each token; resolves with the `done` payload
+const readChatStream = async (response, onToken) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = null;
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const lines = buffer.slice(0, boundary).split('\n');
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      const eventLine = lines.find(line => line.startsWith('event:'));
+      const dataLine = lines.find(line => line.startsWith('data:'));
+      const event = eventLine ? eventLine.slice(6).trim() : 'message';
+      const data = dataLine ? JSON.parse(dataLine.slice(5).trim()) : null;
+
+      if (event === 'token') {
+        onToken(data.text);
+      } else if (event === 'done') {
+        result = data;
+      } else if (event === 'error') {
+        throw new Error(data?.detail || 'Streaming chat failed');
+      }
+    }
+  }
+
+  if (!result) {
+    throw new Error('Chat stream ended before the final response');
+  }
+  return result;
+};
+
 const ChatbotWidgetComponent = ({ apiUrl, clientId, apiKey, theme, title }) => {
   const [isOpen, setIsOpen] = useState(false);
   const [messages, setMessages] = useState([]);
   const [inputMessage, setInputMessage] = useState('');
+  const [sessionId, setSessionId] = useState(null);
+
+  const headers = {
+    'Content-Type': 'application/json',
+    'Authorization': `Bearer ${apiKey}`,
+    'X-Client-ID': clientId
+  };
+
+  const updateBotMessage = (id, update) => {
+    setMessages(prev => prev.map(msg => (msg.id === id ? { ...msg, ...update(msg) } : msg)));
+  };
 
   const sendMessage = async (message) => {
+    const botId = Date.now() + 1;
+    setMessages(prev => [...prev,
+      { id: Date.now(), content: message, sender: 'user' },
+      { id: botId, content: '', sender: 'bot' }
+    ]);
+
+    let receivedTokens = false;
     try {
-      const response = await fetch(`${apiUrl}/chat`, {
+      // Stream tokens from /chat/stream (server-sent events)
+      const response = await fetch(`${apiUrl}/chat/stream`, {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${apiKey}`,
-          'X-Client-ID': clientId
-        },
+        headers: { ...headers, Accept: 'text/event-stream' },
         body: JSON.stringify({
           message: message,
-          client_id: clientId
+          client_id: clientId,
+          session_id: sessionId
         })
       });
+      if (!response.ok || !response.body) {
+        throw new Error(`Streaming chat failed: ${response.status}`);
+      }
 
-      const data = await response.json();
-      setMessages(prev => [...prev, 
-        { id: Date.now(), content: message, sender: 'user' },
-        { id: Date.now() + 1, content: data.response, sender: 'bot' }
-      ]);
+      const finalResponse = await readChatStream(response, (text) => {
+        receivedTokens = true;
+        updateBotMessage(botId, msg => ({ content: msg.content + text }));
+      });
+      updateBotMessage(botId, () => ({ content: finalResponse.response }));
+      setSessionId(finalResponse.session_id ?? sessionId);
     } catch (error) {
-      console.error('Error sending message:', error);
+      if (receivedTokens) {
+        console.error('Error streaming message:', error);
+        return;
+      }
+
+      // Streaming unavailable: fall back to the regular endpoint
+      try {
+        const response = await fetch(`${apiUrl}/chat`, {
+          method: 'POST',
+          headers,
+          body: JSON.stringify({
+            message: message,
+            client_id: clientId,
+            session_id: sessionId
+          })
+        });
+
+        const data = await response.json();
+        updateBotMessage(botId, () => ({ content: data.response }));
+        setSessionId(data.session_id ?? sessionId);
+      } catch (fallbackError) {
+        console.error('Error sending message:', fallbackError);
+      }
     }
   };
 